@@ -0,0 +1,108 @@
+"""
+Benchmark del arranque del detector: tiempo hasta la primera detección.
+
+Lanza varias veces un proceso nuevo que carga el modelo y detecta en un
+frame, y mide por separado la carga de la red, el calentamiento y la primera
+detección, con y sin pasada de calentamiento. Mide también la creación de un
+segundo Detector en el mismo proceso, que reutiliza la red de la caché
+(src/cache_red.py).
+
+Necesita un modelo YOLO en models/.
+
+Uso:
+    python benchmarks/bench_arranque.py --modelo tiny --repeticiones 5 --input clip.mp4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, RAIZ)
+
+MODELS_DIR = os.path.join(RAIZ, 'models')
+
+
+def rutas_modelo(modelo):
+    """
+    Devuelve los argumentos del Detector para el modelo, o None si no está descargado
+    """
+    nombre = 'yolov4-tiny' if modelo == 'tiny' else 'yolov4'
+    rutas = dict(yolo_weights=os.path.join(MODELS_DIR, f'{nombre}.weights'),
+                 yolo_cfg=os.path.join(MODELS_DIR, f'{nombre}.cfg'),
+                 coco_names=os.path.join(MODELS_DIR, 'coco.names'))
+    return rutas if all(os.path.exists(r) for r in rutas.values()) else None
+
+
+def medir_arranque(modelo, calentar, ruta_video):
+    """
+    Mide el arranque en el proceso actual (se ejecuta en un proceso hijo)
+
+    Returns:
+        Diccionario con los tiempos en segundos
+    """
+    inicio = time.perf_counter()
+    import cv2
+    from src.detector import Detector
+    importacion = time.perf_counter() - inicio
+
+    frame = None
+    if ruta_video:
+        ret, frame = cv2.VideoCapture(ruta_video).read()
+    if frame is None:
+        frame = np.random.default_rng(0).integers(0, 255, (360, 640, 3), dtype=np.uint8)
+
+    detector = Detector(**rutas_modelo(modelo), calentar=calentar)
+    inicio_deteccion = time.perf_counter()
+    detector.detect(frame)
+    primera_deteccion = time.perf_counter() - inicio_deteccion
+    total = time.perf_counter() - inicio
+
+    # Un segundo Detector del mismo modelo reutiliza la red ya cargada
+    inicio_reuso = time.perf_counter()
+    Detector(**rutas_modelo(modelo), calentar=calentar)
+    reuso = time.perf_counter() - inicio_reuso
+
+    return dict(importacion=importacion, carga=detector.tiempo_carga, calentamiento=detector.tiempo_calentamiento,
+                primera_deteccion=primera_deteccion, total=total, reuso=reuso)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del tiempo hasta la primera detección')
+    parser.add_argument('--modelo', type=str, choices=['tiny', 'full'], default='tiny',
+                        help='Modelo a medir (por defecto: tiny)')
+    parser.add_argument('--repeticiones', type=int, default=5, help='Arranques por configuración (por defecto: 5)')
+    parser.add_argument('--input', type=str, default='', help='Video del que tomar el primer frame (opcional)')
+    parser.add_argument('--hijo', type=str, default='', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        # Proceso hijo: medir un arranque y devolver los tiempos en JSON
+        print(json.dumps(medir_arranque(args.modelo, args.hijo == 'calentar', args.input)))
+        return
+
+    if rutas_modelo(args.modelo) is None:
+        print("No se encontraron modelos YOLO en models/. Ejecuta primero tools/descargar_modelos.py")
+        return
+
+    print(f"{'Configuración':<20}{'Import.':>9}{'Carga':>9}{'Calent.':>9}{'1ª det.':>9}{'Total':>9}{'Reuso':>9}  (mediana, s)")
+    for modo in ('sin calentar', 'calentar'):
+        tiempos = []
+        for _ in range(args.repeticiones):
+            salida = subprocess.run([sys.executable, os.path.abspath(__file__), '--modelo', args.modelo,
+                                     '--input', args.input, '--hijo', modo.replace(' ', '_')],
+                                    capture_output=True, text=True, check=True)
+            tiempos.append(json.loads(salida.stdout.strip().splitlines()[-1]))
+        medianas = {clave: float(np.median([t[clave] for t in tiempos])) for clave in tiempos[0]}
+        print(f"{modo:<20}{medianas['importacion']:>9.3f}{medianas['carga']:>9.3f}{medianas['calentamiento']:>9.3f}"
+              f"{medianas['primera_deteccion']:>9.3f}{medianas['total']:>9.3f}{medianas['reuso']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Benchmark de las reservas de memoria por frame, con y sin buffers reutilizados.
+
+Reproduce el trabajo por frame de main.py que crea arrays: leer el frame,
+reducirlo a 640x360, preparar el blob de la red, la máscara de la
+sustracción de fondo y la imagen en la que se dibuja. Lo ejecuta de la forma
+original (un array nuevo en cada paso) y con los buffers de src/buffers.py
+(lectura y redimensionado sobre buffers del pool, blob reutilizado, máscara
+umbralizada en el sitio y dibujo sobre el propio frame).
+
+Para cada versión muestra los arrays de NumPy reservados por frame y sus KB
+(medidos con tracemalloc, que registra las reservas de NumPy y de los arrays
+que devuelve OpenCV), y el tiempo por frame de la lectura y del resto. No
+necesita ningún modelo: el blob se prepara pero no se pasa a la red.
+
+Uso:
+    python benchmarks/bench_buffers.py --input clip_720p.mp4 --frames 300
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.buffers import PoolBuffers, LectorConBuffers, BufferBlob
+
+TAM_ENTRADA = (288, 288)
+
+
+def generar_clip(ruta, num_frames, ancho=1280, alto=720, semilla=0):
+    """
+    Genera un clip sintético con rectángulos en movimiento
+    """
+    rng = np.random.default_rng(semilla)
+    fondo = cv2.GaussianBlur(rng.integers(60, 120, size=(alto, ancho, 3), dtype=np.uint8), (9, 9), 0)
+    escritor = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*'MJPG'), 25, (ancho, alto))
+    for f in range(num_frames):
+        frame = fondo.copy()
+        for i in range(6):
+            x = (40 + 7 * f + 180 * i) % ancho
+            cv2.rectangle(frame, (x, 100 + 90 * i), (x + 90, 160 + 90 * i), (230, 230, 230), -1)
+        escritor.write(frame)
+    escritor.release()
+
+
+def reducir(frame):
+    return cv2.resize(frame, (640, 360)) if frame.shape[1] > 640 else frame
+
+
+def dibujar(imagen):
+    cv2.rectangle(imagen, (100, 100), (200, 180), (0, 255, 0), 2)
+    cv2.putText(imagen, "ID: 1 - Vehiculo", (100, 95), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+
+class SinBuffers:
+    """
+    Trabajo por frame tal como se hacía antes: cada paso crea un array nuevo
+    """
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.sustractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=30, detectShadows=True)
+
+    def leer(self):
+        return self.cap.read()
+
+    def procesar(self, frame):
+        reducido = reducir(frame)
+        blob = cv2.dnn.blobFromImage(reducido, 1/255.0, TAM_ENTRADA, swapRB=True, crop=False)
+        mascara = self.sustractor.apply(reducido)
+        _, mascara = cv2.threshold(mascara, 254, 255, cv2.THRESH_BINARY)
+        dibujo = reducido.copy()
+        dibujar(dibujo)
+        return [frame, reducido, blob, mascara, dibujo]
+
+    def terminar(self, arrays):
+        pass
+
+
+class ConBuffers:
+    """
+    Trabajo por frame con los buffers reutilizados, como en main.py
+    """
+
+    def __init__(self, cap):
+        self.pool = PoolBuffers()
+        self.lector = LectorConBuffers(cap, self.pool)
+        self.blob = BufferBlob(TAM_ENTRADA)
+        self.sustractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=30, detectShadows=True)
+
+    def leer(self):
+        return self.lector.read()
+
+    def procesar(self, frame):
+        reducido = frame
+        if frame.shape[1] > 640:
+            reducido = cv2.resize(frame, (640, 360), dst=self.pool.obtener((360, 640, 3)))
+            self.pool.liberar(frame)
+        blob = self.blob.llenar([reducido])
+        mascara = self.sustractor.apply(reducido, self.pool.obtener(reducido.shape[:2]))
+        cv2.threshold(mascara, 254, 255, cv2.THRESH_BINARY, dst=mascara)
+        dibujar(reducido)
+        return [reducido, blob, mascara]
+
+    def terminar(self, arrays):
+        # Fin del render: el frame y la máscara vuelven al pool
+        self.pool.liberar(arrays[0])
+        self.pool.liberar(arrays[2])
+
+
+def reservas_numpy(snapshot, tam_minimo):
+    """
+    Número y bytes de los bloques de NumPy vivos de al menos tam_minimo bytes
+    """
+    bloques = [traza.size for traza in snapshot.traces if traza.domain == np.lib.tracemalloc_domain
+               and traza.size >= tam_minimo]
+    return len(bloques), sum(bloques)
+
+
+def medir(clase, ruta, num_frames, frames_reservas):
+    """
+    Ejecuta una versión: primero mide tiempos y después, con tracemalloc
+    activo, cuenta las reservas de frames_reservas frames
+
+    Returns:
+        Diccionario con los tiempos medios y las reservas por frame
+    """
+    cap = cv2.VideoCapture(ruta)
+    version = clase(cap)
+    lectura = []
+    resto = []
+    for _ in range(num_frames):
+        inicio = time.perf_counter()
+        ret, frame = version.leer()
+        if not ret:
+            break
+        leido = time.perf_counter()
+        version.terminar(version.procesar(frame))
+        fin = time.perf_counter()
+        lectura.append(leido - inicio)
+        resto.append(fin - leido)
+    cap.release()
+
+    # Reservas: se mantienen vivos los arrays del frame hasta contarlos
+    cap = cv2.VideoCapture(ruta)
+    version = clase(cap)
+    # Los primeros frames llenan el pool; no cuentan
+    for _ in range(3):
+        ret, frame = version.leer()
+        version.terminar(version.procesar(frame))
+    tracemalloc.start()
+    arrays = reservas = kb = 0
+    medidos = 0
+    for _ in range(frames_reservas):
+        antes = reservas_numpy(tracemalloc.take_snapshot(), 1024)
+        ret, frame = version.leer()
+        if not ret:
+            break
+        resultado = version.procesar(frame)
+        despues = reservas_numpy(tracemalloc.take_snapshot(), 1024)
+        version.terminar(resultado)
+        del resultado, frame
+        reservas += despues[0] - antes[0]
+        kb += (despues[1] - antes[1]) / 1024
+        medidos += 1
+    tracemalloc.stop()
+    cap.release()
+    return {'lectura_ms': np.mean(lectura) * 1000, 'resto_ms': np.mean(resto) * 1000,
+            'reservas': reservas / max(medidos, 1), 'kb': kb / max(medidos, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de reservas de memoria por frame')
+    parser.add_argument('--input', type=str, default=None,
+                        help='Clip de video (por defecto: clip sintético 1280x720)')
+    parser.add_argument('--frames', type=int, default=300, help='Frames a procesar (por defecto: 300)')
+    parser.add_argument('--frames-reservas', type=int, default=30,
+                        help='Frames en los que se cuentan las reservas (por defecto: 30)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = args.input
+        if ruta is None:
+            ruta = os.path.join(tmp, 'clip.avi')
+            generar_clip(ruta, args.frames)
+        resultados = [(nombre, medir(clase, ruta, args.frames, args.frames_reservas))
+                      for nombre, clase in (('sin buffers', SinBuffers), ('con buffers', ConBuffers))]
+
+    print(f"{'Versión':<14}{'arrays/frame':>14}{'KB/frame':>11}{'lectura ms':>12}{'resto ms':>10}")
+    for nombre, r in resultados:
+        print(f"{nombre:<14}{r['reservas']:>14.1f}{r['kb']:>11.0f}{r['lectura_ms']:>12.3f}{r['resto_ms']:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
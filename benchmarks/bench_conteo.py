@@ -0,0 +1,118 @@
+"""
+Benchmark del conteo por líneas y zonas con muchos objetos.
+
+Genera trayectorias sintéticas y compara el conteo vectorizado de
+src/conteo.py con una versión que recorre objeto por objeto y línea por línea
+en Python. Muestra el tiempo por frame de ambas y comprueba que cuentan lo mismo.
+
+Uso:
+    python benchmarks/bench_conteo.py --objetos 300 --lineas 8 --zonas 8 --frames 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.conteo import ConteoEscena
+
+
+def generar_escena(num_objetos, num_lineas, num_zonas, ancho=1920, alto=1080, semilla=0):
+    """
+    Genera posiciones, velocidades, líneas verticales y zonas rectangulares al azar
+    """
+    rng = np.random.default_rng(semilla)
+    posiciones = rng.uniform([0, 0], [ancho, alto], size=(num_objetos, 2))
+    velocidades = rng.uniform(-8, 8, size=(num_objetos, 2))
+    lineas = []
+    for i, x in enumerate(np.linspace(100, ancho - 100, num_lineas)):
+        lineas.append({'nombre': f"l{i}", 'puntos': [[float(x), 0.0], [float(x) + 50, float(alto)]]})
+    zonas = []
+    for i in range(num_zonas):
+        x, y = rng.uniform([0, 0], [ancho - 300, alto - 300])
+        zonas.append({'nombre': f"z{i}", 'puntos': [[x, y], [x + 300, y], [x + 250, y + 300], [x, y + 300]]})
+    return posiciones, velocidades, lineas, zonas
+
+
+def _lado(a, b, p):
+    return (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0]) >= 0
+
+
+def _dentro(p, vertices):
+    dentro = False
+    for (xi, yi), (xj, yj) in zip(vertices, vertices[-1:] + vertices[:-1]):
+        if (yi > p[1]) != (yj > p[1]) and p[0] < (xj - xi) * (p[1] - yi) / (yj - yi) + xi:
+            dentro = not dentro
+    return dentro
+
+
+def conteo_bucle(trayectorias, lineas, zonas):
+    """
+    Referencia en Python puro: cruces por línea y sentido y visitas por zona
+    """
+    cruces = np.zeros((len(lineas), 2), dtype=np.int64)
+    visitas = np.zeros(len(zonas), dtype=np.int64)
+    tiempos = []
+    anteriores = None
+    dentro_antes = {}
+    for centros in trayectorias:
+        inicio = time.perf_counter()
+        for n, p1 in enumerate(centros.tolist()):
+            if anteriores is not None:
+                p0 = anteriores[n]
+                for l, linea in enumerate(lineas):
+                    a, b = linea['puntos']
+                    antes, despues = _lado(a, b, p0), _lado(a, b, p1)
+                    d = (p1[0] - p0[0], p1[1] - p0[1])
+                    lado_a = d[0] * (a[1] - p0[1]) - d[1] * (a[0] - p0[0])
+                    lado_b = d[0] * (b[1] - p0[1]) - d[1] * (b[0] - p0[0])
+                    if antes != despues and lado_a * lado_b <= 0:
+                        cruces[l, 0 if despues else 1] += 1
+            for z, zona in enumerate(zonas):
+                dentro = _dentro(p1, zona['puntos'])
+                if dentro and not dentro_antes.get((n, z), False):
+                    visitas[z] += 1
+                dentro_antes[(n, z)] = dentro
+        anteriores = centros.tolist()
+        tiempos.append(time.perf_counter() - inicio)
+    return cruces, visitas, tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del conteo por líneas y zonas')
+    parser.add_argument('--objetos', type=int, default=300, help='Objetos simultáneos (por defecto: 300)')
+    parser.add_argument('--lineas', type=int, default=8, help='Líneas de conteo (por defecto: 8)')
+    parser.add_argument('--zonas', type=int, default=8, help='Zonas (por defecto: 8)')
+    parser.add_argument('--frames', type=int, default=200, help='Frames de la escena (por defecto: 200)')
+    args = parser.parse_args()
+
+    posiciones, velocidades, lineas, zonas = generar_escena(args.objetos, args.lineas, args.zonas)
+    trayectorias = [posiciones + velocidades * f for f in range(args.frames)]
+    ids = list(range(args.objetos))
+    tipos = ['vehiculo'] * args.objetos
+
+    conteo = ConteoEscena(lineas, zonas)
+    tiempos = []
+    for centros in trayectorias:
+        inicio = time.perf_counter()
+        conteo.actualizar(ids, centros, tipos)
+        tiempos.append(time.perf_counter() - inicio)
+
+    cruces, visitas, tiempos_bucle = conteo_bucle(trayectorias, lineas, zonas)
+    iguales = (np.array_equal(conteo.cruces.sum(axis=2), cruces) and np.array_equal(conteo.visitas, visitas))
+
+    print(f"{args.objetos} objetos, {args.lineas} líneas, {args.zonas} zonas, {args.frames} frames")
+    print(f"{'Versión':<14}{'ms/frame':>10}{'p99 ms':>10}")
+    for nombre, t in (('vectorizada', tiempos), ('bucle Python', tiempos_bucle)):
+        p50, p99 = np.percentile(np.array(t) * 1000, [50, 99])
+        print(f"{nombre:<14}{p50:>10.3f}{p99:>10.3f}")
+    print(f"Cruces: {int(cruces.sum())}, visitas a zonas: {int(visitas.sum())}, "
+          f"resultados {'idénticos' if iguales else 'DISTINTOS'}")
+
+
+if __name__ == "__main__":
+    main()
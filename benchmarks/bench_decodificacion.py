@@ -0,0 +1,116 @@
+"""
+Micro-benchmark de la decodificación de salidas de YOLO.
+
+Compara el bucle original fila a fila con la decodificación vectorizada de
+src/detector.py sobre tensores de salida sintéticos y verifica que ambos
+producen exactamente las mismas cajas, confianzas y clases.
+
+Uso:
+    python benchmarks/bench_decodificacion.py --tamano 608 --repeticiones 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detector import decodificar_salidas
+
+CLASES_OBJETIVO = [2, 3, 5, 7, 0]  # car, motorcycle, bus, truck, person
+
+
+def decodificar_bucle(outputs, width, height, target_classes, confidence_threshold):
+    """
+    Implementación de referencia: el bucle fila a fila que usaba Detector.detect
+    """
+    boxes = []
+    confidences = []
+    class_ids = []
+    for output in outputs:
+        for detection in output:
+            scores = detection[5:]
+            class_id = np.argmax(scores)
+            confidence = scores[class_id]
+            if confidence > confidence_threshold and class_id in target_classes:
+                center_x = int(detection[0] * width)
+                center_y = int(detection[1] * height)
+                w_det = int(detection[2] * width)
+                h_det = int(detection[3] * height)
+                x_det = int(center_x - w_det / 2)
+                y_det = int(center_y - h_det / 2)
+                boxes.append([x_det, y_det, w_det, h_det])
+                confidences.append(float(confidence))
+                class_ids.append(class_id)
+    return boxes, confidences, class_ids
+
+
+def generar_salidas(tamano, num_clases=80, proporcion_positivos=0.01, semilla=0):
+    """
+    Genera tensores con la misma forma que las tres cabezas de YOLOv4
+    (rejillas de tamano/8, tamano/16 y tamano/32 con 3 anclas cada una)
+    """
+    rng = np.random.default_rng(semilla)
+    outputs = []
+    for paso in (8, 16, 32):
+        filas = (tamano // paso) ** 2 * 3
+        salida = np.zeros((filas, 5 + num_clases), dtype=np.float32)
+        salida[:, 0:2] = rng.random((filas, 2), dtype=np.float32)
+        salida[:, 2:4] = rng.random((filas, 2), dtype=np.float32) * 0.3
+        # La mayoría de filas tienen puntuaciones bajas, como en una escena real
+        salida[:, 5:] = rng.random((filas, num_clases), dtype=np.float32) * 0.1
+        positivos = rng.random(filas) < proporcion_positivos
+        clases = rng.integers(0, num_clases, size=filas)
+        salida[positivos, 5 + clases[positivos]] = rng.uniform(0.3, 1.0, positivos.sum())
+        salida[:, 4] = salida[:, 5:].max(axis=1)
+        outputs.append(salida)
+    return outputs
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return float(np.median(tiempos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la decodificación de salidas de YOLO')
+    parser.add_argument('--tamano', type=int, default=608, help='Tamaño de entrada de la red (por defecto: 608)')
+    parser.add_argument('--ancho', type=int, default=640, help='Ancho del frame (por defecto: 640)')
+    parser.add_argument('--alto', type=int, default=360, help='Alto del frame (por defecto: 360)')
+    parser.add_argument('--umbral', type=float, default=0.4, help='Umbral de confianza (por defecto: 0.4)')
+    parser.add_argument('--repeticiones', type=int, default=20, help='Repeticiones por medición (por defecto: 20)')
+    args = parser.parse_args()
+
+    outputs = generar_salidas(args.tamano)
+    filas = sum(len(o) for o in outputs)
+
+    mascara = np.zeros(80, dtype=bool)
+    mascara[CLASES_OBJETIVO] = True
+
+    # Verificar que ambas implementaciones coinciden
+    ref_boxes, ref_conf, ref_ids = decodificar_bucle(outputs, args.ancho, args.alto, CLASES_OBJETIVO, args.umbral)
+    boxes, conf, ids = decodificar_salidas(outputs, args.ancho, args.alto, mascara, args.umbral)
+    assert boxes.tolist() == ref_boxes, "Las cajas no coinciden"
+    assert conf.tolist() == ref_conf, "Las confianzas no coinciden"
+    assert ids.tolist() == ref_ids, "Las clases no coinciden"
+
+    t_bucle = medir(lambda: decodificar_bucle(outputs, args.ancho, args.alto, CLASES_OBJETIVO, args.umbral),
+                    args.repeticiones)
+    t_vector = medir(lambda: decodificar_salidas(outputs, args.ancho, args.alto, mascara, args.umbral),
+                     args.repeticiones)
+
+    print(f"Filas de salida: {filas} ({len(ref_boxes)} detecciones tras el filtro)")
+    print(f"Bucle Python:  {t_bucle * 1000:.2f} ms")
+    print(f"Vectorizado:   {t_vector * 1000:.2f} ms")
+    print(f"Aceleración:   {t_bucle / t_vector:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
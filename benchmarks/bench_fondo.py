@@ -0,0 +1,155 @@
+"""
+Benchmark de la detección por sustracción de fondo con ruido de lluvia.
+
+Genera una escena sintética con vehículos (rectángulos) en movimiento y, en
+cada frame, cientos o miles de gotas: manchas diminutas que el sustractor
+marca como primer plano. Compara el filtrado original de main.py (un bucle en
+Python con cv2.contourArea y cv2.boundingRect por contorno) con DetectorFondo
+(cv2.connectedComponentsWithStats, con y sin apertura morfológica). Muestra
+la latencia por frame, las manchas por frame y las cajas encontradas.
+
+Con --escalas compara en cambio el modelo de fondo a varias escalas, en color
+y en gris: tiempo de CPU y latencia por frame frente a la recuperación de los
+vehículos (proporción de cajas reales con una detección de IoU >= 0.5).
+
+Uso:
+    python benchmarks/bench_fondo.py --gotas 3000 --frames 200
+    python benchmarks/bench_fondo.py --escalas 1,0.5,0.33,0.25 --gotas 500 --ancho 1280 --alto 720
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detector_fondo import DetectorFondo
+from src.rastreador import calcular_iou
+
+
+def generar_frames(num_frames, gotas, ancho=640, alto=360, semilla=0):
+    """
+    Genera los frames de la escena uno a uno (siempre los mismos para una semilla)
+
+    Returns:
+        Generador de tuplas (frame, cajas reales visibles)
+    """
+    rng = np.random.default_rng(semilla)
+    fondo = cv2.GaussianBlur(rng.integers(60, 120, size=(alto, ancho, 3), dtype=np.uint8), (9, 9), 0)
+    # Vehículos proporcionales al frame: 70x40 en 640x360
+    w, h = ancho * 70 // 640, alto * 40 // 360
+    carriles = np.linspace(alto // 9, alto - 2 * h, 5).astype(int)
+    velocidades = rng.uniform(3, 8, len(carriles)) * ancho / 640
+    for f in range(num_frames):
+        frame = fondo.copy()
+        cajas = []
+        for carril, v in zip(carriles, velocidades):
+            x = int(v * f) % (ancho + w) - w
+            cv2.rectangle(frame, (x, carril), (x + w - 1, carril + h - 1), (230, 230, 230), -1)
+            x0, x1 = max(x, 0), min(x + w, ancho)
+            if x1 - x0 >= w // 2:
+                cajas.append((x0, carril, x1 - x0, h))
+        xs = rng.integers(0, ancho - 2, gotas)
+        ys = rng.integers(0, alto - 3, gotas)
+        for dy in range(3):
+            frame[ys + dy, xs] = 255
+            frame[ys + dy, xs + 1] = 255
+        yield frame, cajas
+
+
+class DetectorContornos:
+    """
+    Detección original de main.py: un contorno cada vez en Python
+    """
+
+    def __init__(self):
+        self.sustractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=30, detectShadows=True)
+        self.manchas = 0
+
+    def detect(self, frame, roi=None):
+        mascara = self.sustractor.apply(frame)
+        _, mascara = cv2.threshold(mascara, 254, 255, cv2.THRESH_BINARY)
+        contornos, _ = cv2.findContours(mascara, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        self.manchas += len(contornos)
+        boxes = []
+        for contorno in contornos:
+            if cv2.contourArea(contorno) > 800:
+                boxes.append(cv2.boundingRect(contorno))
+        return boxes, ['vehiculo'] * len(boxes), 0
+
+
+def medir(detector, args):
+    """
+    Ejecuta un detector sobre la escena
+
+    Returns:
+        Tupla (tiempos por frame en segundos, cajas por frame, tiempo de CPU
+        por frame en segundos, recuperación)
+    """
+    tiempos = []
+    cajas = 0
+    cpu = 0.0
+    encontradas = reales = 0
+    for frame, verdad in generar_frames(args.frames, args.gotas, args.ancho, args.alto):
+        inicio_cpu = time.process_time()
+        inicio = time.perf_counter()
+        boxes, _, _ = detector.detect(frame)
+        tiempos.append(time.perf_counter() - inicio)
+        cpu += time.process_time() - inicio_cpu
+        cajas += len(boxes)
+        reales += len(verdad)
+        if boxes and verdad:
+            encontradas += int((calcular_iou(verdad, boxes).max(axis=1) >= 0.5).sum())
+    return tiempos, cajas / args.frames, cpu / args.frames, encontradas / max(reales, 1)
+
+
+def comparar_escalas(args):
+    """
+    Compara el modelo de fondo a varias escalas, en color y en gris
+    """
+    escalas = [float(e) for e in args.escalas.split(',')]
+    print(f"{args.frames} frames {args.ancho}x{args.alto}, {args.gotas} gotas por frame")
+    print(f"{'Escala':>8}{'Gris':>6}{'CPU ms':>9}{'p50 ms':>9}{'p99 ms':>9}{'recuperación':>14}")
+    for escala in escalas:
+        for gris in (False, True):
+            tiempos, _, cpu, recuperacion = medir(DetectorFondo(escala=escala, gris=gris), args)
+            p50, p99 = np.percentile(np.array(tiempos) * 1000, [50, 99])
+            print(f"{escala:>8.2f}{'sí' if gris else 'no':>6}{cpu * 1000:>9.2f}{p50:>9.2f}{p99:>9.2f}"
+                  f"{recuperacion:>14.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la detección por sustracción de fondo con ruido')
+    parser.add_argument('--frames', type=int, default=200, help='Frames de la escena (por defecto: 200)')
+    parser.add_argument('--gotas', type=int, default=3000, help='Gotas de lluvia por frame (por defecto: 3000)')
+    parser.add_argument('--ancho', type=int, default=640, help='Ancho de los frames (por defecto: 640)')
+    parser.add_argument('--alto', type=int, default=360, help='Alto de los frames (por defecto: 360)')
+    parser.add_argument('--escalas', type=str, default=None,
+                        help='Escalas del modelo de fondo a comparar, separadas por comas (ej: 1,0.5,0.25)')
+    args = parser.parse_args()
+
+    if args.escalas:
+        comparar_escalas(args)
+        return
+
+    contornos = DetectorContornos()
+    versiones = [
+        ('contornos', contornos),
+        ('componentes', DetectorFondo()),
+        ('componentes+apertura 3', DetectorFondo(apertura=3)),
+    ]
+    print(f"{args.frames} frames {args.ancho}x{args.alto}, {args.gotas} gotas por frame")
+    print(f"{'Versión':<24}{'p50 ms':>9}{'p99 ms':>9}{'cajas/frame':>13}")
+    for nombre, detector in versiones:
+        tiempos, cajas, _, _ = medir(detector, args)
+        p50, p99 = np.percentile(np.array(tiempos) * 1000, [50, 99])
+        print(f"{nombre:<24}{p50:>9.2f}{p99:>9.2f}{cajas:>13.2f}")
+    print(f"Manchas por frame en la máscara: {contornos.manchas / args.frames:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark de la ingesta asíncrona con fuentes simuladas.
+
+Reproduce varias copias de un clip en bucle y en tiempo real, como si fueran
+cámaras, y las consume con un consumidor más lento que las fuentes. Compara la
+antigüedad de los frames procesados (latencia desde la captura) guardando solo
+el último frame de cada fuente frente a una cola que no descarta nada. Con el
+último frame la latencia se mantiene acotada; con la cola crece mientras dura
+la prueba.
+
+Sin --input se genera un clip sintético.
+
+Uso:
+    python benchmarks/bench_ingesta.py --fuentes 8 --consumo-ms 20 --duracion 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.ingesta import FuenteAsincrona, IngestaAsincrona
+
+
+def generar_clip(ruta, num_frames=100, ancho=640, alto=360):
+    """
+    Genera un clip sintético con un rectángulo en movimiento
+    """
+    escritor = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*'MJPG'), 25, (ancho, alto))
+    for f in range(num_frames):
+        frame = np.full((alto, ancho, 3), 60, dtype=np.uint8)
+        x = (f * 6) % ancho
+        cv2.rectangle(frame, (x, 150), (x + 70, 185), (220, 220, 220), -1)
+        escritor.write(frame)
+    escritor.release()
+
+
+async def medir(ruta, num_fuentes, solo_ultimo, consumo, duracion):
+    """
+    Consume las fuentes durante `duracion` segundos
+
+    Returns:
+        Tupla (latencias en ms, frames procesados, frames leídos, frames descartados)
+    """
+    fuentes = [FuenteAsincrona(ruta, nombre=f"cam{i}", en_vivo=solo_ultimo, tiempo_real=True,
+                               tam_cola=100000) for i in range(num_fuentes)]
+    ingesta = IngestaAsincrona(fuentes)
+    ingesta.iniciar()
+
+    latencias = []
+    inicio = time.monotonic()
+    async for fuente, frame in ingesta.frames():
+        # Consumidor lento: simula la inferencia (bloquea el bucle como lo haría la red)
+        time.sleep(consumo)
+        latencias.append((time.monotonic() - fuente.instante_frame) * 1000)
+        await asyncio.sleep(0)
+        if time.monotonic() - inicio > duracion:
+            break
+    await ingesta.detener()
+    return (latencias, len(latencias), sum(f.frames_leidos for f in fuentes),
+            sum(f.frames_descartados for f in fuentes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la ingesta asíncrona')
+    parser.add_argument('--input', type=str, default='', help='Clip a reproducir en bucle (por defecto: clip sintético)')
+    parser.add_argument('--fuentes', type=int, default=8, help='Número de fuentes simuladas (por defecto: 8)')
+    parser.add_argument('--consumo-ms', type=float, default=20,
+                        help='Tiempo de proceso por frame del consumidor en ms (por defecto: 20)')
+    parser.add_argument('--duracion', type=float, default=10, help='Duración de cada prueba en segundos (por defecto: 10)')
+    args = parser.parse_args()
+
+    ruta = args.input
+    if not ruta:
+        ruta = os.path.join(tempfile.mkdtemp(), 'clip_sintetico.avi')
+        generar_clip(ruta)
+
+    print(f"{args.fuentes} fuentes en bucle, consumidor de {args.consumo_ms:.0f} ms/frame, {args.duracion:.0f} s")
+    print(f"{'Modo':<16}{'Procesados':>11}{'Leídos':>9}{'Descart.':>10}{'p50 ms':>9}{'p99 ms':>9}{'Máx. ms':>9}")
+    for nombre, solo_ultimo in (('último frame', True), ('cola completa', False)):
+        latencias, procesados, leidos, descartados = asyncio.run(
+            medir(ruta, args.fuentes, solo_ultimo, args.consumo_ms / 1000, args.duracion))
+        p50, p99, maximo = np.percentile(latencias, [50, 99, 100]) if latencias else (0, 0, 0)
+        print(f"{nombre:<16}{procesados:>11}{leidos:>9}{descartados:>10}{p50:>9.1f}{p99:>9.1f}{maximo:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
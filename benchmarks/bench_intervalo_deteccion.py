@@ -0,0 +1,152 @@
+"""
+Benchmark del modo --detect-interval: ganancia de FPS frente a deriva.
+
+Procesa un clip de referencia detectando en todos los frames (intervalo 1)
+y después detectando solo cada N frames con propagación por flujo óptico o
+por modelo de movimiento. Para cada configuración informa de los FPS, los
+conteos del rastreador y la deriva respecto a la referencia: proporción de
+cajas de referencia recuperadas con IoU >= 0.5 y su IoU media.
+
+Usa YOLO si los modelos están en models/; si no, sustracción de fondo. Sin
+--input se genera un clip sintético con rectángulos en movimiento.
+
+Uso:
+    python benchmarks/bench_intervalo_deteccion.py --input clip.mp4 --intervalos 1,2,3,5
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detector import Detector
+from src.detector_fondo import DetectorFondo
+from src.propagacion import SeguimientoIntermitente
+from src.rastreador import Rastreador, calcular_iou, resolver_asignacion
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models'))
+
+
+def generar_clip(ruta, num_frames=300, ancho=640, alto=360, num_objetos=6, semilla=0):
+    """
+    Genera un clip sintético con rectángulos que cruzan la imagen
+    """
+    rng = np.random.default_rng(semilla)
+    carriles = np.linspace(40, alto - 60, num_objetos)
+    velocidades = rng.uniform(3, 9, num_objetos)
+    salidas = rng.uniform(0, ancho, num_objetos)
+    escritor = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*'MJPG'), 25, (ancho, alto))
+    for f in range(num_frames):
+        frame = np.full((alto, ancho, 3), 60, dtype=np.uint8)
+        for carril, v, x0 in zip(carriles, velocidades, salidas):
+            x = int((x0 + v * f) % (ancho + 80)) - 80
+            cv2.rectangle(frame, (x, int(carril)), (x + 70, int(carril) + 35), (220, 220, 220), -1)
+        escritor.write(frame)
+    escritor.release()
+
+
+def crear_detector():
+    """
+    Devuelve una función frame -> (boxes, tipos) y el nombre del detector
+    """
+    for nombre in ('yolov4-tiny', 'yolov4'):
+        pesos = os.path.join(MODELS_DIR, f'{nombre}.weights')
+        cfg = os.path.join(MODELS_DIR, f'{nombre}.cfg')
+        clases = os.path.join(MODELS_DIR, 'coco.names')
+        if all(os.path.exists(p) for p in (pesos, cfg, clases)):
+            detector = Detector(yolo_weights=pesos, yolo_cfg=cfg, coco_names=clases)
+            return (lambda frame: detector.detect(frame)[:2]), nombre
+
+    detector_fondo = DetectorFondo()
+    return (lambda frame: detector_fondo.detect(frame)[:2]), 'sustraccion de fondo'
+
+
+def procesar(ruta, intervalo, propagacion, parametros_rastreador):
+    """
+    Procesa el clip y devuelve las cajas por frame, los contadores y el tiempo
+    """
+    detectar, _ = crear_detector()
+    rastreador = Rastreador(**parametros_rastreador)
+    seguimiento = SeguimientoIntermitente(rastreador, intervalo=intervalo, propagacion=propagacion)
+
+    cap = cv2.VideoCapture(ruta)
+    cajas_por_frame = []
+    tiempo = 0.0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        inicio = time.perf_counter()
+        deteccion = detectar(frame) if seguimiento.frames_a_detectar(1) else None
+        objetos = seguimiento.procesar(frame, deteccion)
+        tiempo += time.perf_counter() - inicio
+        cajas_por_frame.append([obj[1:5] for obj in objetos])
+    cap.release()
+    return cajas_por_frame, dict(rastreador.get_contadores()), tiempo
+
+
+def comparar(referencia, estimadas, iou_minimo=0.5):
+    """
+    Compara las cajas frame a frame con la referencia
+
+    Returns:
+        Tupla (recuperacion, iou_media)
+    """
+    total = 0
+    recuperadas = 0
+    ious = []
+    for ref, est in zip(referencia, estimadas):
+        total += len(ref)
+        if not ref or not est:
+            continue
+        iou = calcular_iou(ref, est)
+        for f, c in resolver_asignacion(1.0 - iou, 1.0 - iou_minimo + 1e-9):
+            recuperadas += 1
+            ious.append(iou[f, c])
+    recuperacion = recuperadas / total if total else 1.0
+    return recuperacion, float(np.mean(ious)) if ious else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de detección cada N frames')
+    parser.add_argument('--input', type=str, default='', help='Clip de referencia (por defecto: clip sintético)')
+    parser.add_argument('--intervalos', type=str, default='1,2,3,5', help='Intervalos a probar (por defecto: 1,2,3,5)')
+    args = parser.parse_args()
+
+    ruta = args.input
+    if not ruta:
+        ruta = os.path.join(tempfile.mkdtemp(), 'clip_sintetico.avi')
+        generar_clip(ruta)
+
+    _, nombre_detector = crear_detector()
+    print(f"Detector: {nombre_detector}")
+
+    intervalos = [int(i) for i in args.intervalos.split(',')]
+    referencia, contadores_ref, tiempo_ref = procesar(ruta, 1, 'flujo', {})
+    fps_ref = len(referencia) / tiempo_ref
+
+    print(f"{'Configuración':<34}{'FPS':>9}{'Ganancia':>10}{'Recup.':>9}{'IoU':>7}  Conteos")
+    print(f"{'intervalo 1 (referencia)':<34}{fps_ref:>9.1f}{'1.00x':>10}{1.0:>9.2f}{1.0:>7.2f}  {contadores_ref}")
+    configuraciones = [
+        ('flujo', {}),
+        ('movimiento', dict(modo_asignacion='hungaro', modelo_movimiento='kalman')),
+    ]
+    for intervalo in intervalos:
+        if intervalo == 1:
+            continue
+        for propagacion, parametros in configuraciones:
+            cajas, contadores, tiempo = procesar(ruta, intervalo, propagacion, parametros)
+            fps = len(cajas) / tiempo
+            recuperacion, iou = comparar(referencia, cajas)
+            nombre = f"intervalo {intervalo} ({propagacion})"
+            print(f"{nombre:<34}{fps:>9.1f}{fps / fps_ref:>9.2f}x{recuperacion:>9.2f}{iou:>7.2f}  {contadores}")
+
+
+if __name__ == "__main__":
+    main()
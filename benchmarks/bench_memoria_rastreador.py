@@ -0,0 +1,92 @@
+"""
+Prueba de resistencia (soak) de la memoria del rastreador.
+
+Simula una vía con tráfico continuo durante millones de frames: en todo
+momento hay unos pocos objetos en escena, cada uno la cruza en unos cientos de
+frames y al salir entra otro nuevo. Periódicamente muestra la memoria
+residente (RSS) del proceso, los objetos terminados y los activos. La memoria
+debe estabilizarse tras el arranque aunque el número de objetos terminados
+crezca sin límite, porque sus resúmenes se entregan al sumidero y se olvidan.
+
+Uso:
+    python benchmarks/bench_memoria_rastreador.py --frames 2000000 --objetos 4
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.rastreador import Rastreador
+from src.pistas import SumideroMemoria
+
+
+def memoria_residente():
+    """
+    Devuelve la memoria residente actual del proceso en MB (0 si no se puede medir)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        import resource
+        # En macOS ru_maxrss está en bytes; en Linux en KB. Es el máximo, no el actual
+        maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maximo / 2**20 if sys.platform == 'darwin' else maximo / 2**10
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de resistencia de la memoria del rastreador')
+    parser.add_argument('--frames', type=int, default=2000000, help='Frames a simular (por defecto: 2000000)')
+    parser.add_argument('--objetos', type=int, default=4, help='Objetos en escena a la vez (por defecto: 4)')
+    parser.add_argument('--recorrido', type=int, default=300,
+                        help='Frames que tarda cada objeto en cruzar la escena (por defecto: 300)')
+    parser.add_argument('--informe', type=int, default=200000, help='Frames entre informes (por defecto: 200000)')
+    parser.add_argument('--tolerancia-mb', type=float, default=5.0,
+                        help='Crecimiento de memoria admitido tras el primer informe, en MB (por defecto: 5)')
+    parser.add_argument('--movimiento', type=str, choices=['ninguno', 'kalman'], default='ninguno',
+                        help='Modelo de movimiento del rastreador (por defecto: ninguno)')
+    args = parser.parse_args()
+
+    rastreador = Rastreador(modelo_movimiento=None if args.movimiento == 'ninguno' else args.movimiento,
+                            sumidero=SumideroMemoria(max_pistas=1000))
+    # Cada objeto recorre la escena de izquierda a derecha en su propio carril,
+    # desfasado respecto a los demás para que no entren todos a la vez
+    carriles = 40 + 60 * np.arange(args.objetos)
+    desfases = (np.arange(args.objetos) * args.recorrido) // args.objetos
+    velocidad = 600.0 / args.recorrido
+
+    print(f"{args.frames} frames, {args.objetos} objetos a la vez, {args.recorrido} frames por objeto")
+    print(f"{'Frames':>10}{'Terminados':>12}{'Activos':>9}{'RSS MB':>9}{'µs/frame':>10}")
+    rss_inicial = None
+    rss = memoria_residente()
+    inicio = time.perf_counter()
+    ultimo = inicio
+    for f in range(1, args.frames + 1):
+        fase = (f + desfases) % args.recorrido
+        xs = (20 + fase * velocidad).astype(int)
+        boxes = [(x, y, 30, 20) for x, y in zip(xs.tolist(), carriles.tolist())]
+        # Al reiniciar su recorrido el objeto aparece lejos: es un objeto nuevo
+        rastreador.actualizar(boxes, ['vehiculo'] * len(boxes))
+
+        if f % args.informe == 0:
+            ahora = time.perf_counter()
+            rss = memoria_residente()
+            if rss_inicial is None:
+                rss_inicial = rss
+            print(f"{f:>10}{rastreador.pistas_terminadas:>12}{len(rastreador.pistas):>9}{rss:>9.1f}"
+                  f"{(ahora - ultimo) / args.informe * 1e6:>10.1f}")
+            ultimo = ahora
+
+    crecimiento = rss - rss_inicial if rss_inicial is not None else 0.0
+    print(f"Tiempo total: {time.perf_counter() - inicio:.1f} s")
+    print(f"Crecimiento de memoria tras el primer informe: {crecimiento:.1f} MB "
+          f"({'estable' if crecimiento <= args.tolerancia_mb else 'CRECE'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark del rastreador con cientos de objetos simultáneos.
+
+Genera una escena sintética densa con trayectorias conocidas y compara la
+asignación voraz original con la asignación óptima (húngara) en tiempo por
+frame, IDs duplicados dentro de un mismo frame y error de conteo frente al
+número real de objetos. El benchmark termina con error si el conteo de algún
+modo húngaro se aleja del real más de la tolerancia indicada (--tolerancia),
+para detectar métricas que dejan de seguir a los objetos.
+
+Con --escalado se mide el tiempo por frame para varios números de objetos (una
+escena de peatones): con la rejilla espacial del rastreador, el coste por
+objeto debe mantenerse casi constante al pasar de decenas a cientos de objetos.
+
+Uso:
+    python benchmarks/bench_rastreador.py --objetos 300 --frames 200
+    python benchmarks/bench_rastreador.py --escalado 100,200,400,800 --frames 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.rastreador import Rastreador
+
+
+def generar_escena(num_objetos, num_frames, ancho=1920, alto=1080, velocidad=6.0,
+                   prob_deteccion=0.9, semilla=0, tipo='vehiculo'):
+    """
+    Genera detecciones sintéticas de objetos con movimiento rectilíneo
+
+    Returns:
+        Lista de tuplas (boxes, tipos) por frame y número real de objetos
+    """
+    rng = np.random.default_rng(semilla)
+    posiciones = rng.uniform([0, 0], [ancho, alto], size=(num_objetos, 2))
+    velocidades = rng.uniform(-velocidad, velocidad, size=(num_objetos, 2))
+    tamanos = rng.integers(15, 40, size=(num_objetos, 2))
+
+    frames = []
+    for _ in range(num_frames):
+        posiciones = posiciones + velocidades
+        # Rebote en los bordes para mantener la densidad constante
+        fuera = (posiciones < 0) | (posiciones > [ancho, alto])
+        velocidades[fuera] *= -1
+        visibles = rng.random(num_objetos) < prob_deteccion
+        boxes = [(int(x), int(y), int(w), int(h))
+                 for (x, y), (w, h), v in zip(posiciones, tamanos, visibles) if v]
+        frames.append((boxes, [tipo] * len(boxes)))
+    return frames, num_objetos
+
+
+def ejecutar(rastreador, frames):
+    """
+    Ejecuta el rastreador sobre la escena y mide su comportamiento
+    """
+    tiempos = []
+    duplicados = 0
+    for boxes, tipos in frames:
+        inicio = time.perf_counter()
+        objetos = rastreador.actualizar(boxes, tipos)
+        tiempos.append(time.perf_counter() - inicio)
+        ids = [obj[0] for obj in objetos]
+        duplicados += len(ids) - len(set(ids))
+    return np.array(tiempos), duplicados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de asignación del rastreador')
+    parser.add_argument('--objetos', type=int, default=300, help='Objetos simultáneos (por defecto: 300)')
+    parser.add_argument('--frames', type=int, default=200, help='Número de frames (por defecto: 200)')
+    parser.add_argument('--velocidad', type=float, default=6.0, help='Velocidad máxima en px/frame (por defecto: 6)')
+    parser.add_argument('--tolerancia', type=float, default=0.15,
+                        help='Error de conteo máximo de los modos húngaros, como fracción de los objetos reales '
+                             '(por defecto: 0.15)')
+    parser.add_argument('--escalado', type=str, default='',
+                        help='Lista de números de objetos separados por comas para medir cómo crece el coste')
+    args = parser.parse_args()
+
+    if args.escalado:
+        cantidades = [int(n) for n in args.escalado.split(',')]
+        print(f"Escena de peatones, {args.frames} frames")
+        print(f"{'Objetos':>8}{'Modo':>22}{'ms/frame':>10}{'µs/objeto':>11}")
+        for cantidad in cantidades:
+            frames, _ = generar_escena(cantidad, args.frames, velocidad=args.velocidad, tipo='peaton')
+            for nombre, parametros in (('voraz', dict(modo_asignacion='voraz')),
+                                       ('hungaro (distancia)', dict(modo_asignacion='hungaro'))):
+                tiempos, _ = ejecutar(Rastreador(**parametros), frames)
+                print(f"{cantidad:>8}{nombre:>22}{tiempos.mean() * 1000:>10.2f}"
+                      f"{tiempos.mean() * 1e6 / cantidad:>11.1f}")
+        return
+
+    frames, reales = generar_escena(args.objetos, args.frames, velocidad=args.velocidad)
+
+    configuraciones = [
+        ('voraz', dict(modo_asignacion='voraz')),
+        ('hungaro (distancia)', dict(modo_asignacion='hungaro', metrica='distancia')),
+        ('hungaro (iou)', dict(modo_asignacion='hungaro', metrica='iou')),
+        ('hungaro (combinada)', dict(modo_asignacion='hungaro', metrica='combinada')),
+        ('hungaro + kalman', dict(modo_asignacion='hungaro', modelo_movimiento='kalman')),
+    ]
+
+    print(f"{args.objetos} objetos, {args.frames} frames")
+    print(f"{'Modo':<22}{'ms/frame':>10}{'p99 ms':>10}{'IDs dup.':>10}{'Conteo':>10}{'Error':>10}")
+    fuera_de_tolerancia = []
+    for nombre, parametros in configuraciones:
+        rastreador = Rastreador(**parametros)
+        tiempos, duplicados = ejecutar(rastreador, frames)
+        conteo = rastreador.get_contadores()['vehiculo']
+        print(f"{nombre:<22}{tiempos.mean() * 1000:>10.2f}{np.percentile(tiempos, 99) * 1000:>10.2f}"
+              f"{duplicados:>10}{conteo:>10}{conteo - reales:>+10}")
+        # El modo voraz es la referencia original: cuenta de más por diseño
+        if parametros['modo_asignacion'] == 'hungaro' and abs(conteo - reales) > args.tolerancia * reales:
+            fuera_de_tolerancia.append(nombre)
+
+    if fuera_de_tolerancia:
+        print(f"Error de conteo mayor que {args.tolerancia:.0%} de los objetos reales en: "
+              f"{', '.join(fuera_de_tolerancia)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+Suite de benchmarks reproducible sobre video sintético o grabado.
+
+Genera un clip de tráfico sintético (rectángulos que bajan y suben por
+carriles sobre un fondo fijo) con su verdad conocida: la caja de cada objeto
+en cada frame y los cruces de una línea de conteo horizontal en el centro de
+la imagen. Sobre él mide por separado:
+
+    detector     Detector.detect de YOLO (solo si hay un modelo en models/)
+    mog2         DetectorFondo, la detección por sustracción de fondo de main.py
+    rastreador   Rastreador.actualizar con las cajas reales como detecciones
+                 (no necesita ningún modelo)
+    extremo      Lectura del video, detección (YOLO si hay modelo, si no MOG2),
+                 seguimiento y conteo, como main.py en modo headless
+
+De cada uno informa del rendimiento (frames por segundo), la latencia p50 y
+p99 por frame, la memoria residente máxima (cada benchmark se ejecuta en su
+propio proceso) y, cuando hay verdad, la recuperación de las detecciones y el
+error de conteo en la línea. Con --input se usa un clip grabado para el
+detector, MOG2 y el extremo a extremo (sin medidas de exactitud); el
+rastreador siempre usa la escena sintética.
+
+Los resultados se guardan en JSON (--salida) junto con el commit y las
+versiones, y --comparar muestra la diferencia con una ejecución anterior.
+
+Uso:
+    python benchmarks/bench_suite.py --salida resultados.json
+    python benchmarks/bench_suite.py --solo rastreador,mog2 --frames 300
+    python benchmarks/bench_suite.py --input grabacion.mp4 --salida grabacion.json
+    python benchmarks/bench_suite.py --salida nuevo.json --comparar resultados.json
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detector import Detector
+from src.detector_fondo import DetectorFondo
+from src.rastreador import Rastreador, calcular_iou
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+MODELS_DIR = os.path.join(RAIZ, 'models')
+BENCHMARKS = ('detector', 'mog2', 'rastreador', 'extremo')
+SENTIDOS = ['bajada', 'subida']
+
+
+def generar_trafico(ruta, num_frames=600, ancho=640, alto=360, carriles=8, fps=25, semilla=0):
+    """
+    Escribe un clip sintético de tráfico y devuelve su verdad
+
+    En cada carril circula un objeto cada vez, en sentido descendente en los
+    carriles pares y ascendente en los impares, de modo que los objetos no se
+    solapan y su número y sus cruces de la línea central son exactos.
+
+    Returns:
+        Diccionario con 'cajas' (lista por frame de listas (x, y, w, h)),
+        'objetos' (objetos distintos que aparecen), 'cruces' ({sentido: n}
+        en la línea central) y 'linea' (definición para el rastreador)
+    """
+    rng = np.random.default_rng(semilla)
+    ancho_carril = ancho / carriles
+    linea_y = alto // 2
+    # Fondo fijo con textura para que la sustracción de fondo tenga algo que aprender
+    fondo = cv2.GaussianBlur(rng.integers(60, 120, size=(alto, ancho, 3), dtype=np.uint8), (9, 9), 0)
+    # Estado de cada carril: None si está vacío, o [y, velocidad, w, h, color]
+    ocupantes = [None] * carriles
+    esperas = rng.integers(0, 30, size=carriles).tolist()
+
+    escritor = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*'MJPG'), fps, (ancho, alto))
+    cajas_por_frame = []
+    objetos = 0
+    cruces = {sentido: 0 for sentido in SENTIDOS}
+    for _ in range(num_frames):
+        frame = fondo.copy()
+        cajas = []
+        for c in range(carriles):
+            baja = c % 2 == 0
+            if ocupantes[c] is None:
+                if esperas[c] > 0:
+                    esperas[c] -= 1
+                    continue
+                w = int(ancho_carril * rng.uniform(0.55, 0.75))
+                h = int(rng.integers(30, 60))
+                ocupantes[c] = [float(-h if baja else alto), rng.uniform(2.5, 5.5) * (1 if baja else -1),
+                                w, h, tuple(int(v) for v in rng.integers(150, 256, size=3))]
+                objetos += 1
+            ocupante = ocupantes[c]
+            y_anterior, velocidad, w, h, color = ocupante
+            ocupante[0] += velocidad
+            y = int(ocupante[0])
+            cy_anterior = (2 * int(y_anterior) + h) // 2
+            cy = (2 * y + h) // 2
+            if baja and cy_anterior < linea_y <= cy:
+                cruces['bajada'] += 1
+            elif not baja and cy < linea_y <= cy_anterior:
+                cruces['subida'] += 1
+            if (baja and y >= alto) or (not baja and y + h <= 0):
+                ocupantes[c] = None
+                esperas[c] = int(rng.integers(5, 40))
+                continue
+            x = int(c * ancho_carril + (ancho_carril - w) / 2)
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+            # Caja visible, recortada al frame como la daría un detector
+            y0, y1 = max(y, 0), min(y + h, alto)
+            if y1 - y0 >= 4:
+                cajas.append((x, y0, w, y1 - y0))
+        escritor.write(frame)
+        cajas_por_frame.append(cajas)
+    escritor.release()
+
+    linea = {'nombre': 'centro', 'puntos': [[0, linea_y], [ancho, linea_y]], 'sentidos': SENTIDOS}
+    return {'cajas': cajas_por_frame, 'objetos': objetos, 'cruces': cruces, 'linea': linea}
+
+
+def leer_frames(ruta, max_frames):
+    """
+    Lee el clip frame a frame, reducido a 640x360 si es mayor (como main.py)
+    """
+    cap = cv2.VideoCapture(ruta)
+    leidos = 0
+    while leidos < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame.shape[1] > 640 or frame.shape[0] > 360:
+            frame = cv2.resize(frame, (640, 360))
+        leidos += 1
+        yield frame
+    cap.release()
+
+
+def crear_detector():
+    """
+    Crea el Detector con el mejor modelo disponible, o None si no hay ninguno
+    """
+    for nombre in ('yolov4-tiny', 'yolov4'):
+        pesos = os.path.join(MODELS_DIR, f'{nombre}.weights')
+        cfg = os.path.join(MODELS_DIR, f'{nombre}.cfg')
+        clases = os.path.join(MODELS_DIR, 'coco.names')
+        if all(os.path.exists(p) for p in (pesos, cfg, clases)):
+            return Detector(yolo_weights=pesos, yolo_cfg=cfg, coco_names=clases), nombre
+    return None, None
+
+
+def resumir_tiempos(tiempos):
+    """
+    Rendimiento y latencias de una lista de duraciones por frame (en segundos)
+    """
+    if not tiempos:
+        return {'frames': 0, 'fps': 0.0, 'p50_ms': 0.0, 'p99_ms': 0.0, 'media_ms': 0.0}
+    ms = np.array(tiempos) * 1000
+    p50, p99 = np.percentile(ms, [50, 99])
+    return {'frames': len(tiempos), 'fps': round(len(tiempos) / (ms.sum() / 1000), 2),
+            'p50_ms': round(float(p50), 3), 'p99_ms': round(float(p99), 3),
+            'media_ms': round(float(ms.mean()), 3)}
+
+
+def recuperacion(detecciones, reales, iou_minima=0.5):
+    """
+    Proporción de cajas reales con alguna detección de IoU >= iou_minima
+    """
+    encontradas = total = 0
+    for boxes, cajas in zip(detecciones, reales):
+        total += len(cajas)
+        if boxes and cajas:
+            encontradas += int((calcular_iou(cajas, boxes).max(axis=1) >= iou_minima).sum())
+    return round(encontradas / total, 4) if total else None
+
+
+def exactitud_conteo(rastreador, verdad):
+    """
+    Compara los cruces de la línea central contados por el rastreador con los reales
+    """
+    contados = {sentido: sum(por_tipo.values())
+                for sentido, por_tipo in rastreador.get_conteo()['lineas']['centro'].items()}
+    reales = verdad['cruces']
+    error = sum(abs(contados[s] - reales[s]) for s in SENTIDOS)
+    return {'cruces_reales': reales, 'cruces_contados': contados,
+            'error_conteo': round(error / max(sum(reales.values()), 1), 4),
+            'objetos_reales': verdad['objetos'], 'ids_creados': rastreador.id_contador - 1}
+
+
+def memoria_maxima_mb():
+    """
+    Memoria residente máxima del proceso en MB
+    """
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maximo / 2**20 if sys.platform == 'darwin' else maximo / 2**10, 1)
+
+
+def bench_detector(ruta, max_frames, verdad):
+    detector, nombre = crear_detector()
+    if detector is None:
+        return {'omitido': 'no hay ningún modelo YOLO en models/'}
+    tiempos = []
+    detecciones = []
+    for frame in leer_frames(ruta, max_frames):
+        inicio = time.perf_counter()
+        boxes, _, _ = detector.detect(frame)
+        tiempos.append(time.perf_counter() - inicio)
+        detecciones.append(boxes)
+    resultado = dict(resumir_tiempos(tiempos), modelo=nombre)
+    if verdad is not None:
+        resultado['recuperacion'] = recuperacion(detecciones, verdad['cajas'])
+    return resultado
+
+
+def bench_mog2(ruta, max_frames, verdad):
+    detector = DetectorFondo()
+    tiempos = []
+    detecciones = []
+    for frame in leer_frames(ruta, max_frames):
+        inicio = time.perf_counter()
+        boxes, _, _ = detector.detect(frame)
+        tiempos.append(time.perf_counter() - inicio)
+        detecciones.append(boxes)
+    resultado = resumir_tiempos(tiempos)
+    if verdad is not None:
+        resultado['recuperacion'] = recuperacion(detecciones, verdad['cajas'])
+    return resultado
+
+
+def bench_rastreador(verdad, prob_deteccion=0.95, semilla=0):
+    """
+    Rastreador sobre las cajas reales, perdiendo cada detección con
+    probabilidad 1 - prob_deteccion, con cada combinación de opciones habitual
+    """
+    resultados = {}
+    for modo, movimiento in (('voraz', None), ('hungaro', 'kalman')):
+        rng = np.random.default_rng(semilla)
+        rastreador = Rastreador(modo_asignacion=modo, modelo_movimiento=movimiento, lineas=[verdad['linea']])
+        tiempos = []
+        for cajas in verdad['cajas']:
+            boxes = [caja for caja, visible in zip(cajas, rng.random(len(cajas)) < prob_deteccion) if visible]
+            inicio = time.perf_counter()
+            rastreador.actualizar(boxes, ['vehiculo'] * len(boxes))
+            tiempos.append(time.perf_counter() - inicio)
+        nombre = modo if movimiento is None else f"{modo}_{movimiento}"
+        resultados[nombre] = dict(resumir_tiempos(tiempos), **exactitud_conteo(rastreador, verdad))
+    return resultados
+
+
+def bench_extremo(ruta, max_frames, verdad):
+    detector, nombre = crear_detector()
+    if detector is None:
+        detector = DetectorFondo()
+    lineas = [verdad['linea']] if verdad is not None else None
+    rastreador = Rastreador(lineas=lineas)
+    tiempos = []
+    cap = cv2.VideoCapture(ruta)
+    while len(tiempos) < max_frames:
+        inicio = time.perf_counter()
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame.shape[1] > 640 or frame.shape[0] > 360:
+            frame = cv2.resize(frame, (640, 360))
+        boxes, tipos, _ = detector.detect(frame)
+        rastreador.actualizar(boxes, tipos)
+        tiempos.append(time.perf_counter() - inicio)
+    cap.release()
+    resultado = dict(resumir_tiempos(tiempos), deteccion=nombre or 'mog2')
+    if verdad is not None:
+        resultado.update(exactitud_conteo(rastreador, verdad))
+    return resultado
+
+
+def _ejecutar(nombre, args):
+    """
+    Ejecuta un benchmark y añade la memoria máxima del proceso
+    """
+    funcion = {'detector': bench_detector, 'mog2': bench_mog2,
+               'rastreador': bench_rastreador, 'extremo': bench_extremo}[nombre]
+    resultado = funcion(*args)
+    resultado['memoria_maxima_mb'] = memoria_maxima_mb()
+    return resultado
+
+
+def ejecutar_aislado(nombre, args):
+    """
+    Ejecuta un benchmark en un proceso nuevo, para que su memoria máxima sea solo la suya
+    """
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(_ejecutar, (nombre, args))
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def filas_resultado(resultados):
+    """
+    Aplana los resultados en filas (nombre, resultado) con rendimiento medido
+    """
+    for nombre, resultado in resultados.items():
+        if nombre == 'rastreador':
+            for variante, sub in resultado.items():
+                if isinstance(sub, dict):
+                    yield f"rastreador_{variante}", dict(sub, memoria_maxima_mb=resultado['memoria_maxima_mb'])
+        elif 'fps' in resultado:
+            # El extremo a extremo solo es comparable con el mismo método de detección
+            yield (f"{nombre}_{resultado['deteccion']}" if 'deteccion' in resultado else nombre), resultado
+
+
+def mostrar(resultados, anteriores=None):
+    """
+    Muestra la tabla de resultados y, si se dan, el cambio respecto a una ejecución anterior
+    """
+    previas = dict(filas_resultado(anteriores)) if anteriores else {}
+    print(f"\n{'Benchmark':<28}{'FPS':>10}{'p50 ms':>10}{'p99 ms':>10}{'RSS MB':>9}{'Recup.':>8}{'Err. conteo':>13}")
+    for nombre, r in filas_resultado(resultados):
+        recup = r.get('recuperacion')
+        error = r.get('error_conteo')
+        print(f"{nombre:<28}{r['fps']:>10.1f}{r['p50_ms']:>10.3f}{r['p99_ms']:>10.3f}{r['memoria_maxima_mb']:>9.1f}"
+              f"{'-' if recup is None else f'{recup:.3f}':>8}{'-' if error is None else f'{error:.3f}':>13}")
+        if nombre in previas and previas[nombre]['fps'] > 0:
+            p = previas[nombre]
+            print(f"{'  anterior':<28}{p['fps']:>10.1f}{p['p50_ms']:>10.3f}{p['p99_ms']:>10.3f}"
+                  f"{p.get('memoria_maxima_mb', 0):>9.1f}   ({r['fps'] / p['fps']:.2f}x)")
+    for nombre, resultado in resultados.items():
+        if 'omitido' in resultado:
+            print(f"{nombre:<28}omitido: {resultado['omitido']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite de benchmarks sobre video sintético o grabado')
+    parser.add_argument('--input', type=str, default=None,
+                        help='Clip grabado para detector, MOG2 y extremo a extremo (por defecto: sintético)')
+    parser.add_argument('--frames', type=int, default=600, help='Frames a procesar (por defecto: 600)')
+    parser.add_argument('--carriles', type=int, default=8, help='Carriles de la escena sintética (por defecto: 8)')
+    parser.add_argument('--semilla', type=int, default=0, help='Semilla de la escena sintética (por defecto: 0)')
+    parser.add_argument('--solo', type=str, default=','.join(BENCHMARKS),
+                        help=f"Benchmarks a ejecutar, separados por comas (por defecto: {','.join(BENCHMARKS)})")
+    parser.add_argument('--salida', type=str, default=None, help='Archivo JSON donde guardar los resultados')
+    parser.add_argument('--comparar', type=str, default=None, help='Archivo JSON de una ejecución anterior')
+    args = parser.parse_args()
+
+    elegidos = [nombre.strip() for nombre in args.solo.split(',') if nombre.strip()]
+    desconocidos = [nombre for nombre in elegidos if nombre not in BENCHMARKS]
+    if desconocidos:
+        parser.error(f"Benchmarks desconocidos: {', '.join(desconocidos)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sintetico = os.path.join(tmp, 'trafico.avi')
+        inicio = time.perf_counter()
+        verdad = generar_trafico(sintetico, num_frames=args.frames, carriles=args.carriles, semilla=args.semilla)
+        print(f"Escena sintética: {args.frames} frames, {verdad['objetos']} objetos, "
+              f"cruces {verdad['cruces']} ({time.perf_counter() - inicio:.1f} s)")
+        if args.input:
+            ruta, verdad_clip = args.input, None
+        else:
+            ruta, verdad_clip = sintetico, verdad
+
+        resultados = {}
+        for nombre in BENCHMARKS:
+            if nombre not in elegidos:
+                continue
+            print(f"Ejecutando {nombre}...")
+            parametros = (verdad,) if nombre == 'rastreador' else (ruta, args.frames, verdad_clip)
+            resultados[nombre] = ejecutar_aislado(nombre, parametros)
+
+    anteriores = None
+    if args.comparar:
+        with open(args.comparar) as f:
+            anteriores = json.load(f)['resultados']
+    mostrar(resultados, anteriores)
+
+    if args.salida:
+        informe = {
+            'commit': commit_actual(),
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count(),
+            'parametros': {'input': args.input, 'frames': args.frames, 'carriles': args.carriles,
+                           'semilla': args.semilla},
+            'resultados': resultados,
+        }
+        with open(args.salida, 'w') as f:
+            json.dump(informe, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
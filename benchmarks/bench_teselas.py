@@ -0,0 +1,159 @@
+"""
+Benchmark de la inferencia por teselas (--teselas) en video de alta resolución.
+
+Compara la detección sobre el frame reducido a 640x360 (comportamiento por
+defecto de main.py), sobre el frame completo y por teselas de varios tamaños.
+Para cada configuración informa de la latencia media por frame, las
+detecciones por frame y la recuperación respecto a la referencia, que es la
+teselación más fina: proporción de sus cajas encontradas con IoU >= 0.5.
+
+Necesita un modelo YOLO en models/. Sin --input se genera un clip sintético
+1920x1080, útil solo para medir latencias.
+
+Uso:
+    python benchmarks/bench_teselas.py --input clip_1080p.mp4 --tamanos 1280,960,640,480 --frames 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detector import Detector, generar_teselas
+from src.rastreador import calcular_iou, resolver_asignacion
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models'))
+
+
+def generar_clip(ruta, num_frames=50, ancho=1920, alto=1080, num_objetos=12, semilla=0):
+    """
+    Genera un clip sintético de alta resolución con objetos pequeños en movimiento
+    """
+    rng = np.random.default_rng(semilla)
+    carriles = np.linspace(60, alto - 80, num_objetos)
+    velocidades = rng.uniform(4, 12, num_objetos)
+    salidas = rng.uniform(0, ancho, num_objetos)
+    escritor = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*'MJPG'), 25, (ancho, alto))
+    for f in range(num_frames):
+        frame = np.full((alto, ancho, 3), 60, dtype=np.uint8)
+        for carril, v, x0 in zip(carriles, velocidades, salidas):
+            x = int((x0 + v * f) % (ancho + 40)) - 40
+            cv2.rectangle(frame, (x, int(carril)), (x + 36, int(carril) + 20), (220, 220, 220), -1)
+        escritor.write(frame)
+    escritor.release()
+
+
+def crear_detector():
+    """
+    Crea el Detector con el mejor modelo disponible, o None si no hay ninguno
+    """
+    for nombre in ('yolov4-tiny', 'yolov4'):
+        pesos = os.path.join(MODELS_DIR, f'{nombre}.weights')
+        cfg = os.path.join(MODELS_DIR, f'{nombre}.cfg')
+        clases = os.path.join(MODELS_DIR, 'coco.names')
+        if all(os.path.exists(p) for p in (pesos, cfg, clases)):
+            return Detector(yolo_weights=pesos, yolo_cfg=cfg, coco_names=clases), nombre
+    return None, None
+
+
+def detectar_reducido(detector, frame):
+    """
+    Detecta sobre el frame reducido a 640x360 y devuelve las cajas a escala original
+    """
+    alto, ancho = frame.shape[:2]
+    boxes, _, _ = detector.detect(cv2.resize(frame, (640, 360)))
+    fx, fy = ancho / 640, alto / 360
+    return [(int(x * fx), int(y * fy), int(w * fx), int(h * fy)) for x, y, w, h in boxes]
+
+
+def procesar(frames, detectar):
+    """
+    Ejecuta una configuración sobre todos los frames
+
+    Returns:
+        Tupla (cajas_por_frame, latencia_media_ms)
+    """
+    cajas_por_frame = []
+    inicio = time.perf_counter()
+    for frame in frames:
+        cajas_por_frame.append(detectar(frame))
+    return cajas_por_frame, (time.perf_counter() - inicio) * 1000 / len(frames)
+
+
+def recuperacion(referencia, estimadas, iou_minimo=0.5):
+    """
+    Proporción de cajas de referencia encontradas con IoU >= iou_minimo
+    """
+    total = sum(len(ref) for ref in referencia)
+    if total == 0:
+        return 1.0
+    recuperadas = 0
+    for ref, est in zip(referencia, estimadas):
+        if ref and est:
+            iou = calcular_iou(ref, est)
+            recuperadas += len(resolver_asignacion(1.0 - iou, 1.0 - iou_minimo + 1e-9))
+    return recuperadas / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la inferencia por teselas')
+    parser.add_argument('--input', type=str, default='', help='Clip de alta resolución (por defecto: clip sintético 1080p)')
+    parser.add_argument('--tamanos', type=str, default='1280,960,640,480',
+                        help='Tamaños de tesela a probar en píxeles (por defecto: 1280,960,640,480)')
+    parser.add_argument('--solape', type=float, default=0.2, help='Solape entre teselas (por defecto: 0.2)')
+    parser.add_argument('--frames', type=int, default=50, help='Número máximo de frames (por defecto: 50)')
+    args = parser.parse_args()
+
+    detector, nombre_detector = crear_detector()
+    if detector is None:
+        print("No se encontraron modelos YOLO en models/. Ejecuta primero tools/descargar_modelos.py")
+        return
+    print(f"Detector: {nombre_detector}")
+
+    ruta = args.input
+    if not ruta:
+        ruta = os.path.join(tempfile.mkdtemp(), 'clip_sintetico.avi')
+        generar_clip(ruta, num_frames=args.frames)
+
+    cap = cv2.VideoCapture(ruta)
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        print("Error al leer el video")
+        return
+    alto, ancho = frames[0].shape[:2]
+    print(f"{len(frames)} frames de {ancho}x{alto}, solape {args.solape}")
+
+    tamanos = sorted((int(t) for t in args.tamanos.split(',')), reverse=True)
+    configuraciones = [
+        ('reducido 640x360', lambda frame: detectar_reducido(detector, frame)),
+        ('frame completo', lambda frame: detector.detect(frame)[0]),
+    ]
+    for tam in tamanos:
+        configuraciones.append((f"teselas {tam}",
+                                lambda frame, tam=tam: detector.detect_tiles(frame, None, (tam, tam), args.solape)[0]))
+
+    resultados = [(nombre, *procesar(frames, detectar)) for nombre, detectar in configuraciones]
+    referencia = resultados[-1][1]
+
+    print(f"{'Configuración':<22}{'Teselas':>8}{'ms/frame':>10}{'Det./frame':>12}{'Recup.':>9}")
+    for (nombre, cajas, latencia), tam in zip(resultados, [None, None] + tamanos):
+        num_teselas = 1 if tam is None else len(generar_teselas(ancho, alto, (tam, tam), args.solape))
+        detecciones = sum(len(c) for c in cajas) / len(cajas)
+        print(f"{nombre:<22}{num_teselas:>8}{latencia:>10.1f}{detecciones:>12.2f}{recuperacion(referencia, cajas):>9.2f}")
+    print(f"Referencia de recuperación: teselas {tamanos[-1]}")
+
+
+if __name__ == "__main__":
+    main()
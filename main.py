@@ -8,9 +8,20 @@ import sys
 # Añadir la ruta de src al path para importar los módulos
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.detector import Detector
+from src.detector import Detector, BACKENDS, TARGETS
+from src.detector_fondo import DetectorFondo
 from src.rastreador import Rastreador
-from src.utils import cargar_configuracion, aplicar_roi, dibujar_informacion
+from src.pipeline import PipelineVideo
+from src.procesamiento_paralelo import procesar_video_paralelo, contar_frames
+from src.propagacion import SeguimientoIntermitente
+from src.compuerta_movimiento import CompuertaMovimiento
+from src.ingesta import CapturaAsincrona, es_fuente_en_vivo
+from src.eventos import SalidaEventos
+from src.pistas import SumideroJSONL
+from src.metricas import Metricas, ServidorMetricas
+from src.buffers import PoolBuffers, LectorConBuffers
+from src.cache_detecciones import CacheDetecciones
+from src.utils import cargar_configuracion, aplicar_roi, escalar_roi, dibujar_informacion, dibujar_conteo
 
 # Comprobar si existen los archivos de YOLO
 models_dir = os.path.join(os.path.dirname(__file__), 'models')
@@ -26,7 +37,53 @@ yolo_full_exists = (
     os.path.exists(os.path.join(models_dir, 'coco.names'))
 )
 
+
+def mostrar_conteo(rastreador):
+    """
+    Muestra los cruces de las líneas de conteo y las estadísticas de las zonas
+    """
+    conteo = rastreador.get_conteo()
+    if conteo is None:
+        return
+    for nombre, sentidos in conteo['lineas'].items():
+        print(f"Línea {nombre}:")
+        for sentido, contadores in sentidos.items():
+            detalle = ', '.join(f"{tipo}: {n}" for tipo, n in contadores.items() if n)
+            print(f"  {sentido}: {sum(contadores.values())}" + (f" ({detalle})" if detalle else ""))
+    for nombre, zona in conteo['zonas'].items():
+        unidad = zona['unidad']
+        print(f"Zona {nombre}: {zona['visitas']} visitas, ocupación final {zona['ocupacion']}, "
+              f"permanencia media {zona['permanencia_media']:.1f} {unidad}, máxima {zona['permanencia_maxima']:.1f} {unidad}")
+
+
+def crear_detector_fondo(config, metricas, pool):
+    """
+    Crea el detector por sustracción de fondo con los parámetros de config.json
+    (los que guarda tools/calibracion.py)
+    """
+    return DetectorFondo(history=config['history'], var_threshold=config['threshold'],
+                         umbral=config['umbral'], area_min=config['area_min'],
+                         apertura=config['apertura'], cierre=config['cierre'],
+                         escala=config['escala_fondo'], gris=config['fondo_gris'],
+                         metricas=metricas, pool=pool)
+
+
+def mostrar_metricas(metricas):
+    """
+    Muestra la latencia de cada etapa del procesamiento en los últimos frames
+    """
+    resumen = metricas.resumen()
+    if not resumen:
+        return
+    print(f"Latencia por etapa (últimas ejecuciones):")
+    for etapa, (p50, p99, ejecuciones) in resumen.items():
+        print(f"  {etapa:<18} p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   ({ejecuciones} ejecuciones)")
+
+
 def main():
+    # Referencia para medir el tiempo hasta la primera detección
+    inicio_programa = time.perf_counter()
+    
     # Parsear argumentos de línea de comandos
     parser = argparse.ArgumentParser(description='Sistema de detección y seguimiento de vehículos')
     parser.add_argument('--input', type=str, default='0', help='Ruta al video de entrada o ID de la cámara (por defecto: 0)')
@@ -35,42 +92,194 @@ def main():
     parser.add_argument('--show', type=bool, default=True, help='Mostrar video en tiempo real')
     parser.add_argument('--modelo', type=str, choices=['tiny', 'full', 'auto'], default='auto', 
                         help='Modelo a utilizar: tiny (más rápido), full (más preciso) o auto (detectar automáticamente)')
+    parser.add_argument('--batch-size', type=int, default=1,
+                        help='Número de frames por pasada de la red al procesar archivos de video (por defecto: 1)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Ejecutar captura, inferencia y render en hilos separados')
+    parser.add_argument('--tam-cola', type=int, default=8,
+                        help='Tamaño de las colas entre etapas del pipeline (por defecto: 8)')
+    parser.add_argument('--procesos', type=int, default=1,
+                        help='Número de procesos para repartir un archivo de video por tramos (por defecto: 1)')
+    parser.add_argument('--frames-por-tramo', type=int, default=0,
+                        help='Frames por tramo en modo de varios procesos (por defecto: 4 tramos por proceso)')
+    parser.add_argument('--asignacion', type=str, choices=['voraz', 'hungaro'], default='voraz',
+                        help='Asignación de detecciones a objetos: voraz (original) o hungaro (óptima, sin IDs duplicados)')
+    parser.add_argument('--metrica', type=str, choices=['distancia', 'iou', 'combinada'], default='distancia',
+                        help='Coste para la asignación húngara: distancia entre centros, iou o combinada')
+    parser.add_argument('--movimiento', type=str, choices=['ninguno', 'kalman'], default='ninguno',
+                        help='Modelo de movimiento del rastreador: ninguno (último centro) o kalman (predicción de posición)')
+    parser.add_argument('--detect-interval', type=int, default=1,
+                        help='Ejecutar el detector solo cada N frames y propagar las cajas en los intermedios (por defecto: 1)')
+    parser.add_argument('--propagacion', type=str, choices=['flujo', 'movimiento'], default='flujo',
+                        help='Propagación entre detecciones: flujo óptico o modelo de movimiento del rastreador')
+    parser.add_argument('--compuerta-movimiento', action='store_true',
+                        help='Ejecutar YOLO solo cuando un sustractor de fondo detecta movimiento, y solo en esa región')
+    parser.add_argument('--area-movimiento', type=float, default=0.002,
+                        help='Proporción mínima del frame en movimiento para ejecutar YOLO (por defecto: 0.002)')
+    parser.add_argument('--teselas', type=int, default=0,
+                        help='Detectar a resolución completa dividiendo el frame en teselas de este tamaño en píxeles (por ejemplo 640)')
+    parser.add_argument('--solape', type=float, default=0.2,
+                        help='Fracción de solape entre teselas vecinas (por defecto: 0.2)')
+    parser.add_argument('--tam-entrada', type=int, default=None,
+                        help='Tamaño de entrada de la red en píxeles, múltiplo de 32 (por defecto: config.json o 288)')
+    parser.add_argument('--backend', type=str, choices=list(BACKENDS), default=None,
+                        help='Backend de OpenCV DNN (por defecto: config.json o default)')
+    parser.add_argument('--target', type=str, choices=list(TARGETS), default=None,
+                        help='Dispositivo y precisión de la red (por defecto: config.json o cpu)')
+    parser.add_argument('--hilos', type=int, default=None,
+                        help='Hilos de OpenCV (por defecto: config.json o los de OpenCV)')
+    parser.add_argument('--reconectar', action='store_true',
+                        help='Reconectar la fuente si se cae y procesar siempre el frame más reciente (streams RTSP/HTTP)')
+    parser.add_argument('--eventos', type=str, default='',
+                        help='Emitir los eventos de seguimiento a un archivo .jsonl/.csv, a unix:/ruta/socket o a - (salida estándar)')
+    parser.add_argument('--pistas', type=str, default='',
+                        help='Guardar el resumen de cada objeto seguido (frames, detecciones, posición inicial y final) en un archivo JSONL')
+    parser.add_argument('--headless', action='store_true',
+                        help='Sin ventana; si tampoco hay --output, no se dibuja ni se codifica ningún frame')
+    parser.add_argument('--metricas-puerto', type=int, default=0,
+                        help='Publicar las métricas de rendimiento en http://127.0.0.1:PUERTO/metrics (formato Prometheus)')
+    parser.add_argument('--informe-metricas', type=float, default=0,
+                        help='Segundos entre líneas de log con la latencia de cada etapa (por defecto: sin informe)')
+    parser.add_argument('--cache-detecciones', type=str, default='',
+                        help='Carpeta de la caché en disco de detecciones por contenido del frame; al repetir un clip no se ejecuta la red')
+    parser.add_argument('--cache-tam-mb', type=int, default=512,
+                        help='Tamaño máximo de la caché de detecciones en MB (por defecto: 512)')
     args = parser.parse_args()
     
+    # Con --eventos - la salida estándar queda solo para el JSONL: el progreso y
+    # los mensajes (también los de los módulos de src/) van a stderr
+    salida_estandar = sys.stdout
+    if args.eventos == '-':
+        sys.stdout = sys.stderr
+    try:
+        procesar(args, salida_estandar, inicio_programa)
+    finally:
+        # Aunque el procesamiento falle, el intérprete no queda redirigido
+        sys.stdout = salida_estandar
+
+
+def procesar(args, salida_estandar, inicio_programa):
+    """
+    Procesa la fuente de video con las opciones de la línea de comandos
+
+    Args:
+        args: Argumentos de la línea de comandos
+        salida_estandar: Salida estándar original, donde se escriben los
+            eventos con --eventos -
+        inicio_programa: Instante de arranque (time.perf_counter), para medir
+            el tiempo hasta la primera detección
+    """
+    # Métricas de rendimiento por etapa
+    metricas = Metricas()
+    servidor_metricas = None
+    if args.metricas_puerto:
+        try:
+            servidor_metricas = ServidorMetricas(metricas, args.metricas_puerto)
+            print(f"Métricas en http://127.0.0.1:{args.metricas_puerto}/metrics")
+        except OSError as e:
+            print(f"Error al abrir el puerto de métricas {args.metricas_puerto}: {e}")
+    
+    # Los frames, los frames reducidos y las máscaras se escriben sobre buffers
+    # reutilizados, que se devuelven al pool cuando el frame termina de renderizarse
+    pool = PoolBuffers()
+    
+    # Opciones de la red: config.json (sección "detector", la escribe
+    # tools/autoajuste_detector.py) y, por encima, la línea de comandos
+    config = cargar_configuracion()
+    opciones_red = {clave: valor for clave, valor in (config.get('detector') or {}).items()
+                    if clave in ('tam_entrada', 'backend', 'target', 'hilos')}
+    for clave in ('tam_entrada', 'backend', 'target', 'hilos'):
+        if getattr(args, clave) is not None:
+            opciones_red[clave] = getattr(args, clave)
+    
+    # Definir región de interés si se proporciona
+    roi = None
+    if args.roi:
+        try:
+            x, y, w, h = map(int, args.roi.split(','))
+            roi = (x, y, w, h)
+            print(f"ROI de --roi: {roi}")
+        except:
+            print("Error en el formato de ROI. Debe ser x,y,w,h")
+    
     # Inicializar detector según la elección del usuario y la disponibilidad de los modelos
     detector = None
-    sustractor_fondo = None
+    config_detector = None
+    detector_fondo = None
     
     if args.modelo == 'tiny' and yolo_tiny_exists:
         print("Usando YOLOv4-tiny para detección (equilibrio entre velocidad y precisión)")
-        detector = Detector(yolo_weights='models/yolov4-tiny.weights', yolo_cfg='models/yolov4-tiny.cfg', coco_names='models/coco.names')
+        config_detector = dict(yolo_weights='models/yolov4-tiny.weights', yolo_cfg='models/yolov4-tiny.cfg', coco_names='models/coco.names')
     elif args.modelo == 'full' and yolo_full_exists:
         print("Usando YOLOv4 para detección (más preciso pero más lento)")
-        detector = Detector(yolo_weights='models/yolov4.weights', yolo_cfg='models/yolov4.cfg', coco_names='models/coco.names')
+        config_detector = dict(yolo_weights='models/yolov4.weights', yolo_cfg='models/yolov4.cfg', coco_names='models/coco.names')
     elif args.modelo == 'auto':
         # Modo automático - elegir el mejor modelo disponible
         if yolo_tiny_exists:
             print("Modo automático: Usando YOLOv4-tiny para detección (equilibrio entre velocidad y precisión)")
-            detector = Detector(yolo_weights='models/yolov4-tiny.weights', yolo_cfg='models/yolov4-tiny.cfg', coco_names='models/coco.names')
+            config_detector = dict(yolo_weights='models/yolov4-tiny.weights', yolo_cfg='models/yolov4-tiny.cfg', coco_names='models/coco.names')
         elif yolo_full_exists:
             print("Modo automático: Usando YOLOv4 para detección (más preciso pero más lento)")
-            detector = Detector(yolo_weights='models/yolov4.weights', yolo_cfg='models/yolov4.cfg', coco_names='models/coco.names')
+            config_detector = dict(yolo_weights='models/yolov4.weights', yolo_cfg='models/yolov4.cfg', coco_names='models/coco.names')
         else:
             print("No se encontraron archivos de YOLO. Usando detección por sustracción de fondo.")
-            sustractor_fondo = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=30, detectShadows=True)
+            detector_fondo = crear_detector_fondo(config, metricas, pool)
     else:
         # Si el modelo elegido no está disponible
         print(f"El modelo {args.modelo} no está disponible. Usando detección por sustracción de fondo.")
-        sustractor_fondo = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=30, detectShadows=True)
+        detector_fondo = crear_detector_fondo(config, metricas, pool)
 
-    # Cargar el video
-    if args.input.isdigit():
-        cap = cv2.VideoCapture(int(args.input))
-    else:
-        cap = cv2.VideoCapture(args.input)
+    if config_detector is not None:
+        config_detector.update(opciones_red)
+
+    # Procesamiento repartido en varios procesos: solo archivos de video con YOLO
+    usar_procesos = args.procesos > 1
+    if usar_procesos and (config_detector is None or args.input.isdigit() or args.reconectar):
+        print("El procesamiento en varios procesos requiere un archivo de video y un modelo YOLO. Usando un solo proceso.")
+        usar_procesos = False
+    if usar_procesos and contar_frames(args.input) == 0:
+        print("El video no indica su número de frames y no puede repartirse entre procesos. Usando un solo proceso.")
+        usar_procesos = False
+    
+    if usar_procesos and args.detect_interval > 1:
+        print("--detect-interval no se aplica en modo de varios procesos; se detecta en todos los frames.")
     
+    if usar_procesos and args.teselas > 0:
+        print("--teselas no se aplica en modo de varios procesos; se detecta en el frame completo.")
+
+    # Sin modelo de movimiento, la propagación por movimiento dejaría las cajas quietas
+    if (args.propagacion == 'movimiento' and args.detect_interval > 1 and not usar_procesos
+            and args.movimiento == 'ninguno'):
+        print("--propagacion movimiento requiere un modelo de movimiento; se usa --movimiento kalman.")
+        args.movimiento = 'kalman'
+
+    # Caché de detecciones en disco: solo en un proceso (no admite escrituras concurrentes)
+    cache_detecciones = None
+    if args.cache_detecciones:
+        if config_detector is None or usar_procesos:
+            print("La caché de detecciones requiere un modelo YOLO en un solo proceso; se ignora.")
+        else:
+            cache_detecciones = CacheDetecciones(args.cache_detecciones, tam_maximo_mb=args.cache_tam_mb)
+            print(f"Caché de detecciones en {args.cache_detecciones}: {len(cache_detecciones)} frames guardados")
+    
+    if config_detector is not None and not usar_procesos:
+        detector = Detector(**config_detector, metricas=metricas, cache=cache_detecciones)
+        print(f"Modelo cargado en {detector.tiempo_carga:.2f} s, calentamiento {detector.tiempo_calentamiento:.2f} s")
+    
+    # Compuerta de movimiento: solo tiene sentido con YOLO
+    compuerta = None
+    if args.compuerta_movimiento:
+        if detector is None:
+            print("La compuerta de movimiento requiere un modelo YOLO; se ignora.")
+        else:
+            compuerta = CompuertaMovimiento(area_minima=args.area_movimiento)
+
     # Cargar el video
-    if args.input.isdigit():
+    if args.reconectar:
+        # Ingesta asíncrona: reconexión con espera exponencial y solo el último
+        # frame. Un archivo se reproduce en bucle a su velocidad, como una cámara
+        cap = CapturaAsincrona(args.input, en_vivo=True, tiempo_real=not es_fuente_en_vivo(args.input))
+    elif args.input.isdigit():
         cap = cv2.VideoCapture(int(args.input))
     else:
         cap = cv2.VideoCapture(args.input)
@@ -80,10 +289,64 @@ def main():
         print("Error al abrir la fuente de video")
         return
     
+    lector = cap if args.reconectar else LectorConBuffers(cap, pool)
+    
     # Obtener dimensiones del video
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS))
+    
+    # ROI guardada por tools/calibracion.py, escalada al tamaño de los frames
+    # procesados (con teselas se conserva la resolución original)
+    if not args.roi and config.get('roi'):
+        teselas_activas = args.teselas > 0 and detector is not None
+        tam_proceso = (640, 360) if width > 640 and not teselas_activas else (width, height)
+        # Sin tamaño guardado, la ROI está en los frames de la calibración de esta misma fuente
+        tam_calibracion = config.get('roi_tam_frame') or ((640, 360) if width > 640 else (width, height))
+        roi = escalar_roi(config['roi'], tam_calibracion, tam_proceso)
+        print(f"ROI de config.json: {roi} (elegida sobre {tam_calibracion[0]}x{tam_calibracion[1]}, "
+              f"frames procesados de {tam_proceso[0]}x{tam_proceso[1]})")
+    
+    # Resúmenes de los objetos que dejan de seguirse
+    sumidero = None
+    if args.pistas:
+        try:
+            sumidero = SumideroJSONL(args.pistas)
+        except OSError as e:
+            print(f"Error al abrir el archivo de pistas {args.pistas}: {e}")
+    
+    # Líneas de conteo y zonas definidas en config.json
+    rastreador = Rastreador(modo_asignacion=args.asignacion, metrica=args.metrica,
+                            modelo_movimiento=None if args.movimiento == 'ninguno' else args.movimiento,
+                            lineas=config.get('lineas'), zonas=config.get('zonas'), fps=fps,
+                            sumidero=sumidero)
+    
+    if usar_procesos:
+        # Cada proceso abre el video por su cuenta; aquí solo se necesitaban sus dimensiones
+        cap.release()
+        if args.output:
+            print("En modo de varios procesos no se guarda video de salida; solo se calculan los conteos.")
+        if args.eventos:
+            print("--eventos no se aplica en modo de varios procesos; solo se calculan los conteos.")
+        tam_salida = (640, 360) if width > 640 else None
+        # --hilos se aplica a cada proceso trabajador (por defecto, 1 hilo por proceso)
+        hilos_por_proceso = config_detector.pop('hilos', None) or 1
+        rastreador, frame_count, elapsed_time = procesar_video_paralelo(
+            args.input, config_detector, num_procesos=args.procesos, roi=roi, tam_salida=tam_salida,
+            frames_por_tramo=args.frames_por_tramo or None, hilos_por_proceso=hilos_por_proceso,
+            rastreador=rastreador)
+        rastreador.terminar()
+        
+        print(f"Procesamiento finalizado")
+        print(f"Tiempo total: {elapsed_time:.2f} segundos")
+        print(f"Frames procesados: {frame_count}")
+        if elapsed_time > 0:
+            print(f"FPS promedio: {frame_count/elapsed_time:.2f}")
+        print(f"Conteo de objetos:")
+        for tipo, contador in rastreador.get_contadores().items():
+            print(f"  {tipo.capitalize()}: {contador}")
+        mostrar_conteo(rastreador)
+        return
       # Configurar el escritor de video si se especificó output
     out = None
     if args.output:
@@ -100,21 +363,22 @@ def main():
             out = cv2.VideoWriter(args.output, fourcc, fps, (width, height))
       # El detector y sustractor de fondo ya se inicializaron según los argumentos del usuario
     
-    rastreador = Rastreador()
+    # Sin ventana ni video de salida no hace falta dibujar nada
+    mostrar = args.show and not args.headless
+    dibujar = mostrar or out is not None
     
-    # Definir región de interés si se proporciona
-    roi = None
-    if args.roi:
+    # Salida de eventos de seguimiento
+    salida_eventos = None
+    if args.eventos:
         try:
-            x, y, w, h = map(int, args.roi.split(','))
-            roi = (x, y, w, h)
-        except:
-            print("Error en el formato de ROI. Debe ser x,y,w,h")
+            salida_eventos = SalidaEventos(args.eventos, flujo=salida_estandar)
+        except OSError as e:
+            print(f"Error al abrir la salida de eventos {args.eventos}: {e}")
     
     # Variables para el rendimiento
     frame_count = 0
-    total_fps = 0
     start_time = time.time()
+    ultimo_informe = start_time
     
     # Colores para cada tipo de objeto
     colores = {
@@ -124,60 +388,150 @@ def main():
         'emergencia': (255, 0, 0)    # Azul
     }
     
-    # Procesar el video
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Fin del video o error en la captura")
-            break
+    # Inferencia por teselas: solo con detector YOLO
+    usar_teselas = args.teselas > 0 and detector is not None
+    if args.teselas > 0 and not usar_teselas:
+        print("La inferencia por teselas requiere un modelo YOLO; se ignora.")
+    
+    # Cambiar tamaño para mejorar rendimiento (ventana más pequeña). Con
+    # teselas se conserva la resolución original para no perder objetos pequeños
+    redimensionar = width > 640 and not usar_teselas
+    if redimensionar:
+        width, height = 640, 360
+    
+    # Inferencia por lotes: solo con archivos de video y detector YOLO
+    usar_lotes = args.batch_size > 1 and detector is not None
+    if usar_lotes and (args.input.isdigit() or args.reconectar):
+        print("La inferencia por lotes solo está disponible con archivos de video. Usando frames individuales.")
+        usar_lotes = False
+    
+    def redimensionar_frame(frame):
+        """
+        Reduce el frame a 640x360 si la fuente es más grande
+        """
+        if redimensionar:
+            reducido = cv2.resize(frame, (640, 360), dst=pool.obtener((360, 640, 3)))
+            pool.liberar(frame)
+            return reducido
+        return frame
+    
+    def detectar_frames(frames):
+        """
+        Detecta objetos en una lista de frames
+        
+        Returns:
+            Lista de tuplas (boxes, tipos, mascara), una por frame
+        """
+        if detector:
+            # Usando YOLO. Con compuerta de movimiento, solo en los frames con
+            # movimiento y solo en la región que lo contiene
+            regiones = [roi] * len(frames)
+            activos = list(range(len(frames)))
+            if compuerta is not None:
+                regiones = [compuerta.region(frame, roi) for frame in frames]
+                activos = [i for i, region in enumerate(regiones) if region is not None]
             
-    # Cambiar tamaño para mejorar rendimiento (ventana más pequeña)
-        if width > 640:
-            frame = cv2.resize(frame, (640, 360))
-            width, height = 640, 360
+            if usar_teselas:
+                # Teselas de cada frame (o de su región de movimiento) en una sola pasada
+                tam_tesela = (args.teselas, args.teselas)
+                detecciones = [detector.detect_tiles(frames[i], regiones[i], tam_tesela, args.solape)
+                               for i in activos]
+            elif usar_lotes:
+                # Una sola pasada de la red para todo el lote
+                detecciones = detector.detect_batch([frames[i] for i in activos], [regiones[i] for i in activos])
+            else:
+                detecciones = [detector.detect(frames[i], regiones[i]) for i in activos]
             
-        # Crear una copia para dibujar
-        frame_dibujo = frame.copy()
+            resultados = [([], [], None)] * len(frames)
+            for i, (boxes, tipos, tiempo_deteccion) in zip(activos, detecciones):
+                resultados[i] = (boxes, tipos, None)
+            return resultados
+        
+        # Usando sustracción de fondo; la máscara de cada frame se muestra con la ROI
+        resultados = []
+        for frame in frames:
+            boxes, tipos, _ = detector_fondo.detect(frame, roi)
+            resultados.append((boxes, tipos, detector_fondo.mascara))
+        return resultados
+    
+    tiempo_primera_deteccion = None
+    
+    # Detectar solo cada N frames y propagar las cajas entre detecciones
+    seguimiento = SeguimientoIntermitente(rastreador, intervalo=args.detect_interval,
+                                          propagacion=args.propagacion)
+    
+    def inferir(frames):
+        """
+        Detecta objetos y actualiza el rastreador, siempre en orden de captura
+        
+        Returns:
+            Lista de tuplas (objetos_con_ids, contadores, mascara), una por frame
+        """
+        nonlocal tiempo_primera_deteccion
+        # Solo se ejecuta el detector en los frames que lo necesitan
+        a_detectar = seguimiento.frames_a_detectar(len(frames))
+        detecciones = dict(zip(a_detectar, detectar_frames([frames[i] for i in a_detectar])))
+        if a_detectar and tiempo_primera_deteccion is None:
+            tiempo_primera_deteccion = time.perf_counter() - inicio_programa
+        
+        resultados = []
+        for i, frame in enumerate(frames):
+            mascara = None
+            deteccion = None
+            if i in detecciones:
+                boxes, tipos, mascara = detecciones[i]
+                deteccion = (boxes, tipos)
+            # Actualizar el rastreador
+            inicio = time.perf_counter()
+            objetos_con_ids = seguimiento.procesar(frame, deteccion)
+            metricas.observar('seguimiento', time.perf_counter() - inicio)
+            if salida_eventos is not None:
+                salida_eventos.registrar(seguimiento.indice_frame - 1, objetos_con_ids, rastreador)
+            # Copia de los contadores: el render puede ir por detrás del rastreador
+            contadores = dict(rastreador.get_contadores())
+            resultados.append((objetos_con_ids, contadores, mascara))
+        return resultados
+    
+    elapsed_time = 0
+    salida_usuario = False
+    
+    def renderizar(frame, resultado):
+        """
+        Dibuja los resultados de un frame, lo guarda y lo muestra
+        
+        Returns:
+            False si el usuario pidió salir
+        """
+        nonlocal frame_count, elapsed_time, salida_usuario, ultimo_informe
+        objetos_con_ids, contadores, mascara = resultado
+        
+        # Calcular FPS
+        frame_count += 1
+        elapsed_time = time.time() - start_time
+        fps = frame_count / elapsed_time
+        
+        metricas.incrementar('frames_procesados')
+        if args.reconectar:
+            metricas.fijar('frames_descartados_ingesta', cap.fuente.frames_descartados, contador=True)
+        # Línea de log periódica con la latencia de cada etapa
+        if args.informe_metricas > 0 and time.time() - ultimo_informe >= args.informe_metricas:
+            ultimo_informe = time.time()
+            print(f"\n{metricas.linea_resumen()}")
         
-        # Aplicar ROI si está definida
+        if not dibujar:
+            # Modo sin salida visual: ni dibujo ni codificación
+            if frame_count % 100 == 0:
+                print(f"\rFPS: {fps:.2f}", end="")
+            return True
+        
+        # Se dibuja sobre el propio frame: después del render ya no se usa
+        inicio = time.perf_counter()
+        frame_dibujo = frame
+        
+        # Dibujar ROI si está definida
         if roi:
             x, y, w, h = roi
             cv2.rectangle(frame_dibujo, (x, y), (x+w, y+h), (255, 0, 0), 2)
-            zona_interes = frame[y:y+h, x:x+w]
-        else:
-            zona_interes = frame
-        
-        # Detectar objetos
-        if detector:
-            # Usando YOLO
-            boxes, tipos, tiempo_deteccion = detector.detect(frame, roi)
-        else:
-            # Usando sustracción de fondo
-            mascara = sustractor_fondo.apply(zona_interes)
-            
-            # Aplicar umbral para eliminar sombras (valores grises)
-            _, mascara = cv2.threshold(mascara, 254, 255, cv2.THRESH_BINARY)
-            
-            # Encontrar contornos
-            contornos, _ = cv2.findContours(mascara, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Filtrar contornos por área
-            boxes = []
-            tipos = []
-            for contorno in contornos:
-                area = cv2.contourArea(contorno)
-                if area > 800:  # Filtrar por área mínima
-                    x, y, w, h = cv2.boundingRect(contorno)
-                    # Ajustar coordenadas si se está usando ROI
-                    if roi:
-                        x += roi[0]
-                        y += roi[1]
-                    boxes.append((x, y, w, h))
-                    # Por defecto asumimos que es un vehículo
-                    tipos.append('vehiculo')
-        
-        # Actualizar el rastreador
-        objetos_con_ids = rastreador.actualizar(boxes, tipos)
         
         # Dibujar los objetos rastreados
         for obj_id, x, y, w, h, tipo in objetos_con_ids:
@@ -190,7 +544,6 @@ def main():
             cv2.putText(frame_dibujo, texto, (x, y-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
         
         # Dibujar contadores en la esquina superior izquierda
-        contadores = rastreador.get_contadores()
         y_pos = 30
         for tipo, contador in contadores.items():
             texto = f"{tipo.capitalize()}: {contador}"
@@ -198,49 +551,116 @@ def main():
             cv2.putText(frame_dibujo, texto, (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.7, color, 2)
             y_pos += 30
         
-        # Calcular FPS
-        frame_count += 1
-        elapsed_time = time.time() - start_time
-        fps = frame_count / elapsed_time
-        total_fps += fps
+        # Líneas de conteo y zonas
+        dibujar_conteo(frame_dibujo, rastreador)
         
         # Mostrar FPS
         cv2.putText(frame_dibujo, f"FPS: {fps:.2f}", (width - 150, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
         
+        dibujado = time.perf_counter()
+        metricas.observar('dibujo', dibujado - inicio)
+        
         # Guardar frame si se especificó output
         if out:
             out.write(frame_dibujo)
+            metricas.observar('codificacion', time.perf_counter() - dibujado)
             
         # Mostrar frame
-        if args.show:
+        if mostrar:
             # Mostrar también la máscara si estamos usando sustracción de fondo
-            if not detector and roi:
+            if mascara is not None and roi:
                 cv2.imshow("Mascara", mascara)
                 
             cv2.imshow("Deteccion de Vehiculos", frame_dibujo)
-              # Salir con 'q' o ESC
+            # Salir con 'q' o ESC
             key = cv2.waitKey(1) & 0xFF
             if key == ord('q') or key == 27:  # 27 es el código ASCII de ESC
-                break
+                salida_usuario = True
+                return False
                 
             # Mostrar FPS en la consola para monitoreo de rendimiento
             if frame_count % 10 == 0:
                 print(f"\rFPS: {fps:.2f}", end="")
+        return True
+    
+    def renderizar_y_liberar(frame, resultado):
+        """
+        Renderiza un frame y devuelve su buffer y el de su máscara al pool
+        """
+        try:
+            return renderizar(frame, resultado)
+        finally:
+            pool.liberar(frame)
+            pool.liberar(resultado[2])
+    
+    tam_lote = args.batch_size if usar_lotes else 1
+    
+    # Procesar el video
+    if args.pipeline:
+        # Captura, inferencia y render en etapas paralelas con colas acotadas.
+        # Con cámaras en vivo se descartan frames antiguos en lugar de acumular retraso.
+        pipeline = PipelineVideo(lector, inferir, renderizar_y_liberar, preprocesar=redimensionar_frame,
+                                 tam_cola=args.tam_cola, descartar_frames=args.input.isdigit() or args.reconectar,
+                                 tam_lote=tam_lote, metricas=metricas)
+        pipeline.ejecutar()
+        if not salida_usuario:
+            print("Fin del video o error en la captura")
+        if pipeline.frames_descartados:
+            print(f"Frames descartados por la captura: {pipeline.frames_descartados}")
+    else:
+        while not salida_usuario:
+            lote = []
+            while len(lote) < tam_lote:
+                inicio = time.perf_counter()
+                ret, frame = lector.read()
+                if not ret:
+                    break
+                leido = time.perf_counter()
+                lote.append(redimensionar_frame(frame))
+                metricas.observar('captura', leido - inicio)
+                metricas.observar('redimension', time.perf_counter() - leido)
+            if not lote:
+                print("Fin del video o error en la captura")
+                break
+            
+            for frame, resultado in zip(lote, inferir(lote)):
+                if not renderizar_y_liberar(frame, resultado):
+                    break
     
     # Liberar recursos
     cap.release()
     if out:
         out.release()
-    cv2.destroyAllWindows()
+    if mostrar:
+        cv2.destroyAllWindows()
+    if salida_eventos is not None:
+        salida_eventos.cerrar()
+        print(f"Eventos escritos en {args.eventos}: {salida_eventos.eventos_escritos}")
+    rastreador.terminar()
+    if sumidero is not None:
+        print(f"Pistas escritas en {args.pistas}: {sumidero.pistas_escritas}")
     
     # Mostrar estadísticas finales
     print(f"Procesamiento finalizado")
     print(f"Tiempo total: {elapsed_time:.2f} segundos")
     print(f"Frames procesados: {frame_count}")
-    print(f"FPS promedio: {total_fps/frame_count:.2f}")
+    if elapsed_time > 0:
+        print(f"FPS promedio: {frame_count/elapsed_time:.2f}")
+    if tiempo_primera_deteccion is not None:
+        print(f"Tiempo hasta la primera detección: {tiempo_primera_deteccion:.2f} segundos")
+    mostrar_metricas(metricas)
+    if servidor_metricas is not None:
+        servidor_metricas.cerrar()
+    if cache_detecciones is not None:
+        cache_detecciones.cerrar()
+        print(f"Caché de detecciones: {cache_detecciones.aciertos} aciertos, {cache_detecciones.fallos} fallos, "
+              f"{cache_detecciones.expulsiones} expulsiones")
+    if compuerta is not None:
+        print(f"Frames con inferencia YOLO: {compuerta.frames_activos}/{compuerta.frames_evaluados}")
     print(f"Conteo de objetos:")
     for tipo, contador in rastreador.get_contadores().items():
         print(f"  {tipo.capitalize()}: {contador}")
+    mostrar_conteo(rastreador)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,188 @@
+import cv2
+import argparse
+import os
+import time
+import sys
+
+# Añadir la ruta de src al path para importar los módulos
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.detector import Detector
+from src.rastreador import Rastreador
+from src.multicamara import Flujo, ServidorMulticamara
+from src.eventos import SalidaEventos
+from src.utils import cargar_configuracion
+
+colores = {
+    'vehiculo': (0, 255, 0),     # Verde
+    'moto': (0, 165, 255),       # Naranja
+    'peaton': (0, 0, 255),       # Rojo
+    'emergencia': (255, 0, 0)    # Azul
+}
+
+
+def elegir_modelo(modelo):
+    """
+    Devuelve los argumentos del Detector para el modelo pedido, o None si no está disponible
+    """
+    candidatos = {'tiny': ['yolov4-tiny'], 'full': ['yolov4'], 'auto': ['yolov4-tiny', 'yolov4']}[modelo]
+    for nombre in candidatos:
+        rutas = dict(yolo_weights=f'models/{nombre}.weights', yolo_cfg=f'models/{nombre}.cfg',
+                     coco_names='models/coco.names')
+        if all(os.path.exists(os.path.join(os.path.dirname(__file__), ruta)) for ruta in rutas.values()):
+            print(f"Usando {nombre} para detección")
+            return rutas
+    return None
+
+
+def main():
+    # Parsear argumentos de línea de comandos
+    parser = argparse.ArgumentParser(description='Detección y seguimiento de vehículos en varias cámaras con un solo modelo')
+    parser.add_argument('--input', type=str, nargs='+', required=True,
+                        help='Fuentes de video: rutas, URLs o IDs de cámara')
+    parser.add_argument('--roi', type=str, nargs='*', default=[],
+                        help='ROI de cada fuente en formato x,y,w,h, en el mismo orden ("-" para ninguna)')
+    parser.add_argument('--show', action='store_true', help='Mostrar una ventana por cámara')
+    parser.add_argument('--modelo', type=str, choices=['tiny', 'full', 'auto'], default='auto',
+                        help='Modelo a utilizar: tiny, full o auto (por defecto)')
+    parser.add_argument('--batch-size', type=int, default=0,
+                        help='Frames por pasada de la red (por defecto: uno por cámara)')
+    parser.add_argument('--tam-cola', type=int, default=4,
+                        help='Frames en espera por cámara (por defecto: 4)')
+    parser.add_argument('--asignacion', type=str, choices=['voraz', 'hungaro'], default='voraz',
+                        help='Asignación de detecciones a objetos: voraz (original) o hungaro')
+    parser.add_argument('--movimiento', type=str, choices=['ninguno', 'kalman'], default='ninguno',
+                        help='Modelo de movimiento del rastreador: ninguno o kalman')
+    parser.add_argument('--eventos', type=str, default='',
+                        help='Emitir los eventos de seguimiento de todas las cámaras a un archivo .jsonl/.csv, a unix:/ruta/socket o a -')
+    args = parser.parse_args()
+
+    # Con --eventos - la salida estándar queda solo para el JSONL: el progreso y
+    # los mensajes van a stderr
+    salida_estandar = sys.stdout
+    if args.eventos == '-':
+        sys.stdout = sys.stderr
+    try:
+        procesar(args, salida_estandar)
+    finally:
+        # Aunque el procesamiento falle, el intérprete no queda redirigido
+        sys.stdout = salida_estandar
+
+
+def procesar(args, salida_estandar):
+    """
+    Procesa todas las fuentes con las opciones de la línea de comandos
+
+    Args:
+        args: Argumentos de la línea de comandos
+        salida_estandar: Salida estándar original, donde se escriben los
+            eventos con --eventos -
+    """
+    config_detector = elegir_modelo(args.modelo)
+    if config_detector is None:
+        print("No se encontraron archivos de YOLO. Ejecuta primero tools/descargar_modelos.py")
+        return
+    # Opciones de la red guardadas en config.json (tam_entrada, backend, target, hilos)
+    config = cargar_configuracion()
+    config_detector.update({clave: valor for clave, valor in (config.get('detector') or {}).items()
+                            if clave in ('tam_entrada', 'backend', 'target', 'hilos')})
+    # Un único modelo para todas las cámaras
+    detector = Detector(**config_detector)
+
+    flujos = []
+    for i, fuente in enumerate(args.input):
+        roi = None
+        texto_roi = args.roi[i] if i < len(args.roi) else '-'
+        if texto_roi != '-':
+            try:
+                x, y, w, h = map(int, texto_roi.split(','))
+                roi = (x, y, w, h)
+            except:
+                print(f"Error en el formato de ROI de la fuente {fuente}. Debe ser x,y,w,h")
+        rastreador = Rastreador(modo_asignacion=args.asignacion,
+                                modelo_movimiento=None if args.movimiento == 'ninguno' else args.movimiento)
+        flujos.append(Flujo(f"cam{i}", fuente, roi=roi, rastreador=rastreador, tam_cola=args.tam_cola))
+
+    def redimensionar_frame(frame):
+        """
+        Reduce el frame a 640x360 si la fuente es más grande
+        """
+        if frame.shape[1] > 640:
+            return cv2.resize(frame, (640, 360))
+        return frame
+
+    # Salida de eventos común a todas las cámaras (cada registro indica su cámara)
+    salida_eventos = None
+    if args.eventos:
+        try:
+            salida_eventos = SalidaEventos(args.eventos, flujo=salida_estandar)
+        except OSError as e:
+            print(f"Error al abrir la salida de eventos {args.eventos}: {e}")
+
+    start_time = time.time()
+    ultimo_informe = [start_time]
+
+    def al_procesar(flujo, frame, objetos):
+        """
+        Muestra los resultados de una cámara e informa periódicamente del progreso
+
+        Returns:
+            False si el usuario pidió salir
+        """
+        if salida_eventos is not None:
+            salida_eventos.registrar(flujo.frames_procesados - 1, objetos, flujo.rastreador, camara=flujo.nombre)
+        if args.show:
+            frame_dibujo = frame.copy()
+            if flujo.roi:
+                x, y, w, h = flujo.roi
+                cv2.rectangle(frame_dibujo, (x, y), (x+w, y+h), (255, 0, 0), 2)
+            for obj_id, x, y, w, h, tipo in objetos:
+                color = colores.get(tipo, (0, 255, 0))
+                cv2.rectangle(frame_dibujo, (x, y), (x+w, y+h), color, 2)
+                cv2.putText(frame_dibujo, f"ID: {obj_id} - {tipo.capitalize()}", (x, y-5),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+            y_pos = 30
+            for tipo, contador in flujo.rastreador.get_contadores().items():
+                cv2.putText(frame_dibujo, f"{tipo.capitalize()}: {contador}", (10, y_pos),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, colores.get(tipo, (0, 255, 0)), 2)
+                y_pos += 30
+            cv2.imshow(f"Deteccion de Vehiculos - {flujo.nombre}", frame_dibujo)
+            # Salir con 'q' o ESC
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q') or key == 27:
+                return False
+
+        # Progreso de todas las cámaras cada 5 segundos
+        ahora = time.time()
+        if ahora - ultimo_informe[0] >= 5:
+            ultimo_informe[0] = ahora
+            estado = ', '.join(f"{f.nombre}: {f.frames_procesados}" for f in flujos)
+            print(f"Frames procesados - {estado}")
+        return True
+
+    servidor = ServidorMulticamara(detector, flujos, tam_lote=args.batch_size or None,
+                                   preprocesar=redimensionar_frame)
+    servidor.ejecutar(al_procesar)
+    if args.show:
+        cv2.destroyAllWindows()
+    # Entregar los objetos que siguen activos antes de dar los conteos finales
+    for flujo in flujos:
+        flujo.rastreador.terminar()
+    if salida_eventos is not None:
+        salida_eventos.cerrar()
+
+    # Mostrar estadísticas finales
+    elapsed_time = time.time() - start_time
+    total_frames = sum(flujo.frames_procesados for flujo in flujos)
+    print(f"Procesamiento finalizado")
+    print(f"Tiempo total: {elapsed_time:.2f} segundos")
+    print(f"Frames procesados: {total_frames} ({total_frames / elapsed_time:.2f} FPS en total)")
+    for flujo in flujos:
+        print(f"{flujo.nombre} ({flujo.fuente}): {flujo.frames_procesados} frames, "
+              f"{flujo.frames_descartados} descartados")
+        for tipo, contador in flujo.rastreador.get_contadores().items():
+            print(f"  {tipo.capitalize()}: {contador}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Buffers reutilizables para no reservar memoria nueva en cada frame.
+
+A muchos frames por segundo, crear en cada frame un array para el frame
+leído, el redimensionado, el blob de la red y las máscaras supone una parte
+apreciable del tiempo de CPU. Las funciones de OpenCV que aceptan un destino
+(dst=, el buffer de VideoCapture.read, la máscara de apply...) pueden escribir
+sobre arrays ya reservados:
+
+    PoolBuffers       Arrays libres agrupados por forma y tipo: se piden con
+                      obtener() y se devuelven con liberar() cuando ya no se usan
+    LectorConBuffers  Envuelve una captura para leer cada frame en un buffer del pool
+    BufferBlob        Blob de entrada de la red reutilizable, equivalente a
+                      cv2.dnn.blobFromImages con escala 1/255 y swapRB
+"""
+
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class PoolBuffers:
+    """
+    Conjunto de arrays libres para reutilizar, por forma y tipo
+
+    Un buffer obtenido no debe liberarse mientras alguien siga usándolo. Si un
+    buffer no se devuelve (por ejemplo, un frame descartado), simplemente se
+    reserva otro la próxima vez. obtener() y liberar() pueden llamarse desde
+    hilos distintos: append y pop de deque son atómicos.
+    """
+
+    def __init__(self, max_por_forma=32):
+        """
+        Args:
+            max_por_forma: Máximo de buffers libres que se guardan de cada forma;
+                los que sobran se dejan al recolector de basura
+        """
+        self.max_por_forma = max_por_forma
+        # {(forma, dtype): deque de arrays libres}
+        self._libres = {}
+        # Arrays reservados por el pool desde su creación
+        self.asignaciones = 0
+
+    def _cola(self, forma, dtype):
+        clave = (tuple(forma), np.dtype(dtype))
+        cola = self._libres.get(clave)
+        if cola is None:
+            cola = self._libres.setdefault(clave, deque())
+        return cola
+
+    def obtener(self, forma, dtype=np.uint8):
+        """
+        Devuelve un array libre de la forma y el tipo pedidos (con contenido
+        indeterminado), reservándolo solo si no queda ninguno
+        """
+        try:
+            return self._cola(forma, dtype).pop()
+        except IndexError:
+            self.asignaciones += 1
+            return np.empty(forma, dtype=dtype)
+
+    def liberar(self, buffer):
+        """
+        Devuelve un array al pool para que vuelva a usarse. Acepta None y
+        arrays que no son del pool (vistas o arrays no contiguos se ignoran)
+        """
+        if buffer is None or buffer.base is not None or not buffer.flags.c_contiguous:
+            return
+        cola = self._cola(buffer.shape, buffer.dtype)
+        if len(cola) < self.max_por_forma:
+            cola.append(buffer)
+
+
+class LectorConBuffers:
+    """
+    Captura que lee cada frame sobre un buffer del pool
+
+    Funciona con cv2.VideoCapture o cualquier objeto cuyo read() acepte el
+    array de destino. Los frames leídos deben devolverse al pool con
+    pool.liberar(frame) cuando ya no se usen.
+    """
+
+    def __init__(self, cap, pool):
+        """
+        Args:
+            cap: Fuente de video
+            pool: PoolBuffers del que se toman los buffers
+        """
+        self.cap = cap
+        self.pool = pool
+        # Forma de los frames de la fuente (se conoce tras la primera lectura)
+        self._forma = None
+
+    def read(self):
+        if self._forma is None:
+            ret, frame = self.cap.read()
+            if ret:
+                self._forma = frame.shape
+            return ret, frame
+        buffer = self.pool.obtener(self._forma)
+        ret, frame = self.cap.read(buffer)
+        if frame is not buffer:
+            # Fin de la fuente, o frame de otro tamaño: OpenCV reservó uno nuevo
+            self.pool.liberar(buffer)
+            if ret:
+                self._forma = frame.shape
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class BufferBlob:
+    """
+    Blob de entrada de la red que se rellena sin reservar memoria nueva
+
+    El resultado es idéntico al de cv2.dnn.blobFromImages(imagenes, 1/255.0,
+    tam_entrada, swapRB=True, crop=False): cada imagen se redimensiona sobre un
+    buffer fijo y se escribe ya escalada y en orden RGB/NCHW sobre el blob.
+    """
+
+    ESCALA = np.float32(1 / 255.0)
+
+    def __init__(self, tam_entrada):
+        """
+        Args:
+            tam_entrada: Tamaño (ancho, alto) de la entrada de la red
+        """
+        self.ancho, self.alto = tam_entrada
+        self._redimensionado = np.empty((self.alto, self.ancho, 3), dtype=np.uint8)
+        self._blob = np.empty((1, 3, self.alto, self.ancho), dtype=np.float32)
+        # Veces que el blob ha tenido que crecer (lotes más grandes que los anteriores)
+        self.asignaciones = 1
+
+    def llenar(self, imagenes):
+        """
+        Escribe las imágenes en el blob y devuelve la vista (N, 3, alto, ancho)
+
+        El array devuelto se sobrescribe en la siguiente llamada: debe pasarse
+        a la red (setInput) antes de volver a llamar.
+        """
+        if any(imagen.ndim != 3 or imagen.shape[2] != 3 for imagen in imagenes):
+            # Imágenes en gris o con canal alfa: la conversión general de OpenCV
+            return cv2.dnn.blobFromImages(imagenes, 1 / 255.0, (self.ancho, self.alto), swapRB=True, crop=False)
+        if self._blob.shape[0] < len(imagenes):
+            self._blob = np.empty((len(imagenes), 3, self.alto, self.ancho), dtype=np.float32)
+            self.asignaciones += 1
+        blob = self._blob[:len(imagenes)]
+        for i, imagen in enumerate(imagenes):
+            cv2.resize(imagen, (self.ancho, self.alto), dst=self._redimensionado)
+            # BGR -> RGB y HWC -> CHW como vistas; la única escritura es sobre el blob
+            np.multiply(self._redimensionado[..., ::-1].transpose(2, 0, 1), self.ESCALA,
+                        out=blob[i], dtype=np.float32)
+        return blob
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Caché en disco de los resultados del detector, por contenido del frame.
+
+Al volver a procesar el mismo clip con otra ROI de dibujo, otras líneas de
+conteo u otra salida, la red da exactamente las mismas cajas para los mismos
+píxeles. Esta caché guarda el resultado de Detector.detect de cada región
+procesada bajo una clave que combina el hash de sus píxeles con la identidad
+del modelo (hash de cfg y pesos), el tamaño de entrada, los umbrales y el
+backend/target. En la segunda pasada no se ejecuta net.forward: el coste por
+frame queda en decodificar el video y calcular el hash.
+
+Las entradas ocupan ranuras de tamaño fijo en arrays .npy abiertos como
+memoria mapeada (np.lib.format.open_memmap), así que el índice se reconstruye
+al abrir sin leer los datos y solo se traen a memoria las páginas que se
+consultan. El número de ranuras sale del tamaño máximo indicado; cuando se
+llenan, se reutiliza la de uso más antiguo (LRU). Los frames con más cajas
+de las que caben en una ranura no se guardan.
+
+La caché no admite varios procesos escribiendo a la vez en el mismo directorio.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from src.conteo import TIPOS
+
+# Bytes de la clave (BLAKE2b de 128 bits)
+TAM_CLAVE = 16
+
+
+class CacheDetecciones:
+    """
+    Resultados del detector guardados en disco, con expulsión LRU
+    """
+
+    def __init__(self, directorio, tam_maximo_mb=512, max_cajas=64):
+        """
+        Abre la caché del directorio, o la crea si no existe
+
+        Args:
+            directorio: Carpeta de la caché
+            tam_maximo_mb: Tamaño máximo de la caché en disco, en MB
+            max_cajas: Cajas que caben en cada entrada; los frames con más no
+                se guardan
+        """
+        if tam_maximo_mb <= 0 or max_cajas <= 0:
+            raise ValueError(f"Tamaño de caché inválido: tam_maximo_mb={tam_maximo_mb}, max_cajas={max_cajas}")
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.max_cajas = max_cajas
+        bytes_por_entrada = TAM_CLAVE + 8 + 2 + max_cajas * (4 * 4 + 1)
+        self.capacidad = max(1, int(tam_maximo_mb * 1024 * 1024) // bytes_por_entrada)
+
+        formas = {
+            'claves': ((self.capacidad, TAM_CLAVE), np.uint8),
+            # Instante del último uso de cada ranura (0 = libre)
+            'usos': ((self.capacidad,), np.int64),
+            'num_cajas': ((self.capacidad,), np.int16),
+            'cajas': ((self.capacidad, max_cajas, 4), np.int32),
+            # Índice del tipo en TIPOS
+            'tipos': ((self.capacidad, max_cajas), np.int8),
+        }
+        self._arrays = self._abrir(formas)
+        self.claves = self._arrays['claves']
+        self.usos = self._arrays['usos']
+        self.num_cajas = self._arrays['num_cajas']
+        self.cajas = self._arrays['cajas']
+        self.tipos = self._arrays['tipos']
+
+        # Índice en memoria {clave: ranura} de las ranuras ocupadas
+        ocupadas = np.flatnonzero(self.usos > 0)
+        self._indice = {self.claves[i].tobytes(): int(i) for i in ocupadas}
+        self._libres = np.flatnonzero(self.usos == 0)[::-1].tolist()
+        self._reloj = int(self.usos.max()) + 1 if len(ocupadas) else 1
+        self._indice_tipo = {tipo: i for i, tipo in enumerate(TIPOS)}
+        # Hash parcial de cada identidad de detector, para no repetirlo por frame
+        self._hash_identidad = {}
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+
+    def _abrir(self, formas):
+        """
+        Abre los arrays de la caché como memoria mapeada; si falta alguno o su
+        forma no coincide (otro tamaño máximo), la caché se crea vacía
+        """
+        rutas = {nombre: os.path.join(self.directorio, f'{nombre}.npy') for nombre in formas}
+        try:
+            arrays = {nombre: np.lib.format.open_memmap(rutas[nombre], mode='r+') for nombre in formas}
+            if all(arrays[nombre].shape == forma and arrays[nombre].dtype == dtype
+                   for nombre, (forma, dtype) in formas.items()):
+                return arrays
+            print(f"La caché de {self.directorio} tiene otro tamaño; se crea de nuevo")
+        except (OSError, ValueError):
+            pass
+        # Archivos nuevos (dispersos: solo ocupan disco las ranuras escritas)
+        return {nombre: np.lib.format.open_memmap(rutas[nombre], mode='w+', dtype=dtype, shape=forma)
+                for nombre, (forma, dtype) in formas.items()}
+
+    def clave(self, region, identidad):
+        """
+        Calcula la clave de una región de un frame para un detector
+
+        Args:
+            region: Imagen procesada por la red (el frame o su ROI)
+            identidad: Texto que identifica el modelo y sus opciones
+
+        Returns:
+            Clave de TAM_CLAVE bytes
+        """
+        base = self._hash_identidad.get(identidad)
+        if base is None:
+            base = hashlib.blake2b(identidad.encode(), digest_size=TAM_CLAVE)
+            self._hash_identidad[identidad] = base
+        h = base.copy()
+        h.update(np.array(region.shape, dtype=np.int64).tobytes())
+        h.update(np.ascontiguousarray(region).data)
+        return h.digest()
+
+    def buscar(self, clave):
+        """
+        Devuelve el resultado guardado para una clave
+
+        Returns:
+            Lista de rectángulos (x, y, w, h) y lista de tipos de objetos, o
+            None si la clave no está en la caché
+        """
+        ranura = self._indice.get(clave)
+        if ranura is None:
+            self.fallos += 1
+            return None
+        self.aciertos += 1
+        self.usos[ranura] = self._reloj
+        self._reloj += 1
+        n = int(self.num_cajas[ranura])
+        boxes = [tuple(caja) for caja in self.cajas[ranura, :n].tolist()]
+        tipos = [TIPOS[t] for t in self.tipos[ranura, :n].tolist()]
+        return boxes, tipos
+
+    def guardar(self, clave, boxes, tipos):
+        """
+        Guarda el resultado de una región, expulsando la entrada usada hace
+        más tiempo si la caché está llena
+
+        Returns:
+            True si se ha guardado
+        """
+        if len(boxes) > self.max_cajas or clave in self._indice:
+            return False
+        if self._libres:
+            ranura = self._libres.pop()
+        else:
+            ranura = int(np.argmin(self.usos))
+            del self._indice[self.claves[ranura].tobytes()]
+            self.expulsiones += 1
+        # La ranura queda libre mientras se escribe
+        self.usos[ranura] = 0
+        n = len(boxes)
+        self.num_cajas[ranura] = n
+        if n:
+            self.cajas[ranura, :n] = boxes
+            self.tipos[ranura, :n] = [self._indice_tipo[tipo] for tipo in tipos]
+        self.claves[ranura] = np.frombuffer(clave, dtype=np.uint8)
+        self.usos[ranura] = self._reloj
+        self._reloj += 1
+        self._indice[clave] = ranura
+        return True
+
+    def __len__(self):
+        return len(self._indice)
+
+    def cerrar(self):
+        """
+        Escribe en disco los cambios pendientes
+        """
+        for array in self._arrays.values():
+            array.flush()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Caché de redes cargadas para arrancar los detectores más rápido.
+
+Leer los pesos de YOLOv4 (unos 250 MB) con cv2.dnn.readNetFromDarknet tarda
+segundos, y la primera pasada de la red paga además la preparación de las
+capas. OpenCV no permite guardar en disco una red de Darknet ya preparada (ni
+exportarla a ONNX), así que la caché vive en el proceso: la primera vez se
+carga y se calienta la red, y los Detector que se creen después con el mismo
+modelo, backend y target (varias cámaras, reinicios del detector, la
+herramienta de autoajuste) la reutilizan ya preparada.
+
+Dentro del proceso, las redes se identifican por la ruta real de sus archivos
+junto con su tamaño y fecha de modificación, que se obtienen sin leerlos: la
+caché no añade nada al tiempo de arranque.
+
+La huella de un modelo (hash SHA-256 de sus archivos) solo se calcula donde
+importa la identidad del contenido, como la clave de la caché de detecciones
+o las detecciones grabadas. Para no volver a leer 250 MB cada vez, el hash se
+guarda en models/.huellas.json junto con el tamaño y la fecha de modificación
+del archivo, y solo se recalcula si estos cambian. El índice se escribe en un
+archivo temporal que luego sustituye al anterior, de modo que varios procesos
+que lo actualicen a la vez nunca dejan un índice a medio escribir.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+_NOMBRE_INDICE = '.huellas.json'
+
+# Redes cargadas en este proceso: (firma cfg, firma pesos, backend, target) -> _EntradaRed
+_redes = {}
+_cerrojo = threading.Lock()
+
+
+class _EntradaRed:
+    """
+    Red cargada y tamaños de entrada con los que ya se ha calentado
+    """
+
+    def __init__(self, red, tiempo_carga):
+        self.red = red
+        self.tiempo_carga = tiempo_carga
+        self.tamanos_calentados = set()
+
+
+def _hash_archivo(ruta, bloque=1 << 20):
+    """
+    Calcula el SHA-256 de un archivo leyéndolo por bloques
+    """
+    h = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for trozo in iter(lambda: f.read(bloque), b''):
+            h.update(trozo)
+    return h.hexdigest()
+
+
+def huella_archivo(ruta):
+    """
+    Devuelve el SHA-256 de un archivo usando el índice de su carpeta si el
+    archivo no ha cambiado desde la última vez
+
+    Args:
+        ruta: Ruta al archivo
+
+    Returns:
+        Hash hexadecimal del contenido
+    """
+    ruta = os.path.abspath(ruta)
+    ruta_indice = os.path.join(os.path.dirname(ruta), _NOMBRE_INDICE)
+    info = os.stat(ruta)
+    firma = [info.st_size, info.st_mtime_ns]
+
+    indice = {}
+    if os.path.exists(ruta_indice):
+        try:
+            with open(ruta_indice, 'r') as f:
+                indice = json.load(f)
+        except Exception as e:
+            print(f"Error al leer el índice de huellas: {e}")
+
+    nombre = os.path.basename(ruta)
+    entrada = indice.get(nombre)
+    if entrada and entrada.get('firma') == firma:
+        return entrada['sha256']
+
+    huella = _hash_archivo(ruta)
+    indice[nombre] = {'firma': firma, 'sha256': huella}
+    # Escritura atómica: otros procesos leen el índice anterior o el nuevo, nunca uno a medias
+    ruta_temporal = f"{ruta_indice}.{os.getpid()}.tmp"
+    try:
+        with open(ruta_temporal, 'w') as f:
+            json.dump(indice, f, indent=4)
+        os.replace(ruta_temporal, ruta_indice)
+    except Exception as e:
+        # Carpeta de solo lectura: el hash se recalculará la próxima vez que se necesite
+        print(f"No se pudo guardar el índice de huellas: {e}")
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+    return huella
+
+
+def huella_modelo(ruta_cfg, ruta_pesos):
+    """
+    Identifica un modelo de Darknet por el contenido de su configuración y sus pesos
+    """
+    return huella_archivo(ruta_cfg)[:16] + huella_archivo(ruta_pesos)[:16]
+
+
+def firma_archivo(ruta):
+    """
+    Identifica un archivo por su ruta real, tamaño y fecha de modificación,
+    sin leer su contenido
+    """
+    ruta = os.path.realpath(ruta)
+    info = os.stat(ruta)
+    return (ruta, info.st_size, info.st_mtime_ns)
+
+
+def cargar_red(ruta_cfg, ruta_pesos, backend, target):
+    """
+    Carga la red del modelo sin pasar por la caché
+
+    Returns:
+        Entrada con los atributos red, tiempo_carga y tamanos_calentados
+    """
+    inicio = time.perf_counter()
+    red = cv2.dnn.readNetFromDarknet(ruta_cfg, ruta_pesos)
+    red.setPreferableBackend(backend)
+    red.setPreferableTarget(target)
+    return _EntradaRed(red, time.perf_counter() - inicio)
+
+
+def obtener_red(ruta_cfg, ruta_pesos, backend, target):
+    """
+    Devuelve la red del modelo, cargándola solo si no está ya en la caché
+
+    Args:
+        ruta_cfg: Ruta al archivo .cfg de Darknet
+        ruta_pesos: Ruta al archivo .weights de Darknet
+        backend: Valor de cv2.dnn.DNN_BACKEND_*
+        target: Valor de cv2.dnn.DNN_TARGET_*
+
+    Returns:
+        Tupla (entrada, reutilizada) donde entrada tiene los atributos red,
+        tiempo_carga y tamanos_calentados
+    """
+    clave = (firma_archivo(ruta_cfg), firma_archivo(ruta_pesos), backend, target)
+    with _cerrojo:
+        entrada = _redes.get(clave)
+        if entrada is not None:
+            return entrada, True
+
+        entrada = cargar_red(ruta_cfg, ruta_pesos, backend, target)
+        _redes[clave] = entrada
+        return entrada, False
+
+
+def calentar_red(entrada, capas_salida, tam_entrada):
+    """
+    Ejecuta una pasada con una imagen vacía para que la preparación de las
+    capas no recaiga en el primer frame real
+
+    Args:
+        entrada: Entrada devuelta por obtener_red o cargar_red
+        capas_salida: Nombres de las capas de salida
+        tam_entrada: Tamaño (ancho, alto) de la entrada de la red
+
+    Returns:
+        Tiempo del calentamiento en segundos (0 si ya estaba caliente)
+    """
+    if tam_entrada in entrada.tamanos_calentados:
+        return 0.0
+    inicio = time.perf_counter()
+    blob = np.zeros((1, 3, tam_entrada[1], tam_entrada[0]), dtype=np.float32)
+    entrada.red.setInput(blob)
+    entrada.red.forward(capas_salida)
+    entrada.tamanos_calentados.add(tam_entrada)
+    return time.perf_counter() - inicio
+
+
+def vaciar_cache():
+    """
+    Libera todas las redes cargadas en el proceso
+    """
+    with _cerrojo:
+        _redes.clear()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compuerta de movimiento para la inferencia con YOLO.
+
+Un sustractor de fondo MOG2 sobre una versión reducida del frame decide si
+merece la pena ejecutar la red: si la proporción de píxeles en primer plano
+no supera un umbral, el frame se considera vacío y no se ejecuta YOLO. Si hay
+movimiento, devuelve la región que lo contiene para detectar solo en ella.
+"""
+
+import cv2
+import numpy as np
+
+
+class CompuertaMovimiento:
+    """
+    Decide en qué frames y en qué región ejecutar el detector
+    """
+
+    def __init__(self, escala=0.25, area_minima=0.002, margen=0.15, tam_minimo=(288, 288),
+                 history=200, var_threshold=30):
+        """
+        Inicializa la compuerta
+
+        Args:
+            escala: Factor de reducción del frame para el sustractor de fondo
+            area_minima: Proporción mínima de píxeles en movimiento (0-1) para
+                ejecutar el detector
+            margen: Margen añadido a cada lado de la región de movimiento, como
+                fracción de su tamaño
+            tam_minimo: Tamaño mínimo (ancho, alto) de la región devuelta, para no
+                ampliar en exceso recortes pequeños al tamaño de entrada de la red
+            history: Historial del sustractor MOG2
+            var_threshold: Umbral de varianza del sustractor MOG2
+        """
+        self.escala = escala
+        self.area_minima = area_minima
+        self.margen = margen
+        self.tam_minimo = tam_minimo
+        self.sustractor = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=var_threshold,
+                                                              detectShadows=True)
+        self.kernel = np.ones((3, 3), np.uint8)
+
+        # Estadísticas
+        self.frames_evaluados = 0
+        self.frames_activos = 0
+
+    def region(self, frame, roi=None):
+        """
+        Evalúa el movimiento de un frame
+
+        Args:
+            frame: Frame completo (BGR)
+            roi: Región de interés (x, y, w, h) o None para todo el frame
+
+        Returns:
+            Región (x, y, w, h) en coordenadas del frame donde ejecutar el
+            detector, o None si no hay movimiento suficiente
+        """
+        self.frames_evaluados += 1
+
+        if roi is not None:
+            rx, ry, rw, rh = roi
+            zona = frame[ry:ry+rh, rx:rx+rw]
+        else:
+            rx, ry = 0, 0
+            zona = frame
+        alto, ancho = zona.shape[:2]
+        if alto == 0 or ancho == 0:
+            return None
+
+        reducida = cv2.resize(zona, None, fx=self.escala, fy=self.escala, interpolation=cv2.INTER_AREA)
+        mascara = self.sustractor.apply(reducida)
+        # Eliminar sombras (valores grises) y ruido aislado
+        _, mascara = cv2.threshold(mascara, 254, 255, cv2.THRESH_BINARY)
+        mascara = cv2.morphologyEx(mascara, cv2.MORPH_OPEN, self.kernel)
+
+        if cv2.countNonZero(mascara) < self.area_minima * mascara.size:
+            return None
+        self.frames_activos += 1
+
+        # Región de movimiento en coordenadas de la zona original
+        x, y, w, h = cv2.boundingRect(mascara)
+        x, y, w, h = x / self.escala, y / self.escala, w / self.escala, h / self.escala
+        x -= w * self.margen
+        y -= h * self.margen
+        w += 2 * w * self.margen
+        h += 2 * h * self.margen
+
+        # Tamaño mínimo centrado en la región
+        min_w = min(self.tam_minimo[0], ancho)
+        min_h = min(self.tam_minimo[1], alto)
+        if w < min_w:
+            x -= (min_w - w) / 2
+            w = min_w
+        if h < min_h:
+            y -= (min_h - h) / 2
+            h = min_h
+
+        # Ajustar a los límites de la zona
+        w = min(w, ancho)
+        h = min(h, alto)
+        x = int(min(max(x, 0), ancho - w))
+        y = int(min(max(y, 0), alto - h))
+        return (x + rx, y + ry, int(w), int(h))
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Líneas de conteo y zonas de ocupación para el rastreador.
+
+Un objeto se cuenta en una línea cuando el segmento que recorre su centro
+entre dos frames la cruza, y se distingue el sentido del cruce. Las zonas son
+polígonos: se mide cuántos objetos hay dentro en cada frame y cuánto tiempo
+permanece cada uno.
+
+Las pruebas geométricas se calculan para todos los objetos y todas las líneas
+o zonas a la vez con NumPy, de modo que siguen siendo baratas con cientos de
+objetos y decenas de líneas.
+
+Formato en config.json (coordenadas del frame procesado, como la ROI):
+
+    "lineas": [{"nombre": "calle", "puntos": [[100, 200], [500, 200]],
+                "sentidos": ["bajada", "subida"]}],
+    "zonas": [{"nombre": "cruce", "puntos": [[50, 50], [300, 50], [300, 250], [50, 250]]}]
+
+El primer sentido de una línea es el cruce de izquierda a derecha mirando
+desde su primer punto hacia el segundo (en la imagen); el segundo, el contrario.
+"""
+
+import numpy as np
+
+TIPOS = ['vehiculo', 'moto', 'peaton', 'emergencia']
+
+
+def _producto_cruzado(u, v):
+    """
+    Componente z del producto vectorial de vectores 2D (con broadcasting)
+    """
+    return u[..., 0] * v[..., 1] - u[..., 1] * v[..., 0]
+
+
+def cruces_lineas(origenes, destinos, inicios, finales):
+    """
+    Calcula qué desplazamientos cruzan qué líneas y en qué sentido
+
+    Args:
+        origenes: Array (N, 2) con la posición anterior de cada objeto
+        destinos: Array (N, 2) con la posición actual de cada objeto
+        inicios: Array (L, 2) con el primer punto de cada línea
+        finales: Array (L, 2) con el segundo punto de cada línea
+
+    Returns:
+        Matriz (N, L) con 1 si el objeto cruza la línea en el primer sentido,
+        -1 si la cruza en el segundo y 0 si no la cruza
+    """
+    p0 = origenes[:, None, :]
+    p1 = destinos[:, None, :]
+    a = inicios[None, :, :]
+    b = finales[None, :, :]
+    direccion_linea = b - a
+    desplazamiento = p1 - p0
+
+    # Lado de la línea en que está cada posición (>= 0 a la derecha mirando de A a B)
+    derecha_antes = _producto_cruzado(direccion_linea, p0 - a) >= 0
+    derecha_despues = _producto_cruzado(direccion_linea, p1 - a) >= 0
+    # Los extremos de la línea deben quedar a lados distintos del desplazamiento
+    lado_a = _producto_cruzado(desplazamiento, a - p0)
+    lado_b = _producto_cruzado(desplazamiento, b - p0)
+    dentro_segmento = lado_a * lado_b <= 0
+
+    cruza = (derecha_antes != derecha_despues) & dentro_segmento
+    return np.where(cruza, np.where(derecha_despues, 1, -1), 0)
+
+
+def puntos_en_poligonos(puntos, vertices_x, vertices_y):
+    """
+    Comprueba qué puntos están dentro de qué polígonos (regla par-impar)
+
+    Args:
+        puntos: Array (N, 2)
+        vertices_x: Array (Z, V) con las coordenadas x de los vértices de cada
+            polígono, rellenado repitiendo el último vértice
+        vertices_y: Array (Z, V) con las coordenadas y
+
+    Returns:
+        Matriz booleana (N, Z)
+    """
+    px = puntos[:, 0][:, None, None]
+    py = puntos[:, 1][:, None, None]
+    xi, yi = vertices_x[None], vertices_y[None]
+    # Cada vértice con el anterior; el relleno repetido genera aristas nulas
+    xj, yj = np.roll(xi, 1, axis=2), np.roll(yi, 1, axis=2)
+
+    cruza_horizontal = (yi > py) != (yj > py)
+    denominador = np.where(yj == yi, 1.0, yj - yi)
+    x_corte = (xj - xi) * (py - yi) / denominador + xi
+    cortes = cruza_horizontal & (px < x_corte)
+    return np.logical_xor.reduce(cortes, axis=2)
+
+
+class ConteoEscena:
+    """
+    Conteo por líneas y ocupación de zonas a partir de los centros de los objetos
+    """
+
+    def __init__(self, lineas=None, zonas=None, fps=None):
+        """
+        Inicializa el conteo
+
+        Args:
+            lineas: Lista de líneas {'nombre', 'puntos': [[x1, y1], [x2, y2]],
+                'sentidos': [nombre1, nombre2] (opcional)}
+            zonas: Lista de zonas {'nombre', 'puntos': [[x, y], ...]}
+            fps: Frames por segundo de la fuente, para dar la permanencia en
+                segundos además de en frames
+        """
+        lineas = lineas or []
+        zonas = zonas or []
+        self.fps = fps if fps and fps > 0 else None
+        self._indice_tipo = {tipo: i for i, tipo in enumerate(TIPOS)}
+
+        self.nombres_lineas = [linea.get('nombre', f"linea{i}") for i, linea in enumerate(lineas)]
+        self.sentidos = [tuple(linea.get('sentidos', ('sentido_1', 'sentido_2'))) for linea in lineas]
+        puntos = np.asarray([linea['puntos'] for linea in lineas], dtype=np.float64).reshape(-1, 2, 2)
+        self.inicios = puntos[:, 0]
+        self.finales = puntos[:, 1]
+        # Cruces por línea, sentido y tipo de objeto
+        self.cruces = np.zeros((len(lineas), 2, len(TIPOS)), dtype=np.int64)
+
+        self.nombres_zonas = [zona.get('nombre', f"zona{i}") for i, zona in enumerate(zonas)]
+        num_vertices = max((len(zona['puntos']) for zona in zonas), default=0)
+        self.vertices_x = np.zeros((len(zonas), num_vertices))
+        self.vertices_y = np.zeros((len(zonas), num_vertices))
+        for z, zona in enumerate(zonas):
+            vertices = np.asarray(zona['puntos'], dtype=np.float64)
+            relleno = np.vstack([vertices, np.repeat(vertices[-1:], num_vertices - len(vertices), axis=0)])
+            self.vertices_x[z] = relleno[:, 0]
+            self.vertices_y[z] = relleno[:, 1]
+        self.ocupacion = np.zeros(len(zonas), dtype=np.int64)
+        self.visitas = np.zeros(len(zonas), dtype=np.int64)
+        self.permanencia_total = np.zeros(len(zonas), dtype=np.int64)
+        self.permanencia_maxima = np.zeros(len(zonas), dtype=np.int64)
+        self.permanencias_completadas = np.zeros(len(zonas), dtype=np.int64)
+
+        self.frame = 0
+        # Último centro de cada objeto
+        self._centros = {}
+        # Frame de entrada en cada zona de cada objeto (-1 si está fuera)
+        self._entradas = {}
+
+    def _cerrar_permanencias(self, entradas):
+        """
+        Acumula la permanencia de las visitas que terminan (entradas >= 0)
+        """
+        terminadas = entradas >= 0
+        duraciones = np.where(terminadas, self.frame - entradas, 0)
+        self.permanencia_total += duraciones
+        self.permanencia_maxima = np.maximum(self.permanencia_maxima, duraciones)
+        self.permanencias_completadas += terminadas
+
+    def cerrar_visitas(self, ids):
+        """
+        Cierra las visitas a zonas de objetos que el rastreador deja de seguir
+
+        Args:
+            ids: IDs de los objetos
+        """
+        for obj_id in ids:
+            entradas = self._entradas.pop(obj_id, None)
+            if entradas is not None:
+                self._cerrar_permanencias(entradas)
+
+    def actualizar(self, ids, centros, tipos, ids_eliminados=()):
+        """
+        Procesa un frame
+
+        Args:
+            ids: Lista de IDs de los objetos seguidos
+            centros: Array (N, 2) con el centro actual de cada objeto
+            tipos: Lista con el tipo de cada objeto
+            ids_eliminados: IDs que el rastreador ha dejado de seguir en este frame
+        """
+        self.frame += 1
+        centros = np.asarray(centros, dtype=np.float64).reshape(-1, 2)
+
+        # Líneas: solo los objetos con posición en el frame anterior
+        if self.nombres_lineas and len(ids):
+            anteriores = [self._centros.get(obj_id) for obj_id in ids]
+            con_anterior = np.array([p is not None for p in anteriores])
+            if con_anterior.any():
+                origenes = np.asarray([p for p in anteriores if p is not None], dtype=np.float64)
+                sentidos = cruces_lineas(origenes, centros[con_anterior], self.inicios, self.finales)
+                filas, lineas = np.nonzero(sentidos)
+                if len(filas):
+                    tipos_con_anterior = np.array([self._indice_tipo.get(t, 0) for t, c in zip(tipos, con_anterior) if c])
+                    np.add.at(self.cruces, (lineas, (sentidos[filas, lineas] < 0).astype(int),
+                                            tipos_con_anterior[filas]), 1)
+        self._centros = dict(zip(ids, map(tuple, centros.tolist())))
+
+        if not self.nombres_zonas:
+            return
+
+        # Zonas: entradas y salidas comparando con el frame anterior
+        self.cerrar_visitas(ids_eliminados)
+
+        num_zonas = len(self.nombres_zonas)
+        dentro = puntos_en_poligonos(centros, self.vertices_x, self.vertices_y) if len(ids) \
+            else np.zeros((0, num_zonas), dtype=bool)
+        fuera = np.full(num_zonas, -1, dtype=np.int64)
+        entradas = np.array([self._entradas.get(obj_id, fuera) for obj_id in ids],
+                            dtype=np.int64).reshape(-1, num_zonas)
+        estaba_dentro = entradas >= 0
+
+        # Salidas: cerrar la visita; entradas: anotar el frame
+        salidas = estaba_dentro & ~dentro
+        if salidas.any():
+            duraciones = np.where(salidas, self.frame - entradas, 0)
+            self.permanencia_total += duraciones.sum(axis=0)
+            self.permanencia_maxima = np.maximum(self.permanencia_maxima, duraciones.max(axis=0))
+            self.permanencias_completadas += salidas.sum(axis=0)
+        nuevas = dentro & ~estaba_dentro
+        self.visitas += nuevas.sum(axis=0)
+        entradas = np.where(dentro, np.where(nuevas, self.frame, entradas), -1)
+
+        self._entradas = dict(zip(ids, entradas))
+        self.ocupacion = dentro.sum(axis=0)
+
+    def resumen(self):
+        """
+        Devuelve los conteos de las líneas y las estadísticas de las zonas
+
+        Returns:
+            Diccionario {'lineas': {nombre: {sentido: {tipo: n}}},
+                         'zonas': {nombre: {ocupacion, visitas, permanencia_media,
+                                            permanencia_maxima, unidad}}}
+        """
+        lineas = {}
+        for l, nombre in enumerate(self.nombres_lineas):
+            lineas[nombre] = {sentido: dict(zip(TIPOS, self.cruces[l, s].tolist()))
+                              for s, sentido in enumerate(self.sentidos[l])}
+
+        escala = 1.0 / self.fps if self.fps else 1.0
+        zonas = {}
+        for z, nombre in enumerate(self.nombres_zonas):
+            completadas = int(self.permanencias_completadas[z])
+            media = self.permanencia_total[z] / completadas if completadas else 0.0
+            zonas[nombre] = {
+                'ocupacion': int(self.ocupacion[z]),
+                'visitas': int(self.visitas[z]),
+                'permanencia_media': float(media * escala),
+                'permanencia_maxima': float(self.permanencia_maxima[z] * escala),
+                'unidad': 's' if self.fps else 'frames',
+            }
+        return {'lineas': lineas, 'zonas': zonas}
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Detecciones grabadas para repetir el seguimiento sin volver a ejecutar YOLO.
+
+Ajustar los umbrales del Detector (confianza, NMS) o del Rastreador
+(distancia, frames sin detección...) obliga a pasar la red por todo el video
+en cada prueba, aunque la red dé siempre las mismas salidas. Aquí la red se
+ejecuta una sola vez y se guardan sus candidatas de cada frame antes de la
+supresión de no máximos, con una confianza mínima baja:
+
+    grabar_detecciones    Ejecuta el Detector sobre un video y guarda las
+                          candidatas en un archivo .npz por columnas
+    DeteccionesGrabadas   Lee el archivo y aplica a cada frame la NMS con los
+                          umbrales que se pidan
+    barrer_parametros     Repite detección y seguimiento sobre las candidatas
+                          para una rejilla de parámetros, en varios procesos
+
+El archivo guarda todas las cajas de todos los frames seguidas en unos pocos
+arrays (cajas, confianzas, clases y el índice de la primera caja de cada
+frame), sin objetos de Python. Con umbrales de confianza iguales o mayores que
+la confianza mínima de la grabación, las cajas y tipos de cada frame son
+exactamente los que habría devuelto Detector.detect con esos umbrales.
+"""
+
+import itertools
+import json
+import multiprocessing
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.detector import Detector, aplicar_nms
+from src.rastreador import Rastreador
+
+# Parámetros del barrido que pertenecen al detector; el resto son del Rastreador
+PARAMETROS_DETECTOR = ('confidence_threshold', 'nms_threshold')
+
+# Detecciones del proceso trabajador (se cargan en _inicializar_trabajador)
+_grabadas = None
+# Última selección calculada en el trabajador: (umbrales, detecciones por frame)
+_ultima_seleccion = (None, None)
+
+
+def grabar_detecciones(ruta_video, ruta_salida, config_detector=None, umbral_minimo=0.05, roi=None,
+                       max_frames=None):
+    """
+    Ejecuta el detector sobre un video y guarda las candidatas de cada frame
+
+    Los frames de más de 640 píxeles de ancho se reducen a 640x360, como en
+    main.py, para que las cajas estén en las mismas coordenadas.
+
+    Args:
+        ruta_video: Ruta al archivo de video
+        ruta_salida: Archivo .npz en el que guardar las detecciones
+        config_detector: Argumentos con los que crear el Detector
+        umbral_minimo: Confianza mínima de las candidatas que se guardan; los
+            barridos solo pueden usar umbrales de confianza mayores o iguales
+        roi: Región de interés (x, y, w, h) o None para usar todo el frame
+        max_frames: Número máximo de frames a procesar, o None para todo el video
+
+    Returns:
+        Número de frames grabados
+    """
+    cap = cv2.VideoCapture(ruta_video)
+    if not cap.isOpened():
+        print("Error al abrir la fuente de video")
+        return 0
+    fps = cap.get(cv2.CAP_PROP_FPS) or None
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    detector = Detector(**(config_detector or {}))
+
+    cajas, confianzas, clases = [], [], []
+    inicio_frame = [0]
+    tam_frame = None
+    inicio = time.time()
+    while max_frames is None or len(inicio_frame) <= max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame.shape[1] > 640:
+            frame = cv2.resize(frame, (640, 360))
+        tam_frame = frame.shape[1::-1]
+        boxes, confidences, class_ids = detector.detect_candidatas(frame, roi, umbral_minimo)
+        cajas.append(boxes)
+        confianzas.append(confidences)
+        clases.append(class_ids)
+        inicio_frame.append(inicio_frame[-1] + len(boxes))
+        print(f"\rFrames grabados: {len(inicio_frame) - 1}/{total_frames}", end="")
+    print()
+    cap.release()
+
+    num_frames = len(inicio_frame) - 1
+    metadatos = {
+        'video': os.path.abspath(ruta_video),
+        'modelo': detector.huella(),
+        'tam_entrada': list(detector.tam_entrada),
+        'umbral_minimo': umbral_minimo,
+        'roi': list(roi) if roi else None,
+        'tam_frame': list(tam_frame) if tam_frame else None,
+        'fps': fps,
+        'tiempo_deteccion': time.time() - inicio,
+    }
+    np.savez(ruta_salida,
+             cajas=np.concatenate(cajas).astype(np.int32) if cajas else np.empty((0, 4), dtype=np.int32),
+             confianzas=np.concatenate(confianzas).astype(np.float32) if confianzas else np.empty(0, np.float32),
+             clases=np.concatenate(clases).astype(np.int16) if clases else np.empty(0, np.int16),
+             inicio_frame=np.array(inicio_frame, dtype=np.int64),
+             tipos_por_clase=detector._tipos_por_clase.astype(str),
+             metadatos=np.array(json.dumps(metadatos)))
+    print(f"{num_frames} frames y {inicio_frame[-1]} candidatas guardadas en {ruta_salida}")
+    return num_frames
+
+
+class DeteccionesGrabadas:
+    """
+    Candidatas grabadas con grabar_detecciones, frame a frame
+    """
+
+    def __init__(self, ruta):
+        """
+        Args:
+            ruta: Archivo .npz creado con grabar_detecciones
+        """
+        with np.load(ruta, allow_pickle=False) as datos:
+            self.cajas = datos['cajas']
+            self.confianzas = datos['confianzas']
+            self.clases = datos['clases']
+            self.inicio_frame = datos['inicio_frame']
+            self.tipos_por_clase = datos['tipos_por_clase']
+            self.metadatos = json.loads(str(datos['metadatos']))
+        self.num_frames = len(self.inicio_frame) - 1
+
+    def candidatas(self, indice):
+        """
+        Devuelve las candidatas de un frame
+
+        Returns:
+            Arrays (cajas [N, 4], confianzas [N], clases [N])
+        """
+        inicio, fin = self.inicio_frame[indice], self.inicio_frame[indice + 1]
+        return self.cajas[inicio:fin], self.confianzas[inicio:fin], self.clases[inicio:fin]
+
+    def seleccionar(self, indice, confidence_threshold=0.4, nms_threshold=0.4):
+        """
+        Aplica a las candidatas de un frame la NMS del Detector con otros umbrales
+
+        Returns:
+            Lista de rectángulos (x, y, w, h) y lista de tipos de objetos, como
+            Detector.detect
+        """
+        cajas, confianzas, clases = self.candidatas(indice)
+        validas = np.flatnonzero(confianzas > confidence_threshold)
+        if len(validas) == 0:
+            return [], []
+        indices = validas[aplicar_nms(cajas[validas], confianzas[validas], confidence_threshold, nms_threshold)]
+        return ([tuple(caja) for caja in cajas[indices].tolist()],
+                self.tipos_por_clase[clases[indices]].tolist())
+
+    def detecciones(self, confidence_threshold=0.4, nms_threshold=0.4):
+        """
+        Selecciona las detecciones de todos los frames
+
+        Returns:
+            Lista de tuplas (rectángulos, tipos), una por frame
+        """
+        if confidence_threshold < self.metadatos['umbral_minimo']:
+            raise ValueError(f"Umbral de confianza {confidence_threshold} menor que el de la grabación "
+                             f"({self.metadatos['umbral_minimo']})")
+        return [self.seleccionar(i, confidence_threshold, nms_threshold) for i in range(self.num_frames)]
+
+
+def rejilla_parametros(valores):
+    """
+    Genera todas las combinaciones de una rejilla de parámetros
+
+    Args:
+        valores: Diccionario {parámetro: lista de valores}
+
+    Returns:
+        Lista de diccionarios {parámetro: valor}
+    """
+    nombres = list(valores)
+    return [dict(zip(nombres, combinacion)) for combinacion in itertools.product(*valores.values())]
+
+
+def _inicializar_trabajador(ruta):
+    """
+    Carga las detecciones grabadas en el proceso trabajador
+    """
+    global _grabadas
+    # El seguimiento es de un solo hilo; evitar que OpenCV reparta la NMS
+    cv2.setNumThreads(1)
+    _grabadas = DeteccionesGrabadas(ruta)
+
+
+def _evaluar(tarea):
+    """
+    Repite detección y seguimiento con una combinación de parámetros
+
+    Args:
+        tarea: Tupla (índice, parámetros, argumentos comunes del Rastreador)
+
+    Returns:
+        Tupla (índice, resultado)
+    """
+    global _ultima_seleccion
+    indice, parametros, comunes = tarea
+    umbrales = {clave: parametros[clave] for clave in PARAMETROS_DETECTOR if clave in parametros}
+    # Las tareas llegan ordenadas por umbrales del detector: la selección se reutiliza
+    if _ultima_seleccion[0] != umbrales:
+        _ultima_seleccion = (umbrales, _grabadas.detecciones(**umbrales))
+    detecciones = _ultima_seleccion[1]
+
+    inicio = time.perf_counter()
+    rastreador = Rastreador(**comunes, **{clave: valor for clave, valor in parametros.items()
+                                         if clave not in PARAMETROS_DETECTOR})
+    for boxes, tipos in detecciones:
+        rastreador.actualizar(boxes, tipos)
+    return indice, {
+        'parametros': parametros,
+        'contadores': dict(rastreador.get_contadores()),
+        'objetos': rastreador.id_contador - 1,
+        'conteo': rastreador.get_conteo(),
+        'tiempo': time.perf_counter() - inicio,
+    }
+
+
+def barrer_parametros(ruta, combinaciones, num_procesos=None, lineas=None, zonas=None):
+    """
+    Evalúa una lista de combinaciones de parámetros sobre las detecciones grabadas
+
+    Cada combinación puede fijar los umbrales del detector (ver
+    PARAMETROS_DETECTOR) y cualquier argumento del Rastreador; los que no fija
+    toman su valor por defecto. Las combinaciones se reparten entre procesos
+    que cargan el archivo una sola vez cada uno.
+
+    Args:
+        ruta: Archivo .npz creado con grabar_detecciones
+        combinaciones: Lista de diccionarios {parámetro: valor}
+        num_procesos: Número de procesos (por defecto, uno por núcleo)
+        lineas: Líneas de conteo del Rastreador
+        zonas: Zonas del Rastreador
+
+    Returns:
+        Lista de resultados en el orden de las combinaciones, cada uno un
+        diccionario con parametros, contadores, objetos (IDs creados),
+        conteo (líneas y zonas, o None) y tiempo del seguimiento en segundos
+    """
+    num_procesos = num_procesos or os.cpu_count() or 1
+    with np.load(ruta, allow_pickle=False) as datos:
+        metadatos = json.loads(str(datos['metadatos']))
+    minima = min((c.get('confidence_threshold', 0.4) for c in combinaciones), default=None)
+    if minima is not None and minima < metadatos['umbral_minimo']:
+        raise ValueError(f"Umbral de confianza {minima} menor que el de la grabación ({metadatos['umbral_minimo']})")
+    comunes = dict(lineas=lineas, zonas=zonas, fps=metadatos['fps'])
+
+    # Ordenar por umbrales del detector para que cada proceso reutilice la selección
+    def clave_orden(i):
+        return tuple(repr(combinaciones[i].get(clave)) for clave in PARAMETROS_DETECTOR)
+    orden = sorted(range(len(combinaciones)), key=clave_orden)
+    tareas = [(i, combinaciones[i], comunes) for i in orden]
+    trozo = max(1, len(tareas) // (num_procesos * 4))
+
+    resultados = [None] * len(combinaciones)
+    with multiprocessing.Pool(num_procesos, initializer=_inicializar_trabajador, initargs=(ruta,)) as pool:
+        for hechas, (indice, resultado) in enumerate(pool.imap_unordered(_evaluar, tareas, chunksize=trozo), 1):
+            resultados[indice] = resultado
+            print(f"\rCombinaciones evaluadas: {hechas}/{len(tareas)}", end="")
+    print()
+    return resultados
@@ -2,13 +2,259 @@ import cv2
 import numpy as np
 import time
 
+from src.cache_red import cargar_red, obtener_red, calentar_red, huella_modelo
+from src.buffers import BufferBlob
+
+
+def decodificar_salidas(outputs, ancho, alto, mascara_clases, umbral_confianza):
+    """
+    Decodifica las salidas de YOLO tratando cada tensor como un único array de NumPy
+    
+    Equivale fila a fila al bucle original: argmax de las puntuaciones, filtro por
+    confianza y por clase de interés, y conversión de coordenadas relativas a píxeles
+    con truncamiento hacia cero (igual que int()).
+    
+    Args:
+        outputs: Lista de tensores de salida de la red, cada uno de forma (N, 5 + clases)
+        ancho: Ancho de la imagen de entrada en píxeles
+        alto: Alto de la imagen de entrada en píxeles
+        mascara_clases: Array booleano indexado por clase con las clases de interés
+        umbral_confianza: Umbral mínimo de confianza
+        
+    Returns:
+        Arrays (boxes [N, 4] int, confidences [N] float32, class_ids [N] int)
+    """
+    if len(outputs) == 0:
+        return (np.empty((0, 4), dtype=np.int64), np.empty(0, dtype=np.float32),
+                np.empty(0, dtype=np.int64))
+    
+    detecciones = outputs[0] if len(outputs) == 1 else np.concatenate(outputs, axis=0)
+    detecciones = detecciones.reshape(-1, detecciones.shape[-1])
+    scores = detecciones[:, 5:]
+    
+    # Clase con mayor puntuación y su confianza para cada fila
+    class_ids = np.argmax(scores, axis=1)
+    confidences = scores[np.arange(len(scores)), class_ids]
+    
+    # Filtrar por confianza y clases que nos interesan
+    validas = (confidences > umbral_confianza) & mascara_clases[class_ids]
+    detecciones = detecciones[validas]
+    confidences = confidences[validas]
+    class_ids = class_ids[validas]
+    
+    # Convertir coordenadas de YOLO a coordenadas del frame
+    center_x = (detecciones[:, 0] * ancho).astype(np.int64)
+    center_y = (detecciones[:, 1] * alto).astype(np.int64)
+    w_det = (detecciones[:, 2] * ancho).astype(np.int64)
+    h_det = (detecciones[:, 3] * alto).astype(np.int64)
+    
+    # Coordenadas de la esquina superior izquierda
+    x_det = (center_x - w_det / 2).astype(np.int64)
+    y_det = (center_y - h_det / 2).astype(np.int64)
+    
+    boxes = np.stack([x_det, y_det, w_det, h_det], axis=1)
+    return boxes, confidences, class_ids
+
+
+def aplicar_nms(boxes, confidences, umbral_confianza, umbral_nms):
+    """
+    Supresión de no máximos de OpenCV sobre las cajas candidatas
+    
+    Args:
+        boxes: Array (N, 4) de cajas (x, y, w, h)
+        confidences: Array (N,) de confianzas
+        umbral_confianza: Las cajas con confianza menor o igual se descartan
+        umbral_nms: IoU a partir de la cual se suprime la caja de menor confianza
+        
+    Returns:
+        Array con los índices de las cajas conservadas, por confianza descendente
+    """
+    indices = cv2.dnn.NMSBoxes(boxes.tolist(), confidences.tolist(), umbral_confianza, umbral_nms)
+    return np.asarray(indices, dtype=np.int64).flatten()
+
+
+def dividir_salidas_lote(outputs, num_frames):
+    """
+    Reparte las salidas de una pasada por lotes entre los frames del lote
+    
+    Según la versión de OpenCV, las capas de salida de YOLO devuelven un tensor
+    (N, filas, columnas) o las filas de todos los frames concatenadas en
+    (N * filas, columnas); ambos casos se manejan aquí.
+    
+    Args:
+        outputs: Lista de tensores de salida, uno por capa
+        num_frames: Número de frames del lote
+        
+    Returns:
+        Lista con una lista de tensores (uno por capa) para cada frame
+    """
+    por_frame = [[] for _ in range(num_frames)]
+    for output in outputs:
+        output = output.reshape(num_frames, -1, output.shape[-1])
+        for i in range(num_frames):
+            por_frame[i].append(output[i])
+    return por_frame
+
+
+# Backends y targets de OpenCV DNN que se pueden elegir por nombre
+BACKENDS = {
+    'default': cv2.dnn.DNN_BACKEND_DEFAULT,
+    'opencv': cv2.dnn.DNN_BACKEND_OPENCV,
+    'openvino': cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+    'cuda': cv2.dnn.DNN_BACKEND_CUDA,
+}
+TARGETS = {
+    'cpu': cv2.dnn.DNN_TARGET_CPU,
+    'cpu_fp16': getattr(cv2.dnn, 'DNN_TARGET_CPU_FP16', None),
+    'opencl': cv2.dnn.DNN_TARGET_OPENCL,
+    'opencl_fp16': cv2.dnn.DNN_TARGET_OPENCL_FP16,
+    'cuda': cv2.dnn.DNN_TARGET_CUDA,
+    'cuda_fp16': cv2.dnn.DNN_TARGET_CUDA_FP16,
+    'myriad': cv2.dnn.DNN_TARGET_MYRIAD,
+}
+# Los targets que no existen en la versión instalada de OpenCV no se ofrecen
+TARGETS = {nombre: valor for nombre, valor in TARGETS.items() if valor is not None}
+
+
+def combinaciones_disponibles():
+    """
+    Combinaciones de backend y target que la instalación de OpenCV puede usar
+    
+    Returns:
+        Lista de tuplas (backend, target) con sus nombres
+    """
+    combinaciones = []
+    for backend, valor_backend in BACKENDS.items():
+        disponibles = set(cv2.dnn.getAvailableTargets(valor_backend))
+        combinaciones.extend((backend, target) for target, valor_target in TARGETS.items()
+                             if valor_target in disponibles)
+    return combinaciones
+
+
+def normalizar_tam_entrada(tam_entrada):
+    """
+    Convierte el tamaño de entrada de la red en una tupla (ancho, alto) de
+    múltiplos de 32, que es lo que admite YOLO
+    
+    Args:
+        tam_entrada: Entero para una entrada cuadrada, o (ancho, alto)
+        
+    Returns:
+        Tupla (ancho, alto)
+    """
+    if isinstance(tam_entrada, int):
+        tam_entrada = (tam_entrada, tam_entrada)
+    ajustado = tuple(max(32, int(round(lado / 32)) * 32) for lado in tam_entrada)
+    if ajustado != tuple(tam_entrada):
+        print(f"Tamaño de entrada {tuple(tam_entrada)} ajustado a {ajustado} (múltiplo de 32)")
+    return ajustado
+
+
+def generar_teselas(ancho, alto, tam_tesela, solape):
+    """
+    Divide una región en teselas solapadas que la cubren por completo
+    
+    Args:
+        ancho: Ancho de la región
+        alto: Alto de la región
+        tam_tesela: Tamaño (ancho, alto) de cada tesela; si la región es menor,
+            se usa una sola tesela del tamaño de la región
+        solape: Fracción de solape entre teselas vecinas (0-1)
+        
+    Returns:
+        Lista de teselas (x, y, w, h) relativas a la región
+    """
+    def posiciones(total, tam):
+        if tam >= total:
+            return [0], total
+        paso = max(1, int(tam * (1 - solape)))
+        inicios = list(range(0, total - tam, paso))
+        # La última tesela se alinea con el borde
+        inicios.append(total - tam)
+        return inicios, tam
+    
+    xs, tw = posiciones(ancho, tam_tesela[0])
+    ys, th = posiciones(alto, tam_tesela[1])
+    return [(tx, ty, tw, th) for ty in ys for tx in xs]
+
+
+def suprimir_contenidas(boxes, umbral):
+    """
+    Marca las cajas que están contenidas en otra anterior (de mayor confianza)
+    en más de una proporción de su área
+    
+    Args:
+        boxes: Array (N, 4) de cajas (x, y, w, h) ordenadas por confianza descendente
+        umbral: Proporción del área de la caja cubierta por otra para descartarla
+        
+    Returns:
+        Array booleano (N,) con las cajas que se conservan
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    x1, y1 = boxes[:, 0], boxes[:, 1]
+    x2, y2 = x1 + boxes[:, 2], y1 + boxes[:, 3]
+    inter_w = np.clip(np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]), 0, None)
+    inter_h = np.clip(np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]), 0, None)
+    areas = np.maximum(boxes[:, 2] * boxes[:, 3], 1e-9)
+    # cubierta[i, j]: proporción del área de j cubierta por i
+    cubierta = inter_w * inter_h / areas[None, :]
+    
+    conservar = np.ones(len(boxes), dtype=bool)
+    for j in range(1, len(boxes)):
+        if (cubierta[:j, j][conservar[:j]] > umbral).any():
+            conservar[j] = False
+    return conservar
+
+
+def extraer_region(frame, roi):
+    """
+    Extrae la región de interés de un frame validando sus límites
+    
+    Args:
+        frame: Imagen o frame donde detectar objetos
+        roi: Región de interés (x, y, w, h) o None para usar todo el frame
+        
+    Returns:
+        Tupla (roi_frame, x, y) con la región y su desplazamiento en el frame
+    """
+    if roi is not None:
+        x, y, w, h = roi
+        
+        # Verificar que el ROI está dentro de los límites del frame
+        frame_height, frame_width = frame.shape[:2]
+        if x < 0 or y < 0 or x + w > frame_width or y + h > frame_height or w <= 0 or h <= 0:
+            print(f"ROI inválido ({x},{y},{w},{h}) para un frame de {frame_width}x{frame_height}")
+            roi_frame = frame
+            x, y = 0, 0
+        else:
+            try:
+                roi_frame = frame[y:y+h, x:x+w]
+            except Exception as e:
+                print(f"Error al extraer ROI: {e}")
+                roi_frame = frame
+                x, y = 0, 0
+    else:
+        roi_frame = frame
+        x, y = 0, 0
+    
+    # Verificar que el roi_frame es válido
+    if roi_frame is None or roi_frame.size == 0:
+        print("ROI inválido, usando frame completo")
+        roi_frame = frame
+        x, y = 0, 0
+        
+    return roi_frame, x, y
+
+
 class Detector:
 
     """
     Clase para detectar objetos en imágenes o frames de video usando YOLOv4
     """ 
     def __init__(self, yolo_weights='models/yolov4-tiny.weights', yolo_cfg='models/yolov4-tiny.cfg', 
-                 coco_names='models/coco.names', confidence_threshold=0.4, nms_threshold=0.4):
+                 coco_names='models/coco.names', confidence_threshold=0.4, nms_threshold=0.4,
+                 tam_entrada=(288, 288), backend='default', target='cpu', hilos=None,
+                 usar_cache=True, calentar=True, metricas=None, cache=None):
         """
         Inicializa el detector de objetos    
         Args:
@@ -17,6 +263,22 @@ class Detector:
             coco_names: Ruta al archivo con las clases de COCO
             confidence_threshold: Umbral de confianza para detecciones
             nms_threshold: Umbral para supresión de no máximos
+            tam_entrada: Tamaño de entrada de la red, entero o (ancho, alto),
+                en múltiplos de 32. Más pequeño es más rápido pero pierde
+                objetos pequeños
+            backend: Backend de OpenCV DNN (ver BACKENDS)
+            target: Dispositivo y precisión de cálculo (ver TARGETS)
+            hilos: Hilos de OpenCV (cv2.setNumThreads, afecta a todo el
+                proceso) o None para no cambiarlos
+            usar_cache: Reutilizar la red si otro Detector del proceso ya cargó
+                el mismo modelo (ver src/cache_red.py). Una red compartida no
+                debe usarse desde varios hilos a la vez
+            calentar: Ejecutar una pasada de calentamiento antes del primer frame
+            metricas: Instancia de Metricas (src/metricas.py) en la que registrar
+                la duración de las etapas blob, inferencia, decodificacion y nms
+            cache: CacheDetecciones (src/cache_detecciones.py) con los resultados
+                de regiones ya procesadas; detect y detect_batch no ejecutan la
+                red para las que estén guardadas
         """
         import os
         
@@ -31,12 +293,38 @@ class Detector:
         if not os.path.isabs(coco_names):
             coco_names = os.path.join(base_dir, coco_names)
             
-        # Cargar la red neuronal
-        self.net = cv2.dnn.readNetFromDarknet(yolo_cfg, yolo_weights)
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend desconocido: {backend}")
+        if target not in TARGETS:
+            raise ValueError(f"Target desconocido: {target}")
+        
+        if hilos is not None:
+            cv2.setNumThreads(hilos)
+        self.yolo_weights = yolo_weights
+        self.yolo_cfg = yolo_cfg
+        self._huella = None
+        self.tam_entrada = normalizar_tam_entrada(tam_entrada)
+        self.metricas = metricas
+        self.cache = cache
+        # Blob de entrada reutilizado en cada pasada en lugar de crear uno nuevo
+        self._buffer_blob = BufferBlob(self.tam_entrada)
         
-        # Utilizar CPU (más compatible en todos los sistemas)
-        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_DEFAULT)
-        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        # Por defecto CPU (más compatible en todos los sistemas)
+        if (backend, target) not in combinaciones_disponibles():
+            print(f"La combinación {backend}/{target} no está disponible en esta instalación de OpenCV. Usando default/cpu.")
+            backend, target = 'default', 'cpu'
+        self.backend = backend
+        self.target = target
+        
+        # Cargar la red neuronal, o reutilizarla si ya está en la caché del proceso
+        if usar_cache:
+            self._entrada_red, self.red_reutilizada = obtener_red(yolo_cfg, yolo_weights,
+                                                                  BACKENDS[backend], TARGETS[target])
+        else:
+            self._entrada_red = cargar_red(yolo_cfg, yolo_weights, BACKENDS[backend], TARGETS[target])
+            self.red_reutilizada = False
+        self.net = self._entrada_red.red
+        self.tiempo_carga = 0.0 if self.red_reutilizada else self._entrada_red.tiempo_carga
         
         # Cargar las clases
         with open(coco_names, 'r') as f:
@@ -46,6 +334,11 @@ class Detector:
         layer_names = self.net.getLayerNames()
         self.output_layers = [layer_names[i - 1] for i in self.net.getUnconnectedOutLayers().flatten()]
         
+        # La primera pasada prepara las capas; mejor hacerla antes del primer frame
+        self.tiempo_calentamiento = 0.0
+        if calentar:
+            self.calentar()
+        
         # Mapeo de clases COCO a nuestras categorías
         self.class_mapping = {
             'car': 'vehiculo',
@@ -65,6 +358,151 @@ class Detector:
         
         # Lista de clases que nos interesan detectar (índices en COCO)
         self.target_classes = [2, 3, 5, 7, 0]  # car, motorcycle, bus, truck, person
+        
+        # Tablas precalculadas para decodificar las salidas sin bucles en Python
+        self._mascara_clases = np.zeros(len(self.classes), dtype=bool)
+        self._mascara_clases[self.target_classes] = True
+        # Por defecto, si no está en el mapping, es un vehículo
+        self._tipos_por_clase = np.array(
+            [self.class_mapping.get(nombre, 'vehiculo') for nombre in self.classes], dtype=object)
+
+    def huella(self):
+        """
+        Identificador del modelo por el contenido de sus archivos (ver src/cache_red.py)
+        """
+        if self._huella is None:
+            self._huella = huella_modelo(self.yolo_cfg, self.yolo_weights)
+        return self._huella
+
+    def identidad(self):
+        """
+        Texto que identifica todo lo que determina el resultado de la red para
+        una imagen: modelo, tamaño de entrada, umbrales, backend y target
+        """
+        return (f"{self.huella()}|{self.tam_entrada[0]}x{self.tam_entrada[1]}|{self.confidence_threshold}|"
+                f"{self.nms_threshold}|{self.backend}|{self.target}")
+
+    def _buscar_en_cache(self, roi_frame):
+        """
+        Busca en la caché el resultado de una región
+
+        Returns:
+            Tupla (clave, resultado) con el resultado (rectángulos relativos a
+            la región, tipos) o None si no está guardado
+        """
+        inicio = time.perf_counter()
+        clave = self.cache.clave(roi_frame, self.identidad())
+        resultado = self.cache.buscar(clave)
+        self._medir('cache_detecciones', inicio)
+        return clave, resultado
+
+    def _guardar_en_cache(self, clave, boxes, types, x, y):
+        """
+        Guarda en la caché un resultado, con las cajas relativas a la región
+        """
+        self.cache.guardar(clave, [(bx - x, by - y, w, h) for bx, by, w, h in boxes], types)
+
+    def cambiar_tam_entrada(self, tam_entrada, calentar=True):
+        """
+        Cambia el tamaño de entrada de la red
+        
+        El blob reutilizado tiene el tamaño de entrada fijo, así que se crea de
+        nuevo; asignar self.tam_entrada directamente no cambia lo que recibe la red.
+        
+        Args:
+            tam_entrada: Entero para una entrada cuadrada, o (ancho, alto);
+                se ajusta a múltiplos de 32
+            calentar: Ejecutar la pasada de calentamiento con el nuevo tamaño
+            
+        Returns:
+            Tamaño (ancho, alto) aplicado
+        """
+        self.tam_entrada = normalizar_tam_entrada(tam_entrada)
+        self._buffer_blob = BufferBlob(self.tam_entrada)
+        if calentar:
+            self.calentar()
+        return self.tam_entrada
+
+    def calentar(self):
+        """
+        Ejecuta una pasada de la red con una imagen vacía del tamaño de entrada
+        
+        Returns:
+            Tiempo del calentamiento en segundos (0 si la red ya estaba caliente)
+        """
+        tiempo = calentar_red(self._entrada_red, self.output_layers, self.tam_entrada)
+        self.tiempo_calentamiento += tiempo
+        return tiempo
+
+    def _medir(self, etapa, inicio):
+        """
+        Registra en las métricas la duración de una etapa que empezó en
+        `inicio` (time.perf_counter) y devuelve el instante actual
+        """
+        ahora = time.perf_counter()
+        if self.metricas is not None:
+            self.metricas.observar(etapa, ahora - inicio)
+        return ahora
+
+    def _procesar_salidas(self, outputs, width, height, x, y):
+        """
+        Decodifica las salidas de la red, aplica NMS y traslada las cajas al frame
+        
+        Args:
+            outputs: Tensores de salida de la red para una sola imagen
+            width: Ancho de la región procesada
+            height: Alto de la región procesada
+            x: Desplazamiento horizontal de la región en el frame
+            y: Desplazamiento vertical de la región en el frame
+            
+        Returns:
+            Lista de rectángulos (x, y, w, h) y lista de tipos de objetos
+        """
+        # Procesar las salidas de forma vectorizada
+        inicio = time.perf_counter()
+        boxes, confidences, class_ids = decodificar_salidas(
+            outputs, width, height, self._mascara_clases, self.confidence_threshold)
+        
+        # Ajustar coordenadas a la ROI (la NMS no depende de la traslación)
+        boxes[:, 0] += x
+        boxes[:, 1] += y
+        self._medir('decodificacion', inicio)
+        
+        return self._seleccionar(boxes, confidences, class_ids)
+
+    def _seleccionar(self, boxes, confidences, class_ids, umbral_contencion=None):
+        """
+        Aplica la supresión de no máximos y obtiene los tipos de objeto
+        
+        Args:
+            boxes: Array (N, 4) de cajas en coordenadas del frame
+            confidences: Array (N,) de confianzas
+            class_ids: Array (N,) de clases COCO
+            umbral_contencion: Si se indica, también se descartan las cajas
+                contenidas en otra de mayor confianza en más de esta proporción
+                de su área (fragmentos de un objeto cortado entre teselas)
+            
+        Returns:
+            Lista de rectángulos (x, y, w, h) y lista de tipos de objetos
+        """
+        # Aplicar supresión de no máximos
+        inicio = time.perf_counter()
+        indices = aplicar_nms(boxes, confidences, self.confidence_threshold, self.nms_threshold)
+        
+        # Preparar resultados
+        result_boxes = []
+        result_types = []
+        
+        if len(indices) > 0:
+            if umbral_contencion is not None:
+                indices = indices[suprimir_contenidas(boxes[indices], umbral_contencion)]
+            
+            result_boxes = [tuple(box) for box in boxes[indices].tolist()]
+            # Obtener el tipo de objeto de todas las detecciones a la vez
+            result_types = self._tipos_por_clase[class_ids[indices]].tolist()
+        
+        self._medir('nms', inicio)
+        return result_boxes, result_types
 
     # Método para detectar objetos en un frame
     def detect(self, frame, roi=None):
@@ -83,99 +521,224 @@ class Detector:
             print("Frame inválido para detección")
             return [], [], 0
             
-        if roi is not None:
-            x, y, w, h = roi
-            
-            # Verificar que el ROI está dentro de los límites del frame
-            frame_height, frame_width = frame.shape[:2]
-            if x < 0 or y < 0 or x + w > frame_width or y + h > frame_height or w <= 0 or h <= 0:
-                print(f"ROI inválido ({x},{y},{w},{h}) para un frame de {frame_width}x{frame_height}")
-                roi_frame = frame
-                x, y = 0, 0
-            else:
-                try:
-                    roi_frame = frame[y:y+h, x:x+w]
-                except Exception as e:
-                    print(f"Error al extraer ROI: {e}")
-                    roi_frame = frame
-                    x, y = 0, 0
-        else:
-            roi_frame = frame
-            x, y = 0, 0
-        
-        # Verificar que el roi_frame es válido
-        if roi_frame is None or roi_frame.size == 0:
-            print("ROI inválido, usando frame completo")
-            roi_frame = frame
-            x, y = 0, 0
-          # Dimensiones del frame
+        roi_frame, x, y = extraer_region(frame, roi)
+        # Dimensiones del frame
         height, width, _ = roi_frame.shape
         
+        if self.cache is not None:
+            clave, guardado = self._buscar_en_cache(roi_frame)
+            if guardado is not None:
+                return [(bx + x, by + y, w, h) for bx, by, w, h in guardado[0]], guardado[1], 0
+        
+        outputs, tiempo = self._inferir(roi_frame)
+        if outputs is None:
+            return [], [], 0
+        
+        result_boxes, result_types = self._procesar_salidas(outputs, width, height, x, y)
+        if self.cache is not None:
+            self._guardar_en_cache(clave, result_boxes, result_types, x, y)
+        return result_boxes, result_types, tiempo
+
+    def _inferir(self, roi_frame):
+        """
+        Prepara el blob de una región y ejecuta la red
+        
+        Returns:
+            Tupla (salidas de la red, tiempo de inferencia en segundos), con
+            salidas None si la red falla
+        """
         # Preparar el blob y hacer la detección (tamaño reducido para mejor rendimiento)
         try:
-            blob = cv2.dnn.blobFromImage(roi_frame, 1/255.0, (288, 288), swapRB=True, crop=False)
+            inicio = time.perf_counter()
+            blob = self._buffer_blob.llenar([roi_frame])
             self.net.setInput(blob)
             
-            start_time = time.time()
+            start_time = self._medir('blob', inicio)
             outputs = self.net.forward(self.output_layers)
-            end_time = time.time()
+            end_time = self._medir('inferencia', start_time)
         except Exception as e:
             print(f"Error en el procesamiento de la red neuronal: {e}")
-            return [], [], 0
+            return None, 0
+        return outputs, end_time - start_time
+
+    def detect_candidatas(self, frame, roi=None, umbral_confianza=None):
+        """
+        Detecta objetos en un frame sin aplicar la supresión de no máximos
         
-        # Procesar las salidas
-        boxes = []
-        confidences = []
-        class_ids = []
+        Devuelve todas las cajas de las clases de interés que superan el umbral,
+        tal como salen de la red, para poder aplicar después la NMS con otros
+        umbrales (ver src/detecciones_grabadas.py). Con los umbrales del
+        detector, aplicar_nms sobre ellas da exactamente el resultado de detect.
         
-        for output in outputs:
-            for detection in output:
-                scores = detection[5:]
-                class_id = np.argmax(scores)
-                confidence = scores[class_id]
-                
-                # Filtrar por confianza y clases que nos interesan
-                if confidence > self.confidence_threshold and class_id in self.target_classes:
-                    # Convertir coordenadas de YOLO a coordenadas del frame
-                    center_x = int(detection[0] * width)
-                    center_y = int(detection[1] * height)
-                    w_det = int(detection[2] * width)
-                    h_det = int(detection[3] * height)
-                    
-                    # Coordenadas de la esquina superior izquierda
-                    x_det = int(center_x - w_det / 2)
-                    y_det = int(center_y - h_det / 2)
-                    
-                    boxes.append([x_det, y_det, w_det, h_det])
-                    confidences.append(float(confidence))
-                    class_ids.append(class_id)
-                    
-        # Aplicar supresión de no máximos
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, self.confidence_threshold, self.nms_threshold)
+        Args:
+            frame: Imagen o frame donde detectar objetos
+            roi: Región de interés (x, y, w, h) o None para usar todo el frame
+            umbral_confianza: Confianza mínima de las candidatas (por defecto,
+                la del detector)
+            
+        Returns:
+            Arrays (boxes [N, 4] en coordenadas del frame, confidences [N],
+            class_ids [N]); vacíos si el frame no es válido o la red falla
+        """
+        if umbral_confianza is None:
+            umbral_confianza = self.confidence_threshold
+        vacias = decodificar_salidas([], 0, 0, self._mascara_clases, umbral_confianza)
+        if frame is None or frame.size == 0:
+            print("Frame inválido para detección")
+            return vacias
         
-        # Preparar resultados
-        result_boxes = []
-        result_types = []
+        roi_frame, x, y = extraer_region(frame, roi)
+        height, width = roi_frame.shape[:2]
+        outputs, _ = self._inferir(roi_frame)
+        if outputs is None:
+            return vacias
         
-        if len(indices) > 0:
-            for i in indices.flatten():
-                # Ajustar las coordenadas si estamos usando ROI
-                box = boxes[i]
-                x_det, y_det, w_det, h_det = box
-                
-                # Ajustar coordenadas a la ROI
-                if roi is not None:
-                    x_det += x
-                    y_det += y
-                
-                result_boxes.append((x_det, y_det, w_det, h_det))
-                
-                # Obtener el tipo de objeto
-                class_name = self.classes[class_ids[i]]
-                if class_name in self.class_mapping:
-                    result_types.append(self.class_mapping[class_name])
+        inicio = time.perf_counter()
+        boxes, confidences, class_ids = decodificar_salidas(
+            outputs, width, height, self._mascara_clases, umbral_confianza)
+        boxes[:, 0] += x
+        boxes[:, 1] += y
+        self._medir('decodificacion', inicio)
+        return boxes, confidences, class_ids
+
+    def detect_batch(self, frames, rois=None):
+        """
+        Detecta objetos en varios frames con una sola pasada de la red
+        
+        Todos los frames se agrupan en un blob 4-D con blobFromImages y las salidas
+        se reparten después por frame. El tiempo devuelto para cada frame es el
+        tiempo de la pasada completa dividido entre el número de frames.
+        
+        Args:
+            frames: Lista de frames donde detectar objetos
+            rois: Lista de regiones de interés (una por frame, o None), o None
+                para usar los frames completos
+            
+        Returns:
+            Lista de tuplas (rectángulos, tipos, tiempo), una por frame
+        """
+        if rois is None:
+            rois = [None] * len(frames)
+            
+        resultados = [([], [], 0)] * len(frames)
+        
+        # Extraer las regiones de los frames válidos
+        validos = []
+        regiones = []
+        for i, (frame, roi) in enumerate(zip(frames, rois)):
+            if frame is None or frame.size == 0:
+                print("Frame inválido para detección")
+                continue
+            validos.append(i)
+            regiones.append(extraer_region(frame, roi))
+        
+        # Las regiones guardadas en la caché no pasan por la red
+        claves = [None] * len(regiones)
+        if self.cache is not None:
+            pendientes = []
+            for j, (i, (roi_frame, x, y)) in enumerate(zip(validos, regiones)):
+                claves[j], guardado = self._buscar_en_cache(roi_frame)
+                if guardado is not None:
+                    resultados[i] = ([(bx + x, by + y, w, h) for bx, by, w, h in guardado[0]], guardado[1], 0)
                 else:
-                    # Por defecto, si no está en el mapping, es un vehículo
-                    result_types.append('vehiculo')
-                    
-        return result_boxes, result_types, end_time - start_time
+                    pendientes.append(j)
+            validos = [validos[j] for j in pendientes]
+            regiones = [regiones[j] for j in pendientes]
+            claves = [claves[j] for j in pendientes]
+            
+        if not regiones:
+            return resultados
+        
+        try:
+            inicio = time.perf_counter()
+            blob = self._buffer_blob.llenar([r[0] for r in regiones])
+            self.net.setInput(blob)
+            
+            start_time = self._medir('blob', inicio)
+            outputs = self.net.forward(self.output_layers)
+            end_time = self._medir('inferencia', start_time)
+        except Exception as e:
+            print(f"Error en el procesamiento de la red neuronal: {e}")
+            return resultados
+        
+        tiempo_por_frame = (end_time - start_time) / len(regiones)
+        salidas_por_frame = dividir_salidas_lote(outputs, len(regiones))
+        
+        for i, (roi_frame, x, y), salidas, clave in zip(validos, regiones, salidas_por_frame, claves):
+            height, width = roi_frame.shape[:2]
+            result_boxes, result_types = self._procesar_salidas(salidas, width, height, x, y)
+            resultados[i] = (result_boxes, result_types, tiempo_por_frame)
+            if clave is not None:
+                self._guardar_en_cache(clave, result_boxes, result_types, x, y)
+            
+        return resultados
+
+    def detect_tiles(self, frame, roi=None, tam_tesela=(640, 640), solape=0.2, umbral_contencion=0.8,
+                     teselas_por_pasada=16):
+        """
+        Detecta objetos en un frame de alta resolución dividiéndolo en teselas
+        
+        La región (o el frame completo) se divide en teselas solapadas a
+        resolución original, todas se procesan en una sola pasada de la red y
+        las detecciones se combinan con una NMS global. Así los objetos pequeños
+        y lejanos no se pierden al reducir el frame completo a la entrada de la red.
+        
+        Args:
+            frame: Imagen o frame donde detectar objetos
+            roi: Región de interés (x, y, w, h) o None para usar todo el frame
+            tam_tesela: Tamaño (ancho, alto) de cada tesela en píxeles
+            solape: Fracción de solape entre teselas vecinas (0-1)
+            umbral_contencion: Proporción de área a partir de la cual un fragmento
+                contenido en otra caja de mayor confianza se descarta
+            teselas_por_pasada: Máximo de teselas por pasada de la red, para
+                limitar la memoria con teselas muy pequeñas
+            
+        Returns:
+            Lista de rectángulos (x, y, w, h), lista de tipos de objetos y tiempo de inferencia
+        """
+        # Verificar que el frame es válido
+        if frame is None or frame.size == 0:
+            print("Frame inválido para detección")
+            return [], [], 0
+        
+        roi_frame, x, y = extraer_region(frame, roi)
+        height, width = roi_frame.shape[:2]
+        teselas = generar_teselas(width, height, tam_tesela, solape)
+        
+        # Todas las teselas en una sola pasada, salvo que superen teselas_por_pasada
+        todas_boxes = []
+        todas_confidences = []
+        todas_class_ids = []
+        tiempo_inferencia = 0
+        for inicio in range(0, len(teselas), teselas_por_pasada):
+            grupo = teselas[inicio:inicio + teselas_por_pasada]
+            recortes = [roi_frame[ty:ty+th, tx:tx+tw] for tx, ty, tw, th in grupo]
+            try:
+                inicio = time.perf_counter()
+                blob = self._buffer_blob.llenar(recortes)
+                self.net.setInput(blob)
+                
+                start_time = self._medir('blob', inicio)
+                outputs = self.net.forward(self.output_layers)
+                tiempo_inferencia += self._medir('inferencia', start_time) - start_time
+            except Exception as e:
+                print(f"Error en el procesamiento de la red neuronal: {e}")
+                return [], [], 0
+            
+            # Decodificar cada tesela y trasladar sus cajas al frame
+            inicio = time.perf_counter()
+            for (tx, ty, tw, th), salidas in zip(grupo, dividir_salidas_lote(outputs, len(grupo))):
+                boxes, confidences, class_ids = decodificar_salidas(
+                    salidas, tw, th, self._mascara_clases, self.confidence_threshold)
+                boxes[:, 0] += x + tx
+                boxes[:, 1] += y + ty
+                todas_boxes.append(boxes)
+                todas_confidences.append(confidences)
+                todas_class_ids.append(class_ids)
+            self._medir('decodificacion', inicio)
+        
+        # NMS global sobre las detecciones de todas las teselas
+        result_boxes, result_types = self._seleccionar(
+            np.concatenate(todas_boxes), np.concatenate(todas_confidences), np.concatenate(todas_class_ids),
+            umbral_contencion=umbral_contencion)
+        return result_boxes, result_types, tiempo_inferencia
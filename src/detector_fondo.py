@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Detector de objetos por sustracción de fondo (MOG2), sin modelo YOLO.
+
+Es la alternativa de main.py cuando no hay pesos de YOLO. Cada frame pasa
+por el sustractor MOG2, la máscara se umbraliza para quitar las sombras,
+opcionalmente se limpia con operaciones morfológicas y las cajas salen de
+una sola llamada a cv2.connectedComponentsWithStats: el filtrado por área y
+las cajas se calculan para todas las manchas a la vez, sin un bucle en
+Python por contorno, de modo que el ruido de lluvia o faros (miles de
+manchas diminutas) no frena el procesamiento.
+
+El coste del modelo de fondo es proporcional al número de píxeles, así que
+puede ejecutarse sobre una copia reducida de la región (escala < 1) y, si se
+quiere, en escala de grises. Las cajas y el área mínima se trasladan de forma
+exacta entre la resolución del modelo y la original.
+
+Tiene el mismo contrato que Detector: detect(frame, roi) devuelve las cajas,
+los tipos y el tiempo empleado.
+"""
+
+import time
+
+import cv2
+import numpy as np
+
+from src.detector import extraer_region
+
+
+class DetectorFondo:
+    """
+    Detecta objetos en movimiento con un sustractor de fondo MOG2
+    """
+
+    def __init__(self, history=200, var_threshold=30, umbral=254, area_min=800, apertura=0, cierre=0,
+                 escala=1.0, gris=False, detectar_sombras=True, metricas=None, pool=None):
+        """
+        Inicializa el detector
+
+        Args:
+            history: Historial del sustractor MOG2 (frames)
+            var_threshold: Umbral de varianza del sustractor MOG2
+            umbral: Valor mínimo de la máscara para considerar un píxel en
+                primer plano; con 254 se descartan las sombras (valor 127)
+            area_min: Área mínima de una mancha, en píxeles de la imagen
+                original, para ser un objeto
+            apertura: Lado del núcleo de la apertura morfológica que elimina el
+                ruido aislado antes de buscar manchas, en píxeles de la imagen
+                original (0 para no aplicarla)
+            cierre: Lado del núcleo del cierre morfológico que une las partes
+                de un mismo objeto (0 para no aplicarlo)
+            escala: Factor (0-1] al que se reduce la región antes del modelo de
+                fondo; 0.5 procesa la cuarta parte de los píxeles
+            gris: Ejecutar el modelo de fondo en escala de grises (un canal en
+                lugar de tres)
+            detectar_sombras: Marcar las sombras en la máscara (se descartan con el umbral)
+            metricas: Instancia de Metricas (src/metricas.py) en la que registrar
+                la duración de la etapa sustraccion_fondo
+            pool: PoolBuffers (src/buffers.py) del que tomar la máscara de cada
+                frame; sin pool se reutiliza siempre la misma máscara
+        """
+        if apertura < 0 or cierre < 0:
+            raise ValueError(f"Tamaño de núcleo morfológico inválido: apertura={apertura}, cierre={cierre}")
+        if not 0 < escala <= 1:
+            raise ValueError(f"Escala del modelo de fondo fuera de (0, 1]: {escala}")
+        self.umbral = umbral
+        self.area_min = area_min
+        self.escala = escala
+        self.gris = gris
+        self.metricas = metricas
+        self.pool = pool
+        self.sustractor = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=var_threshold,
+                                                              detectShadows=detectar_sombras)
+        # Los núcleos se aplican sobre la máscara a la resolución del modelo
+        self.kernel_apertura = self._kernel(apertura)
+        self.kernel_cierre = self._kernel(cierre)
+        # Máscara binaria del último frame procesado (en coordenadas de la ROI,
+        # a la resolución del modelo)
+        self.mascara = None
+        self._etiquetas = None
+        self._reducida = None
+        self._gris = None
+
+    def _kernel(self, lado):
+        if not lado:
+            return None
+        lado = max(1, int(round(lado * self.escala)))
+        return cv2.getStructuringElement(cv2.MORPH_RECT, (lado, lado))
+
+    def _buffer(self, forma, dtype, actual):
+        if actual is not None and actual.shape == forma and actual.dtype == dtype:
+            return actual
+        return np.empty(forma, dtype=dtype)
+
+    def detect(self, frame, roi=None):
+        """
+        Detecta objetos en movimiento en un frame
+
+        Args:
+            frame: Imagen o frame donde detectar objetos
+            roi: Región de interés (x, y, w, h) o None para usar todo el frame
+
+        Returns:
+            Lista de rectángulos (x, y, w, h), lista de tipos de objetos (todos
+            'vehiculo') y tiempo de la detección en segundos. La máscara
+            queda en self.mascara
+        """
+        # Verificar que el frame es válido
+        if frame is None or frame.size == 0:
+            print("Frame inválido para detección")
+            return [], [], 0
+
+        inicio = time.perf_counter()
+        zona, x, y = extraer_region(frame, roi)
+        alto, ancho = zona.shape[:2]
+        imagen = zona
+        if self.escala < 1:
+            # Región reducida sobre un buffer fijo; INTER_AREA promedia los píxeles
+            # y evita que el ruido de alta frecuencia sobreviva a la reducción
+            forma_reducida = (max(1, int(round(alto * self.escala))), max(1, int(round(ancho * self.escala))))
+            self._reducida = self._buffer(forma_reducida + zona.shape[2:], zona.dtype, self._reducida)
+            imagen = cv2.resize(zona, forma_reducida[::-1], dst=self._reducida, interpolation=cv2.INTER_AREA)
+        if self.gris and imagen.ndim == 3:
+            self._gris = self._buffer(imagen.shape[:2], imagen.dtype, self._gris)
+            imagen = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY, dst=self._gris)
+        forma = imagen.shape[:2]
+        if self.pool is not None:
+            mascara = self.pool.obtener(forma)
+        else:
+            mascara = self._buffer(forma, np.uint8, self.mascara)
+        self.sustractor.apply(imagen, mascara)
+
+        # Quitar las sombras (valores grises) y limpiar la máscara, todo sobre el mismo buffer
+        cv2.threshold(mascara, self.umbral, 255, cv2.THRESH_BINARY, dst=mascara)
+        if self.kernel_apertura is not None:
+            cv2.morphologyEx(mascara, cv2.MORPH_OPEN, self.kernel_apertura, dst=mascara)
+        if self.kernel_cierre is not None:
+            cv2.morphologyEx(mascara, cv2.MORPH_CLOSE, self.kernel_cierre, dst=mascara)
+        self.mascara = mascara
+
+        # Área y caja de todas las manchas en una sola llamada (la 0 es el fondo)
+        self._etiquetas = self._buffer(forma, np.int32, self._etiquetas)
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mascara, self._etiquetas, connectivity=8)
+        stats = stats[1:]
+        if forma == (alto, ancho):
+            cajas = stats[stats[:, cv2.CC_STAT_AREA] > self.area_min, :4]
+        else:
+            # Cada píxel del modelo cubre fx * fy píxeles originales: el área
+            # mínima se compara en píxeles originales y cada caja se amplía
+            # a todos los píxeles originales que cubren sus píxeles
+            fx = forma[1] / ancho
+            fy = forma[0] / alto
+            cajas = stats[stats[:, cv2.CC_STAT_AREA] / (fx * fy) > self.area_min, :4].astype(np.float64)
+            x0 = np.floor(cajas[:, 0] / fx)
+            y0 = np.floor(cajas[:, 1] / fy)
+            x1 = np.minimum(np.ceil((cajas[:, 0] + cajas[:, 2]) / fx), ancho)
+            y1 = np.minimum(np.ceil((cajas[:, 1] + cajas[:, 3]) / fy), alto)
+            cajas = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1).astype(np.int64)
+        cajas[:, 0] += x
+        cajas[:, 1] += y
+        boxes = [tuple(caja) for caja in cajas.tolist()]
+
+        tiempo = time.perf_counter() - inicio
+        if self.metricas is not None:
+            self.metricas.observar('sustraccion_fondo', tiempo)
+        return boxes, ['vehiculo'] * len(boxes), tiempo
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Salida de eventos de seguimiento en JSONL, CSV o un socket Unix.
+
+Por cada frame se emite un registro 'posicion' por objeto seguido, y además
+un evento 'inicio' cuando aparece un ID nuevo y un evento 'fin' cuando el
+rastreador lo elimina. Permite analizar los resultados sin dibujar ni
+codificar video.
+
+Destinos admitidos:
+    ruta.jsonl         Un objeto JSON por línea
+    ruta.csv           CSV con cabecera
+    unix:/ruta/socket  JSONL enviado a un socket Unix que ya esté escuchando
+    -                  JSONL por la salida estándar
+"""
+
+import csv
+import json
+import socket
+import sys
+import time
+
+CAMPOS = ['evento', 'camara', 'frame', 't', 'id', 'tipo', 'x', 'y', 'w', 'h']
+
+
+class SalidaEventos:
+    """
+    Convierte los objetos seguidos de cada frame en eventos y los escribe en un destino
+    """
+
+    def __init__(self, destino, flujo=None):
+        """
+        Abre el destino
+
+        Args:
+            destino: Ruta .jsonl o .csv, 'unix:/ruta/socket' o '-' (ver el módulo)
+            flujo: Flujo de texto del destino '-' (por defecto, sys.stdout). Lo
+                que se imprima en él aparte de los eventos rompe el JSONL
+        """
+        self.destino = destino
+        self._socket = None
+        self._archivo = None
+        self._csv = None
+
+        if destino == '-':
+            self._archivo = flujo if flujo is not None else sys.stdout
+        elif destino.startswith('unix:'):
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(destino[len('unix:'):])
+        elif destino.endswith('.csv'):
+            self._archivo = open(destino, 'w', newline='')
+            self._csv = csv.DictWriter(self._archivo, fieldnames=CAMPOS)
+            self._csv.writeheader()
+        else:
+            self._archivo = open(destino, 'w')
+
+        # Por cámara: IDs activos con su último registro, y último frame visto
+        self._activos = {}
+        self._ultimo_frame = {}
+
+        # Estadísticas
+        self.eventos_escritos = 0
+
+    def _escribir(self, registros):
+        """
+        Escribe una lista de registros en el destino
+        """
+        if not registros:
+            return
+        if self._csv is not None:
+            self._csv.writerows(registros)
+            self._archivo.flush()
+        else:
+            lineas = ''.join(json.dumps(registro) + '\n' for registro in registros)
+            if self._socket is not None:
+                try:
+                    self._socket.sendall(lineas.encode('utf-8'))
+                except OSError as e:
+                    print(f"Error al enviar eventos a {self.destino}: {e}. Se desactiva la salida de eventos.")
+                    self._socket.close()
+                    self._socket = None
+                    return
+            elif self._archivo is not None:
+                self._archivo.write(lineas)
+                self._archivo.flush()
+            else:
+                return
+        self.eventos_escritos += len(registros)
+
+    def registrar(self, indice_frame, objetos, rastreador, camara=None, instante=None):
+        """
+        Emite los eventos de un frame
+
+        Args:
+            indice_frame: Número del frame en la fuente
+            objetos: Lista de objetos visibles [(id, x, y, w, h, tipo), ...]
+            rastreador: Rastreador que generó los objetos; los IDs que ya no
+                sigue se consideran terminados
+            camara: Nombre de la cámara (para varias fuentes en una misma salida)
+            instante: Marca de tiempo del frame (por defecto, time.time())
+        """
+        t = time.time() if instante is None else instante
+        activos = self._activos.setdefault(camara, {})
+        self._ultimo_frame[camara] = indice_frame
+        registros = []
+
+        # Objetos que el rastreador ha dejado de seguir
+        for obj_id in [i for i in activos if i not in rastreador.pistas]:
+            registro = activos.pop(obj_id)
+            registros.append(dict(registro, evento='fin', frame=indice_frame, t=t))
+
+        for obj_id, x, y, w, h, tipo in objetos:
+            registro = dict(evento='posicion', camara=camara, frame=indice_frame, t=t,
+                            id=obj_id, tipo=tipo, x=x, y=y, w=w, h=h)
+            if obj_id not in activos:
+                registros.append(dict(registro, evento='inicio'))
+            activos[obj_id] = registro
+            registros.append(registro)
+
+        self._escribir(registros)
+
+    def cerrar(self):
+        """
+        Emite el evento 'fin' de los objetos que siguen activos y cierra el destino
+        """
+        t = time.time()
+        registros = []
+        for camara, activos in self._activos.items():
+            for registro in activos.values():
+                registros.append(dict(registro, evento='fin', frame=self._ultimo_frame[camara], t=t))
+            activos.clear()
+        self._escribir(registros)
+
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        if self._archivo is not None:
+            if self.destino == '-':
+                self._archivo.flush()
+            else:
+                self._archivo.close()
+        self._archivo = None
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Rejilla espacial uniforme para buscar objetos cercanos.
+
+Divide la imagen en celdas cuadradas y guarda en cada celda los elementos
+cuyo punto cae en ella. Una búsqueda por radio solo revisa las celdas que
+cubren ese radio, de modo que el coste de emparejar detecciones con objetos
+seguidos crece con el número de objetos cercanos y no con el total.
+"""
+
+import math
+
+
+class RejillaEspacial:
+    """
+    Índice de puntos por celdas de tamaño fijo, con inserción, movimiento y borrado en O(1)
+    """
+
+    def __init__(self, tam_celda):
+        """
+        Args:
+            tam_celda: Lado de cada celda en píxeles; conviene que sea del orden
+                del radio de búsqueda habitual
+        """
+        self.tam_celda = float(max(tam_celda, 1))
+        # {(columna, fila): {clave: (x, y)}}
+        self.celdas = {}
+        # {clave: (columna, fila)}
+        self._celda_de = {}
+
+    def __len__(self):
+        return len(self._celda_de)
+
+    def _celda(self, x, y):
+        return (math.floor(x / self.tam_celda), math.floor(y / self.tam_celda))
+
+    def insertar(self, clave, x, y):
+        """
+        Añade un elemento en la posición (x, y), o lo mueve si ya existía
+        """
+        celda = self._celda(x, y)
+        anterior = self._celda_de.get(clave)
+        if anterior is not None and anterior != celda:
+            self._quitar_de_celda(clave, anterior)
+        self.celdas.setdefault(celda, {})[clave] = (x, y)
+        self._celda_de[clave] = celda
+
+    def eliminar(self, clave):
+        """
+        Quita un elemento del índice (si no existe, no hace nada)
+        """
+        celda = self._celda_de.pop(clave, None)
+        if celda is not None:
+            self._quitar_de_celda(clave, celda)
+
+    def _quitar_de_celda(self, clave, celda):
+        contenido = self.celdas[celda]
+        del contenido[clave]
+        if not contenido:
+            del self.celdas[celda]
+
+    def vecinos(self, x, y, radio):
+        """
+        Devuelve los elementos cuyo punto está a menos de `radio` en cada eje
+        de (x, y), es decir, dentro del cuadrado de lado 2 * radio centrado en
+        (x, y). Incluye todos los que están a distancia euclídea menor que radio.
+
+        Returns:
+            Lista de tuplas (clave, x, y)
+        """
+        c0, f0 = self._celda(x - radio, y - radio)
+        c1, f1 = self._celda(x + radio, y + radio)
+        encontrados = []
+        if (c1 - c0 + 1) * (f1 - f0 + 1) > len(self.celdas):
+            # Radio enorme frente al número de celdas ocupadas: recorrerlas todas
+            celdas = self.celdas.values()
+        else:
+            celdas = [self.celdas[(c, f)] for c in range(c0, c1 + 1) for f in range(f0, f1 + 1)
+                      if (c, f) in self.celdas]
+        for contenido in celdas:
+            for clave, (px, py) in contenido.items():
+                if abs(px - x) < radio and abs(py - y) < radio:
+                    encontrados.append((clave, px, py))
+        return encontrados
@@ -0,0 +1,355 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Ingesta asíncrona de fuentes de video (RTSP, HTTP, cámaras y archivos).
+
+Cada fuente se lee en una tarea de asyncio que ejecuta las llamadas
+bloqueantes de cv2.VideoCapture (abrir, read, release) en un ThreadPoolExecutor,
+así que un solo bucle de eventos atiende muchas fuentes a la vez.
+
+Si una fuente en vivo se cae, se reconecta con espera exponencial (backoff).
+De una fuente en vivo solo se guarda el último frame: si el consumidor va más
+lento que la cámara, los frames intermedios se descartan en lugar de
+acumularse, y la latencia nunca crece sin límite. Los archivos, en cambio, se
+entregan completos con una cola acotada que frena la lectura.
+
+Un archivo leído en tiempo real y en bucle (en_vivo=True, tiempo_real=True)
+se comporta como una cámara y sirve para probar la ingesta sin cámaras reales.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+# Marcador de fin de flujo en la cola de los archivos
+_FIN = object()
+
+
+def es_fuente_en_vivo(fuente):
+    """
+    Indica si una fuente es una cámara o un stream de red, frente a un archivo
+    """
+    return isinstance(fuente, int) or fuente.isdigit() or '://' in fuente
+
+
+class FuenteAsincrona:
+    """
+    Lee una fuente de video en segundo plano con reconexión automática
+    """
+
+    def __init__(self, fuente, nombre=None, en_vivo=None, tiempo_real=False, reconectar=True,
+                 espera_inicial=0.5, espera_maxima=30.0, tam_cola=8):
+        """
+        Inicializa la fuente
+
+        Args:
+            fuente: Ruta al archivo, URL o ID de la cámara
+            nombre: Nombre para los mensajes (por defecto, la propia fuente)
+            en_vivo: Guardar solo el último frame y reconectar al perder la
+                fuente. Por defecto, True para cámaras y URLs y False para archivos
+            tiempo_real: Leer al ritmo de los FPS de la fuente (para que un
+                archivo se comporte como una cámara)
+            reconectar: Reintentar si la fuente no se puede abrir o se cae
+            espera_inicial: Espera antes del primer reintento, en segundos
+            espera_maxima: Espera máxima entre reintentos; la espera se duplica
+                en cada fallo y vuelve a la inicial al leer un frame
+            tam_cola: Frames en espera de una fuente que no es en vivo
+        """
+        self.fuente = fuente
+        self.nombre = nombre or str(fuente)
+        self.en_vivo = es_fuente_en_vivo(fuente) if en_vivo is None else en_vivo
+        self.tiempo_real = tiempo_real
+        self.reconectar = reconectar
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.tam_cola = tam_cola
+
+        # Propiedades de la captura (ancho, alto, fps) tras la primera apertura
+        self.propiedades = None
+        self.terminado = False
+        self._detener = False
+        self._ultimo = None
+        self._pendiente = False
+        # Instante (time.monotonic) en que se leyó el último frame entregado al consumidor
+        self.instante_frame = None
+        self._nuevo = None
+        self._cola = None
+
+        # Estadísticas
+        self.frames_leidos = 0
+        self.frames_descartados = 0
+        self.reconexiones = 0
+
+    def _abrir(self):
+        """
+        Abre la captura (llamada bloqueante, se ejecuta en el ThreadPoolExecutor)
+        """
+        fuente = int(self.fuente) if isinstance(self.fuente, str) and self.fuente.isdigit() else self.fuente
+        cap = cv2.VideoCapture(fuente)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        self.propiedades = {
+            cv2.CAP_PROP_FRAME_WIDTH: cap.get(cv2.CAP_PROP_FRAME_WIDTH),
+            cv2.CAP_PROP_FRAME_HEIGHT: cap.get(cv2.CAP_PROP_FRAME_HEIGHT),
+            cv2.CAP_PROP_FPS: cap.get(cv2.CAP_PROP_FPS),
+            cv2.CAP_PROP_FRAME_COUNT: cap.get(cv2.CAP_PROP_FRAME_COUNT),
+        }
+        return cap
+
+    async def _entregar(self, frame):
+        """
+        Pone un frame a disposición del consumidor
+        """
+        self.frames_leidos += 1
+        elemento = (frame, time.monotonic())
+        if self.en_vivo:
+            # Solo interesa el frame más reciente
+            if self._pendiente:
+                self.frames_descartados += 1
+            self._ultimo = elemento
+            self._pendiente = True
+            self._nuevo.set()
+        else:
+            # Archivo: esperar a que el consumidor tenga sitio (contrapresión),
+            # comprobando de vez en cuando si se ha pedido detener la fuente
+            await self._poner(elemento)
+
+    async def _poner(self, elemento):
+        """
+        Inserta un elemento en la cola salvo que se detenga la fuente mientras espera
+        """
+        while not self._detener:
+            try:
+                await asyncio.wait_for(self._cola.put(elemento), timeout=0.1)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    async def ejecutar(self, ejecutor=None):
+        """
+        Lee la fuente hasta que termine o se llame a detener()
+
+        Args:
+            ejecutor: ThreadPoolExecutor para las llamadas bloqueantes (por
+                defecto, el del bucle de eventos)
+        """
+        loop = asyncio.get_running_loop()
+        self._nuevo = asyncio.Event()
+        self._cola = asyncio.Queue(maxsize=self.tam_cola)
+        espera = self.espera_inicial
+        try:
+            while not self._detener:
+                cap = await loop.run_in_executor(ejecutor, self._abrir)
+                if cap is None:
+                    if not self.reconectar:
+                        print(f"[{self.nombre}] Error al abrir la fuente de video")
+                        break
+                    print(f"[{self.nombre}] No se pudo abrir la fuente; reintento en {espera:.1f} s")
+                    await asyncio.sleep(espera)
+                    espera = min(espera * 2, self.espera_maxima)
+                    self.reconexiones += 1
+                    continue
+
+                intervalo = 0
+                if self.tiempo_real:
+                    fps = self.propiedades[cv2.CAP_PROP_FPS]
+                    intervalo = 1.0 / fps if fps > 0 else 1.0 / 25
+                siguiente = time.monotonic()
+                try:
+                    while not self._detener:
+                        ret, frame = await loop.run_in_executor(ejecutor, cap.read)
+                        if not ret:
+                            break
+                        espera = self.espera_inicial
+                        await self._entregar(frame)
+                        if intervalo:
+                            siguiente += intervalo
+                            await asyncio.sleep(max(0, siguiente - time.monotonic()))
+                finally:
+                    await loop.run_in_executor(ejecutor, cap.release)
+
+                # Un archivo termina al llegar al final; una fuente en vivo se reconecta
+                if self._detener or not self.en_vivo or not self.reconectar:
+                    break
+                print(f"[{self.nombre}] Fuente perdida; reconectando en {espera:.1f} s")
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, self.espera_maxima)
+                self.reconexiones += 1
+        finally:
+            self.terminado = True
+            self._nuevo.set()
+            if not self.en_vivo:
+                await self._poner(_FIN)
+
+    def detener(self):
+        """
+        Pide a la tarea de lectura que termine tras la lectura en curso
+        """
+        self._detener = True
+
+    def tomar(self):
+        """
+        Devuelve el siguiente frame sin esperar
+
+        Returns:
+            Frame, o None si no hay ninguno nuevo
+        """
+        if self.en_vivo:
+            if not self._pendiente:
+                return None
+            self._pendiente = False
+            elemento = self._ultimo
+        else:
+            if self._cola is None or self._cola.empty():
+                return None
+            elemento = self._cola.get_nowait()
+            if elemento is _FIN:
+                # Dejar el marcador para las siguientes llamadas
+                self._cola.put_nowait(_FIN)
+                return None
+        frame, self.instante_frame = elemento
+        return frame
+
+    async def leer(self):
+        """
+        Espera al siguiente frame
+
+        Returns:
+            Frame, o None si la fuente ha terminado
+        """
+        while self._nuevo is None:
+            # La tarea de lectura todavía no ha arrancado
+            await asyncio.sleep(0.01)
+        if not self.en_vivo:
+            elemento = await self._cola.get()
+            if elemento is _FIN:
+                self._cola.put_nowait(_FIN)
+                return None
+            frame, self.instante_frame = elemento
+            return frame
+        while True:
+            frame = self.tomar()
+            if frame is not None:
+                return frame
+            if self.terminado:
+                return None
+            self._nuevo.clear()
+            await self._nuevo.wait()
+
+
+class IngestaAsincrona:
+    """
+    Lee muchas fuentes a la vez en un solo bucle de eventos
+    """
+
+    def __init__(self, fuentes, max_hilos=None):
+        """
+        Args:
+            fuentes: Lista de instancias de FuenteAsincrona
+            max_hilos: Hilos para las llamadas bloqueantes (por defecto, uno por fuente)
+        """
+        self.fuentes = fuentes
+        self.ejecutor = ThreadPoolExecutor(max_workers=max_hilos or max(1, len(fuentes)),
+                                           thread_name_prefix='ingesta')
+        self._tareas = []
+
+    def iniciar(self):
+        """
+        Arranca la lectura de todas las fuentes (desde dentro del bucle de eventos)
+        """
+        self._tareas = [asyncio.create_task(fuente.ejecutar(self.ejecutor)) for fuente in self.fuentes]
+
+    async def detener(self):
+        """
+        Detiene todas las fuentes y espera a que terminen
+        """
+        for fuente in self.fuentes:
+            fuente.detener()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self.ejecutor.shutdown(wait=False)
+
+    async def frames(self, espera=0.01):
+        """
+        Generador asíncrono de (fuente, frame) de todas las fuentes, por turnos,
+        hasta que todas terminen
+        """
+        while True:
+            entregado = False
+            for fuente in self.fuentes:
+                frame = fuente.tomar()
+                if frame is not None:
+                    entregado = True
+                    yield fuente, frame
+            if not entregado:
+                # Ninguna fuente tenía frames: si todas han terminado, no llegarán más
+                if all(fuente.terminado for fuente in self.fuentes):
+                    return
+                await asyncio.sleep(espera)
+
+
+class CapturaAsincrona:
+    """
+    Adaptador con la interfaz de cv2.VideoCapture (read, isOpened, get,
+    release) sobre una FuenteAsincrona, para usar la ingesta con reconexión
+    desde código síncrono como main.py o PipelineVideo
+    """
+
+    def __init__(self, fuente, **opciones):
+        """
+        Args:
+            fuente: Ruta al archivo, URL o ID de la cámara
+            **opciones: Argumentos de FuenteAsincrona
+        """
+        self.fuente = FuenteAsincrona(fuente, **opciones)
+        self._loop = asyncio.new_event_loop()
+        self._ejecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ingesta')
+        self._hilo = threading.Thread(target=self._loop.run_forever, name='ingesta', daemon=True)
+        self._hilo.start()
+        self._tarea = asyncio.run_coroutine_threadsafe(self.fuente.ejecutar(self._ejecutor), self._loop)
+
+    def isOpened(self):
+        """
+        Espera a que la fuente se abra por primera vez (reintentando si hace falta)
+
+        Returns:
+            True si se abrió, False si terminó sin abrirse
+        """
+        while self.fuente.propiedades is None and not self.fuente.terminado:
+            time.sleep(0.05)
+        return self.fuente.propiedades is not None
+
+    def get(self, propiedad):
+        """
+        Devuelve una propiedad de la captura (ancho, alto, fps o número de frames)
+        """
+        if not self.isOpened():
+            return 0.0
+        return self.fuente.propiedades.get(propiedad, 0.0)
+
+    def read(self):
+        """
+        Espera al siguiente frame (el más reciente en fuentes en vivo)
+
+        Returns:
+            Tupla (ret, frame) como cv2.VideoCapture.read
+        """
+        frame = asyncio.run_coroutine_threadsafe(self.fuente.leer(), self._loop).result()
+        return frame is not None, frame
+
+    def release(self):
+        """
+        Detiene la lectura y libera la fuente
+        """
+        self.fuente.detener()
+        try:
+            self._tarea.result(timeout=5)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._hilo.join(timeout=5)
+        self._ejecutor.shutdown(wait=False)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Métricas de rendimiento por etapa y endpoint HTTP en formato Prometheus.
+
+Cada etapa del procesamiento (captura, redimensionado, blob, inferencia,
+decodificación, NMS, seguimiento, dibujo, codificación...) registra su
+duración en un histograma. Además se llevan contadores (frames procesados,
+frames descartados) y medidores (profundidad de las colas). Todo es seguro
+entre hilos, porque el pipeline mide desde varios a la vez.
+
+Las métricas pueden consultarse con un servidor HTTP local en /metrics
+(formato de texto de Prometheus) y resumirse en una línea de log con los
+percentiles p50 y p99 de los últimos frames de cada etapa.
+"""
+
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Prefijo de todas las métricas exportadas
+PREFIJO = 'vehiculos'
+
+# Límites superiores (en segundos) de los cubos de los histogramas
+LIMITES_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    """
+    Histograma acumulado de duraciones, con una ventana de las últimas
+    muestras para calcular percentiles recientes
+    """
+
+    def __init__(self, limites=LIMITES_SEGUNDOS, tam_ventana=1024):
+        self.limites = limites
+        self.cubos = [0] * len(limites)
+        self.suma = 0.0
+        self.cuenta = 0
+        self.recientes = deque(maxlen=tam_ventana)
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.cubos[i] += 1
+                break
+        self.suma += valor
+        self.cuenta += 1
+        self.recientes.append(valor)
+
+    def percentiles(self, cuantiles=(50, 99)):
+        """
+        Devuelve los percentiles de las muestras recientes (o ceros si no hay)
+        """
+        if not self.recientes:
+            return [0.0] * len(cuantiles)
+        return np.percentile(np.fromiter(self.recientes, dtype=np.float64), cuantiles).tolist()
+
+
+class Metricas:
+    """
+    Registro de histogramas por etapa, contadores y medidores
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.etapas = {}
+        self.contadores = {}
+        self.medidores = {}
+
+    def observar(self, etapa, segundos):
+        """
+        Registra la duración de una ejecución de una etapa
+        """
+        with self._lock:
+            histograma = self.etapas.get(etapa)
+            if histograma is None:
+                histograma = self.etapas[etapa] = Histograma()
+            histograma.observar(segundos)
+
+    def incrementar(self, nombre, n=1):
+        """
+        Suma n a un contador
+        """
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def fijar(self, nombre, valor, contador=False):
+        """
+        Fija el valor de un medidor, o de un contador que se lleva en otro
+        sitio (contador=True; por ejemplo, los descartes de la ingesta)
+        """
+        with self._lock:
+            if contador:
+                self.contadores[nombre] = valor
+            else:
+                self.medidores[nombre] = valor
+
+    def texto_prometheus(self):
+        """
+        Devuelve las métricas en el formato de texto de Prometheus
+        """
+        lineas = []
+        with self._lock:
+            if self.etapas:
+                nombre = f"{PREFIJO}_etapa_segundos"
+                lineas.append(f"# HELP {nombre} Duración de cada etapa del procesamiento por frame")
+                lineas.append(f"# TYPE {nombre} histogram")
+                for etapa, histograma in sorted(self.etapas.items()):
+                    acumulado = 0
+                    for limite, cuenta in zip(histograma.limites, histograma.cubos):
+                        acumulado += cuenta
+                        lineas.append(f'{nombre}_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+                    lineas.append(f'{nombre}_bucket{{etapa="{etapa}",le="+Inf"}} {histograma.cuenta}')
+                    lineas.append(f'{nombre}_sum{{etapa="{etapa}"}} {histograma.suma}')
+                    lineas.append(f'{nombre}_count{{etapa="{etapa}"}} {histograma.cuenta}')
+            for contador, valor in sorted(self.contadores.items()):
+                lineas.append(f"# TYPE {PREFIJO}_{contador}_total counter")
+                lineas.append(f"{PREFIJO}_{contador}_total {valor}")
+            for medidor, valor in sorted(self.medidores.items()):
+                lineas.append(f"# TYPE {PREFIJO}_{medidor} gauge")
+                lineas.append(f"{PREFIJO}_{medidor} {valor}")
+        return '\n'.join(lineas) + '\n'
+
+    def resumen(self):
+        """
+        Devuelve {etapa: (p50_ms, p99_ms, ejecuciones)} de las muestras recientes
+        """
+        with self._lock:
+            return {etapa: (*[p * 1000 for p in histograma.percentiles()], histograma.cuenta)
+                    for etapa, histograma in self.etapas.items()}
+
+    def linea_resumen(self):
+        """
+        Devuelve una línea de log con los percentiles recientes de cada etapa,
+        los contadores y los medidores
+        """
+        partes = [f"{etapa} {p50:.1f}/{p99:.1f} ms" for etapa, (p50, p99, _) in self.resumen().items()]
+        with self._lock:
+            partes += [f"{nombre} {valor}" for nombre, valor in sorted(self.contadores.items())]
+            partes += [f"{nombre} {valor}" for nombre, valor in sorted(self.medidores.items())]
+        return "Métricas (p50/p99): " + ', '.join(partes)
+
+
+class ServidorMetricas:
+    """
+    Servidor HTTP local que publica las métricas en /metrics
+    """
+
+    def __init__(self, metricas, puerto, host='127.0.0.1'):
+        """
+        Arranca el servidor en un hilo en segundo plano
+
+        Args:
+            metricas: Instancia de Metricas a publicar
+            puerto: Puerto TCP
+            host: Dirección en la que escuchar (por defecto, solo local)
+        """
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.texto_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, formato, *args):
+                # Sin una línea de log por cada consulta
+                pass
+
+        self._servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        self._servidor.daemon_threads = True
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name='metricas', daemon=True)
+        self._hilo.start()
+
+    def cerrar(self):
+        """
+        Detiene el servidor
+        """
+        self._servidor.shutdown()
+        self._servidor.server_close()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Modelo de movimiento para el rastreador.
+
+Implementa un filtro de Kalman de velocidad constante que mantiene el estado
+de todos los objetos seguidos en arrays de NumPy, de modo que la predicción y
+la corrección se calculan para todos los objetos a la vez.
+"""
+
+import numpy as np
+
+# Matrices del modelo de velocidad constante con estado (cx, cy, vx, vy)
+_F = np.array([[1, 0, 1, 0],
+               [0, 1, 0, 1],
+               [0, 0, 1, 0],
+               [0, 0, 0, 1]], dtype=np.float64)
+
+
+class FiltroKalmanMultiple:
+    """
+    Filtro de Kalman de velocidad constante para muchos objetos a la vez
+
+    Cada objeto ocupa una fila de los arrays de estado (N, 4) y covarianza
+    (N, 4, 4). Al eliminar un objeto, la última fila ocupa su lugar para que
+    los arrays sigan siendo contiguos.
+    """
+
+    def __init__(self, ruido_proceso=1.0, ruido_medida=10.0, varianza_velocidad=225.0, capacidad=64):
+        """
+        Inicializa el filtro
+
+        Args:
+            ruido_proceso: Varianza del ruido de aceleración por frame
+            ruido_medida: Varianza de la medida del centro (píxeles^2)
+            varianza_velocidad: Incertidumbre inicial de la velocidad de un objeto nuevo
+            capacidad: Número inicial de filas reservadas
+        """
+        self.varianza_velocidad = varianza_velocidad
+        self.ruido_medida = ruido_medida
+        self.R = np.eye(2) * ruido_medida
+        # Ruido de proceso de aceleración aleatoria por frame (G G^T q con G = [1/2, 1] por eje)
+        self.Q = np.array([[0.25, 0, 0.5, 0],
+                           [0, 0.25, 0, 0.5],
+                           [0.5, 0, 1.0, 0],
+                           [0, 0.5, 0, 1.0]]) * ruido_proceso
+
+        self.estados = np.zeros((capacidad, 4))
+        self.covarianzas = np.zeros((capacidad, 4, 4))
+        self.num_objetos = 0
+        # Correspondencia entre ID de objeto y fila de los arrays
+        self.filas = {}
+        self.ids = []
+
+    def __len__(self):
+        return self.num_objetos
+
+    def __contains__(self, obj_id):
+        return obj_id in self.filas
+
+    def _reservar(self, necesarias):
+        """
+        Amplía los arrays si no hay filas suficientes
+        """
+        capacidad = len(self.estados)
+        if necesarias <= capacidad:
+            return
+        nueva = max(necesarias, capacidad * 2)
+        estados = np.zeros((nueva, 4))
+        covarianzas = np.zeros((nueva, 4, 4))
+        estados[:capacidad] = self.estados
+        covarianzas[:capacidad] = self.covarianzas
+        self.estados = estados
+        self.covarianzas = covarianzas
+
+    def agregar(self, obj_id, cx, cy):
+        """
+        Añade un objeto nuevo con velocidad inicial nula
+        """
+        self._reservar(self.num_objetos + 1)
+        fila = self.num_objetos
+        self.estados[fila] = (cx, cy, 0.0, 0.0)
+        self.covarianzas[fila] = np.diag([self.ruido_medida, self.ruido_medida,
+                                          self.varianza_velocidad, self.varianza_velocidad])
+        self.filas[obj_id] = fila
+        self.ids.append(obj_id)
+        self.num_objetos += 1
+
+    def eliminar(self, obj_id):
+        """
+        Elimina un objeto moviendo la última fila a su posición
+        """
+        fila = self.filas.pop(obj_id, None)
+        if fila is None:
+            return
+        ultima = self.num_objetos - 1
+        if fila != ultima:
+            self.estados[fila] = self.estados[ultima]
+            self.covarianzas[fila] = self.covarianzas[ultima]
+            id_movido = self.ids[ultima]
+            self.ids[fila] = id_movido
+            self.filas[id_movido] = fila
+        self.ids.pop()
+        self.num_objetos -= 1
+
+    def predecir(self, pasos=1):
+        """
+        Avanza el estado de todos los objetos el número de frames indicado
+
+        Returns:
+            Array (N, 2) con los centros predichos, en el orden de self.ids
+        """
+        n = self.num_objetos
+        x = self.estados[:n]
+        P = self.covarianzas[:n]
+        for _ in range(pasos):
+            x[:] = x @ _F.T
+            P[:] = _F @ P @ _F.T + self.Q
+        return x[:, :2].copy()
+
+    def corregir(self, obj_ids, centros):
+        """
+        Corrige el estado de los objetos observados con sus centros medidos
+
+        Args:
+            obj_ids: Lista de IDs observados en el frame
+            centros: Array (K, 2) con el centro medido de cada uno
+        """
+        if len(obj_ids) == 0:
+            return
+        filas = np.array([self.filas[i] for i in obj_ids])
+        z = np.asarray(centros, dtype=np.float64).reshape(-1, 2)
+        x = self.estados[filas]
+        P = self.covarianzas[filas]
+
+        # Innovación y ganancia de Kalman para todos los objetos a la vez (H selecciona cx, cy)
+        y = z - x[:, :2]
+        S = P[:, :2, :2] + self.R
+        K = P[:, :, :2] @ np.linalg.inv(S)
+        x = x + np.einsum('nij,nj->ni', K, y)
+        P = P - K @ P[:, :2, :]
+
+        self.estados[filas] = x
+        self.covarianzas[filas] = P
+
+    def incertidumbre(self):
+        """
+        Desviación típica de la posición estimada de cada objeto
+
+        Returns:
+            Array (N,) en el orden de self.ids
+        """
+        P = self.covarianzas[:self.num_objetos]
+        return np.sqrt((P[:, 0, 0] + P[:, 1, 1]) / 2)
+
+    def posiciones(self):
+        """
+        Devuelve los IDs y centros estimados actuales
+
+        Returns:
+            Tupla (ids, centros) con centros como array (N, 2)
+        """
+        return list(self.ids), self.estados[:self.num_objetos, :2].copy()
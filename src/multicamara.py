@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Procesamiento de varias cámaras en un solo proceso con un Detector compartido.
+
+Cada cámara tiene su hilo de captura, su cola acotada de frames, su ROI y su
+propio Rastreador, pero todas comparten una única red YOLO: la memoria crece
+con los frames en cola de cada cámara, no con copias del modelo. El hilo de
+inferencia forma lotes con frames de varias cámaras y los procesa en una sola
+pasada de la red.
+
+Un planificador por turnos (round-robin) toma como máximo un frame de cada
+cámara por vuelta, de modo que una cámara con muchos frames pendientes no
+deja sin servicio a las demás.
+"""
+
+import queue
+import threading
+
+import cv2
+
+from src.rastreador import Rastreador
+
+
+class Flujo:
+    """
+    Estado de una cámara: captura, cola de frames, ROI y rastreador
+    """
+
+    def __init__(self, nombre, fuente, roi=None, rastreador=None, tam_cola=4, descartar_frames=None):
+        """
+        Inicializa el flujo
+
+        Args:
+            nombre: Nombre de la cámara para los mensajes y las ventanas
+            fuente: Ruta al video, URL o ID de la cámara
+            roi: Región de interés (x, y, w, h) o None
+            rastreador: Rastreador propio de la cámara (por defecto se crea uno nuevo)
+            tam_cola: Frames que pueden esperar en la cola de la cámara
+            descartar_frames: Si es True, se descarta el frame más antiguo cuando
+                la cola está llena; si es False, la captura espera. Por defecto
+                se descartan en cámaras en vivo y se espera en archivos
+        """
+        self.nombre = nombre
+        self.fuente = fuente
+        self.roi = roi
+        self.rastreador = rastreador or Rastreador()
+        self.cola = queue.Queue(maxsize=tam_cola)
+        if descartar_frames is None:
+            descartar_frames = not isinstance(fuente, str) or fuente.isdigit() or '://' in fuente
+        self.descartar_frames = descartar_frames
+        self.terminado = False
+
+        # Estadísticas
+        self.frames_leidos = 0
+        self.frames_descartados = 0
+        self.frames_procesados = 0
+
+    def abrir(self):
+        """
+        Abre la fuente de video
+
+        Returns:
+            cv2.VideoCapture abierto, o None si no se pudo abrir
+        """
+        fuente = int(self.fuente) if isinstance(self.fuente, str) and self.fuente.isdigit() else self.fuente
+        cap = cv2.VideoCapture(fuente)
+        if not cap.isOpened():
+            print(f"[{self.nombre}] Error al abrir la fuente de video")
+            return None
+        return cap
+
+    def tomar(self):
+        """
+        Extrae el siguiente frame de la cola sin bloquear
+
+        Returns:
+            Frame, o None si la cola está vacía
+        """
+        try:
+            return self.cola.get_nowait()
+        except queue.Empty:
+            return None
+
+
+class PlanificadorEquitativo:
+    """
+    Forma lotes tomando un frame de cada flujo por turno
+    """
+
+    def __init__(self, flujos):
+        """
+        Args:
+            flujos: Lista de instancias de Flujo
+        """
+        self.flujos = flujos
+        self._siguiente = 0
+
+    def siguiente_lote(self, tam_lote):
+        """
+        Forma un lote de hasta tam_lote frames repartidos por turnos entre los
+        flujos con frames pendientes. Cada lote empieza en el flujo siguiente al
+        último servido, para que ninguno tenga siempre prioridad.
+
+        Returns:
+            Lista de tuplas (flujo, frame), con los frames de cada flujo en su
+            orden de captura
+        """
+        lote = []
+        n = len(self.flujos)
+        vacios_seguidos = 0
+        i = self._siguiente
+        while len(lote) < tam_lote and vacios_seguidos < n:
+            flujo = self.flujos[i % n]
+            i += 1
+            frame = flujo.tomar()
+            if frame is None:
+                vacios_seguidos += 1
+                continue
+            vacios_seguidos = 0
+            lote.append((flujo, frame))
+        self._siguiente = i % n if n else 0
+        return lote
+
+
+class ServidorMulticamara:
+    """
+    Procesa varias cámaras con un único Detector compartido
+    """
+
+    def __init__(self, detector, flujos, tam_lote=None, preprocesar=None):
+        """
+        Inicializa el servidor
+
+        Args:
+            detector: Instancia de Detector compartida por todas las cámaras
+            flujos: Lista de instancias de Flujo
+            tam_lote: Frames por pasada de la red (por defecto, uno por cámara)
+            preprocesar: Función opcional aplicada a cada frame en la captura
+        """
+        self.detector = detector
+        self.flujos = flujos
+        self.tam_lote = max(1, tam_lote or len(flujos))
+        self.preprocesar = preprocesar
+        self.planificador = PlanificadorEquitativo(flujos)
+        self._hay_frames = threading.Event()
+        self._detener = threading.Event()
+
+    def _captura(self, flujo):
+        """
+        Lee frames de una cámara y los deja en su cola
+        """
+        cap = flujo.abrir()
+        try:
+            while cap is not None and not self._detener.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                if self.preprocesar is not None:
+                    frame = self.preprocesar(frame)
+                flujo.frames_leidos += 1
+
+                if flujo.descartar_frames:
+                    # Cámara en vivo: nunca bloquear, descartar el frame más antiguo
+                    while True:
+                        try:
+                            flujo.cola.put_nowait(frame)
+                            break
+                        except queue.Full:
+                            try:
+                                flujo.cola.get_nowait()
+                                flujo.frames_descartados += 1
+                            except queue.Empty:
+                                pass
+                else:
+                    # Archivo: esperar a que haya sitio (contrapresión)
+                    while not self._detener.is_set():
+                        try:
+                            flujo.cola.put(frame, timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+                self._hay_frames.set()
+        finally:
+            if cap is not None:
+                cap.release()
+            flujo.terminado = True
+            self._hay_frames.set()
+
+    def ejecutar(self, al_procesar=None):
+        """
+        Procesa todas las cámaras hasta que se agoten o hasta que al_procesar
+        devuelva False
+
+        Args:
+            al_procesar: Función opcional que recibe (flujo, frame, objetos) tras
+                actualizar el rastreador de la cámara. Se llama desde el hilo
+                que ejecuta este método, por lo que puede usar cv2.imshow
+        """
+        hilos = [threading.Thread(target=self._captura, args=(flujo,), name=f'captura-{flujo.nombre}', daemon=True)
+                 for flujo in self.flujos]
+        for hilo in hilos:
+            hilo.start()
+
+        try:
+            while True:
+                self._hay_frames.clear()
+                lote = self.planificador.siguiente_lote(self.tam_lote)
+                if not lote:
+                    if all(flujo.terminado and flujo.cola.empty() for flujo in self.flujos):
+                        break
+                    self._hay_frames.wait(0.1)
+                    continue
+
+                # Una sola pasada de la red para frames de varias cámaras
+                detecciones = self.detector.detect_batch([frame for _, frame in lote],
+                                                         [flujo.roi for flujo, _ in lote])
+                for (flujo, frame), (boxes, tipos, _) in zip(lote, detecciones):
+                    objetos = flujo.rastreador.actualizar(boxes, tipos)
+                    flujo.frames_procesados += 1
+                    if al_procesar is not None and al_procesar(flujo, frame, objetos) is False:
+                        return
+        finally:
+            self._detener.set()
+            for hilo in hilos:
+                hilo.join()
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Pipeline por etapas para el procesamiento de video.
+
+Separa la captura, la inferencia y el render/codificación en etapas que se
+ejecutan en paralelo y se comunican mediante colas acotadas. Así el
+rendimiento queda limitado por la etapa más lenta y no por la suma de todas.
+"""
+
+import queue
+import threading
+import time
+
+# Marcador de fin de flujo entre etapas
+_FIN = object()
+
+
+class PipelineVideo:
+    """
+    Pipeline de tres etapas: captura -> inferencia -> render
+
+    La captura y la inferencia se ejecutan en hilos propios; el render se
+    ejecuta en el hilo que llama a ejecutar(), ya que cv2.imshow debe
+    llamarse desde el hilo principal.
+    """
+
+    def __init__(self, cap, inferir, renderizar, preprocesar=None, tam_cola=8,
+                 descartar_frames=False, tam_lote=1, metricas=None):
+        """
+        Inicializa el pipeline
+
+        Args:
+            cap: Fuente de video (cv2.VideoCapture o cualquier objeto con read())
+            inferir: Función que recibe una lista de frames y devuelve una lista
+                de resultados, uno por frame y en el mismo orden
+            renderizar: Función que recibe (frame, resultado) y devuelve False
+                para detener el procesamiento
+            preprocesar: Función opcional aplicada a cada frame en la captura
+            tam_cola: Tamaño máximo de las colas entre etapas
+            descartar_frames: Si es True, la captura descarta el frame más
+                antiguo cuando la cola está llena (cámaras en vivo); si es
+                False, la captura espera (archivos de video)
+            tam_lote: Número máximo de frames que la inferencia agrupa por llamada
+            metricas: Instancia de Metricas (src/metricas.py) en la que registrar
+                la duración de la captura y el preprocesado, los frames
+                descartados y la ocupación de las colas
+        """
+        self.cap = cap
+        self.inferir = inferir
+        self.renderizar = renderizar
+        self.preprocesar = preprocesar
+        self.descartar_frames = descartar_frames
+        self.tam_lote = max(1, tam_lote)
+        self.metricas = metricas
+
+        self.cola_captura = queue.Queue(maxsize=tam_cola)
+        self.cola_render = queue.Queue(maxsize=tam_cola)
+        self._detener = threading.Event()
+
+        # Estadísticas
+        self.frames_leidos = 0
+        self.frames_descartados = 0
+        self.frames_procesados = 0
+
+    def _poner(self, cola, elemento):
+        """
+        Inserta un elemento en una cola bloqueando hasta que haya espacio
+        (contrapresión), salvo que se haya pedido detener el pipeline
+
+        Returns:
+            True si se insertó el elemento
+        """
+        while not self._detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _etapa_captura(self):
+        """
+        Lee frames de la fuente y los envía a la etapa de inferencia
+        """
+        try:
+            while not self._detener.is_set():
+                inicio = time.perf_counter()
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                leido = time.perf_counter()
+                if self.preprocesar is not None:
+                    frame = self.preprocesar(frame)
+                if self.metricas is not None:
+                    self.metricas.observar('captura', leido - inicio)
+                    if self.preprocesar is not None:
+                        self.metricas.observar('redimension', time.perf_counter() - leido)
+                self.frames_leidos += 1
+
+                if self.descartar_frames:
+                    # Cámara en vivo: nunca bloquear, descartar el frame más antiguo
+                    while True:
+                        try:
+                            self.cola_captura.put_nowait(frame)
+                            break
+                        except queue.Full:
+                            try:
+                                self.cola_captura.get_nowait()
+                                self.frames_descartados += 1
+                                if self.metricas is not None:
+                                    self.metricas.incrementar('frames_descartados')
+                            except queue.Empty:
+                                pass
+                elif not self._poner(self.cola_captura, frame):
+                    break
+        finally:
+            self._poner(self.cola_captura, _FIN)
+
+    def _etapa_inferencia(self):
+        """
+        Agrupa los frames disponibles, ejecuta la inferencia y envía los
+        resultados a la etapa de render
+        """
+        fin = False
+        try:
+            while not fin and not self._detener.is_set():
+                try:
+                    elemento = self.cola_captura.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if elemento is _FIN:
+                    break
+
+                # Añadir al lote los frames que ya estén esperando, sin bloquear
+                lote = [elemento]
+                while len(lote) < self.tam_lote:
+                    try:
+                        elemento = self.cola_captura.get_nowait()
+                    except queue.Empty:
+                        break
+                    if elemento is _FIN:
+                        fin = True
+                        break
+                    lote.append(elemento)
+
+                resultados = self.inferir(lote)
+                for frame, resultado in zip(lote, resultados):
+                    if not self._poner(self.cola_render, (frame, resultado)):
+                        return
+        finally:
+            self._poner(self.cola_render, _FIN)
+
+    def ejecutar(self):
+        """
+        Ejecuta el pipeline hasta agotar la fuente o hasta que renderizar()
+        devuelva False. Los frames se renderizan siempre en orden de captura.
+        """
+        hilos = [
+            threading.Thread(target=self._etapa_captura, name='captura', daemon=True),
+            threading.Thread(target=self._etapa_inferencia, name='inferencia', daemon=True),
+        ]
+        for hilo in hilos:
+            hilo.start()
+
+        # Una sola etapa de inferencia consume la cola en orden FIFO, por lo que
+        # los resultados llegan al render en el mismo orden de captura
+        try:
+            while True:
+                elemento = self.cola_render.get()
+                if elemento is _FIN:
+                    break
+                frame, resultado = elemento
+                self.frames_procesados += 1
+                if self.metricas is not None:
+                    self.metricas.fijar('cola_captura', self.cola_captura.qsize())
+                    self.metricas.fijar('cola_render', self.cola_render.qsize())
+                if self.renderizar(frame, resultado) is False:
+                    break
+        finally:
+            self._detener.set()
+            for hilo in hilos:
+                hilo.join()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Ciclo de vida de los objetos seguidos (pistas) por el rastreador.
+
+Cada objeto seguido es una Pista con __slots__: ocupa mucha menos memoria que
+repartir su estado en varios diccionarios paralelos. Cuando el rastreador deja
+de seguir un objeto, el resumen de su pista se entrega a un sumidero y la
+pista se descarta, de modo que la memoria no crece con el tiempo de ejecución
+sino solo con el número de objetos presentes a la vez.
+
+Sumideros disponibles (cualquier objeto con registrar(resumen) y cerrar() sirve):
+    SumideroNulo     Descarta los resúmenes (por defecto)
+    SumideroMemoria  Guarda los últimos N resúmenes
+    SumideroJSONL    Escribe un resumen por línea en un archivo JSONL
+"""
+
+import json
+import sys
+from collections import deque
+
+
+class Pista:
+    """
+    Estado de un objeto seguido
+    """
+
+    __slots__ = ('id', 'tipo', 'x', 'y', 'w', 'h', 'cx', 'cy', 'cx_inicial', 'cy_inicial',
+                 'vx', 'vy', 'frames_sin_deteccion', 'umbral', 'primer_frame', 'ultimo_frame', 'detecciones')
+
+    def __init__(self, obj_id, tipo, x, y, w, h, frame):
+        """
+        Crea la pista a partir de su primera detección
+
+        Args:
+            obj_id: ID asignado por el rastreador
+            tipo: Tipo de objeto ('vehiculo', 'moto', ...)
+            x, y, w, h: Caja de la detección
+            frame: Número del frame en que aparece
+        """
+        self.id = obj_id
+        self.tipo = tipo
+        self.actualizar_caja(x, y, w, h)
+        self.cx_inicial, self.cy_inicial = self.cx, self.cy
+        # Velocidad observada entre las dos últimas detecciones, en píxeles por frame
+        self.vx, self.vy = 0.0, 0.0
+        self.frames_sin_deteccion = 0
+        # Umbral de distancia ampliado según la incertidumbre de la predicción (None: el del rastreador)
+        self.umbral = None
+        self.primer_frame = frame
+        self.ultimo_frame = frame
+        self.detecciones = 1
+
+    def actualizar_caja(self, x, y, w, h):
+        """
+        Fija la caja del objeto y recalcula su centro
+        """
+        self.x, self.y, self.w, self.h = x, y, w, h
+        self.cx = (x + x + w) // 2
+        self.cy = (y + y + h) // 2
+
+    def observar(self, x, y, w, h):
+        """
+        Fija la caja de una nueva detección del objeto y estima su velocidad
+        con el desplazamiento desde la última posición conocida
+        """
+        pasos = self.frames_sin_deteccion + 1
+        cx_anterior, cy_anterior = self.cx, self.cy
+        self.actualizar_caja(x, y, w, h)
+        self.vx = (self.cx - cx_anterior) / pasos
+        self.vy = (self.cy - cy_anterior) / pasos
+
+    def caja_prevista(self):
+        """
+        Devuelve la caja (x, y, w, h) desplazada con la velocidad observada
+        hasta el frame siguiente a la última posición conocida
+        """
+        pasos = self.frames_sin_deteccion + 1
+        return (self.x + self.vx * pasos, self.y + self.vy * pasos, self.w, self.h)
+
+    def mover_centro(self, cx, cy):
+        """
+        Desplaza la caja para que quede centrada en (cx, cy), sin cambiar su tamaño
+        """
+        self.cx, self.cy = cx, cy
+        self.x = cx - self.w // 2
+        self.y = cy - self.h // 2
+
+    def como_objeto(self):
+        """
+        Devuelve la pista en el formato de salida del rastreador (id, x, y, w, h, tipo)
+        """
+        return (self.id, self.x, self.y, self.w, self.h, self.tipo)
+
+    def resumen(self):
+        """
+        Devuelve un diccionario con el resumen de la pista
+        """
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'primer_frame': self.primer_frame,
+            'ultimo_frame': self.ultimo_frame,
+            'detecciones': self.detecciones,
+            'inicio': [self.cx_inicial, self.cy_inicial],
+            'fin': [self.cx, self.cy],
+            'caja': [self.x, self.y, self.w, self.h],
+        }
+
+
+class SumideroNulo:
+    """
+    Sumidero que descarta los resúmenes
+    """
+
+    def registrar(self, resumen):
+        pass
+
+    def cerrar(self):
+        pass
+
+
+class SumideroMemoria:
+    """
+    Sumidero que guarda en memoria los últimos resúmenes
+    """
+
+    def __init__(self, max_pistas=1000):
+        """
+        Args:
+            max_pistas: Número de resúmenes que se conservan; los más antiguos se descartan
+        """
+        self.pistas = deque(maxlen=max_pistas)
+
+    def registrar(self, resumen):
+        self.pistas.append(resumen)
+
+    def cerrar(self):
+        pass
+
+
+class SumideroJSONL:
+    """
+    Sumidero que escribe cada resumen como una línea JSON
+    """
+
+    def __init__(self, ruta):
+        """
+        Args:
+            ruta: Archivo de salida ('-' para la salida estándar)
+        """
+        self.ruta = ruta
+        self._archivo = sys.stdout if ruta == '-' else open(ruta, 'w')
+        self.pistas_escritas = 0
+
+    def registrar(self, resumen):
+        if self._archivo is None:
+            return
+        self._archivo.write(json.dumps(resumen) + '\n')
+        self.pistas_escritas += 1
+
+    def cerrar(self):
+        if self._archivo is None:
+            return
+        self._archivo.flush()
+        if self._archivo is not sys.stdout:
+            self._archivo.close()
+        self._archivo = None
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Procesamiento de archivos de video largos repartido en varios procesos.
+
+El video se divide en tramos de frames consecutivos. Cada tramo se procesa
+en un proceso con su propio Detector, que se posiciona en el primer frame
+del tramo con CAP_PROP_POS_FRAMES. La detección con YOLO no depende de los
+frames anteriores, así que los tramos son independientes entre sí.
+
+El seguimiento sí depende del orden, pero es mucho más barato que la
+detección: el proceso principal recibe las detecciones de cada tramo en
+orden y las pasa por un único Rastreador. Las uniones entre tramos se
+resuelven así igual que en una pasada única y los contadores finales
+coinciden exactamente con los de main.py sin --procesos (tolerancia 0),
+siempre que cada tramo empiece exactamente en su frame.
+
+Muchas compilaciones de FFmpeg no se posicionan con exactitud y además
+devuelven en CAP_PROP_POS_FRAMES el frame pedido, no el alcanzado. Por eso la
+posición se comprueba con la marca de tiempo del frame leído
+(CAP_PROP_POS_MSEC): si la búsqueda se pasa, se repite desde un punto
+anterior (cada vez más lejos) y se avanza leyendo hasta el frame exacto. El
+coste extra es de unos pocos frames por tramo, no una lectura desde el
+principio del video en cada tramo.
+
+El último tramo se lee hasta el final del video, aunque CAP_PROP_FRAME_COUNT
+indique menos frames. Si el contenedor no indica el número de frames, el
+video no puede repartirse y hay que procesarlo en un solo proceso.
+"""
+
+import multiprocessing
+import os
+import time
+
+import cv2
+
+from src.detector import Detector
+from src.rastreador import Rastreador
+
+# Factor por el que crece el margen de retroceso cada vez que la búsqueda se pasa del frame pedido
+MULTIPLICADOR_MARGEN = 8
+
+# Detector propio de cada proceso trabajador (se crea en _inicializar_trabajador)
+_detector = None
+
+
+def dividir_en_tramos(total_frames, num_tramos):
+    """
+    Divide un rango de frames en tramos consecutivos de tamaño similar
+
+    Args:
+        total_frames: Número total de frames del video
+        num_tramos: Número de tramos deseado
+
+    Returns:
+        Lista de tuplas (inicio, fin) con fin exclusivo
+    """
+    num_tramos = max(1, min(num_tramos, total_frames))
+    limites = [total_frames * i // num_tramos for i in range(num_tramos + 1)]
+    return [(limites[i], limites[i + 1]) for i in range(num_tramos) if limites[i] < limites[i + 1]]
+
+
+def contar_frames(ruta):
+    """
+    Devuelve el número de frames que indica el contenedor del video, o 0 si
+    no puede abrirse o no lo indica
+    """
+    cap = cv2.VideoCapture(ruta)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+    cap.release()
+    return max(0, total_frames)
+
+
+def _frame_leido(cap, fps):
+    """
+    Índice del último frame leído, según su marca de tiempo
+    """
+    return int(round(cap.get(cv2.CAP_PROP_POS_MSEC) * fps / 1000))
+
+
+def _posicionar(cap, inicio, fps):
+    """
+    Posiciona la captura para que la siguiente lectura devuelva el frame
+    inicio, comprobando la posición con la marca de tiempo del frame leído
+
+    Returns:
+        True si la captura ha quedado en el frame exacto
+    """
+    if inicio == 0:
+        return True
+    if fps <= 0:
+        # Sin fps no se puede comprobar la posición: se confía en la búsqueda
+        cap.set(cv2.CAP_PROP_POS_FRAMES, inicio)
+        return True
+
+    # Se busca el frame anterior al tramo; si la búsqueda se pasa, se
+    # repite desde un punto anterior, con un margen cada vez mayor
+    margen = 1
+    while True:
+        desde = max(0, inicio - margen)
+        cap.set(cv2.CAP_PROP_POS_FRAMES, desde)
+        if not cap.grab():
+            return False
+        actual = _frame_leido(cap, fps)
+        if actual < inicio or desde == 0:
+            break
+        margen *= MULTIPLICADOR_MARGEN
+
+    # Avanzar leyendo hasta el frame anterior al tramo
+    while actual < inicio - 1:
+        if not cap.grab():
+            return False
+        siguiente = _frame_leido(cap, fps)
+        if siguiente <= actual:
+            # Marcas de tiempo no crecientes: la posición no puede comprobarse
+            return False
+        actual = siguiente
+    return actual == inicio - 1
+
+
+def _inicializar_trabajador(config_detector, hilos_por_proceso):
+    """
+    Crea el Detector del proceso trabajador
+    """
+    global _detector
+    # Evitar que cada proceso lance tantos hilos como núcleos tiene la máquina
+    cv2.setNumThreads(hilos_por_proceso)
+    _detector = Detector(**config_detector)
+
+
+def _procesar_tramo(tarea):
+    """
+    Detecta objetos en un tramo del video
+
+    Args:
+        tarea: Tupla (ruta, inicio, fin, roi, tam_salida); con fin None el
+            tramo se lee hasta el final del video
+
+    Returns:
+        Tupla (inicio, detecciones) donde detecciones es una lista de
+        (boxes, tipos) por cada frame del tramo, o None si no se pudo
+        posicionar la captura en el primer frame del tramo
+    """
+    ruta, inicio, fin, roi, tam_salida = tarea
+    cap = cv2.VideoCapture(ruta)
+    if not _posicionar(cap, inicio, cap.get(cv2.CAP_PROP_FPS)):
+        cap.release()
+        return inicio, None
+
+    detecciones = []
+    while fin is None or inicio + len(detecciones) < fin:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if tam_salida is not None:
+            frame = cv2.resize(frame, tam_salida)
+        boxes, tipos, _ = _detector.detect(frame, roi)
+        detecciones.append((boxes, tipos))
+    cap.release()
+    return inicio, detecciones
+
+
+def procesar_video_paralelo(ruta, config_detector, num_procesos=None, roi=None, tam_salida=None,
+                            frames_por_tramo=None, hilos_por_proceso=1, rastreador=None):
+    """
+    Procesa un archivo de video repartiendo la detección entre varios procesos
+
+    Args:
+        ruta: Ruta al archivo de video
+        config_detector: Argumentos con los que cada proceso crea su Detector
+        num_procesos: Número de procesos (por defecto, uno por núcleo)
+        roi: Región de interés (x, y, w, h) o None
+        tam_salida: Tamaño (ancho, alto) al que se reducen los frames, o None
+        frames_por_tramo: Tamaño de cada tramo; por defecto se crean 4 tramos
+            por proceso para repartir mejor la carga
+        hilos_por_proceso: Hilos de OpenCV por proceso trabajador
+        rastreador: Rastreador a utilizar (por defecto se crea uno nuevo)
+
+    Returns:
+        Tupla (rastreador, frames_procesados, tiempo_total)
+    """
+    num_procesos = num_procesos or os.cpu_count() or 1
+    rastreador = rastreador or Rastreador()
+
+    total_frames = contar_frames(ruta)
+    if total_frames == 0:
+        print("Error: no se puede abrir el video o no indica su número de frames; "
+              "el procesamiento en varios procesos no puede repartirlo")
+        return rastreador, 0, 0
+
+    if frames_por_tramo:
+        num_tramos = max(1, -(-total_frames // frames_por_tramo))
+    else:
+        num_tramos = num_procesos * 4
+    tramos = dividir_en_tramos(total_frames, num_tramos)
+    # El último tramo sigue hasta el final, por si el contenedor indica menos frames
+    tramos[-1] = (tramos[-1][0], None)
+    tareas = [(ruta, inicio, fin, roi, tam_salida) for inicio, fin in tramos]
+    print(f"Procesando {total_frames} frames en {len(tramos)} tramos con {num_procesos} procesos")
+
+    start_time = time.time()
+    frames_procesados = 0
+    with multiprocessing.Pool(num_procesos, initializer=_inicializar_trabajador,
+                              initargs=(config_detector, hilos_por_proceso)) as pool:
+        # imap entrega los tramos en orden, así el rastreador ve los frames en secuencia
+        for inicio, detecciones in pool.imap(_procesar_tramo, tareas):
+            if detecciones is None:
+                print(f"\nError: no se pudo posicionar el video en el frame {inicio}; "
+                      f"procese el video en un solo proceso")
+                break
+            if inicio != frames_procesados:
+                print(f"\nAviso: el tramo del frame {inicio} empieza tras {frames_procesados} frames leídos; "
+                      f"el número de frames del contenedor no es fiable y los conteos pueden diferir "
+                      f"de los de un solo proceso")
+            for boxes, tipos in detecciones:
+                rastreador.actualizar(boxes, tipos)
+            frames_procesados += len(detecciones)
+            print(f"\rFrames procesados: {frames_procesados}/{total_frames}", end="")
+    print()
+
+    return rastreador, frames_procesados, time.time() - start_time
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Propagación de cajas entre frames sin detección.
+
+Cuando el detector solo se ejecuta cada N frames, las cajas de los objetos
+seguidos se trasladan en los frames intermedios con flujo óptico de
+Lucas-Kanade calculado sobre una rejilla de puntos dentro de cada caja.
+"""
+
+import cv2
+import numpy as np
+
+
+class PropagadorFlujoOptico:
+    """
+    Desplaza las cajas de los objetos según el flujo óptico entre dos frames
+    """
+
+    def __init__(self, puntos_por_lado=3, margen=0.2, win_size=(15, 15), max_level=2):
+        """
+        Inicializa el propagador
+
+        Args:
+            puntos_por_lado: La rejilla de puntos de cada caja es de
+                puntos_por_lado x puntos_por_lado
+            margen: Fracción del ancho/alto que se deja libre en cada borde de
+                la caja, para no seguir puntos del fondo
+            win_size: Tamaño de ventana de Lucas-Kanade
+            max_level: Niveles de la pirámide de Lucas-Kanade
+        """
+        rejilla = np.linspace(margen, 1 - margen, puntos_por_lado)
+        gx, gy = np.meshgrid(rejilla, rejilla)
+        # Posiciones relativas de los puntos dentro de una caja, (K, 2)
+        self.rejilla = np.stack([gx.ravel(), gy.ravel()], axis=1).astype(np.float32)
+        self.parametros_lk = dict(winSize=win_size, maxLevel=max_level,
+                                  criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+    def propagar(self, gris_anterior, gris_actual, objetos):
+        """
+        Calcula la nueva posición de cada objeto
+
+        Args:
+            gris_anterior: Frame anterior en escala de grises
+            gris_actual: Frame actual en escala de grises
+            objetos: Lista de objetos [(id, x, y, w, h, tipo), ...] en el frame anterior
+
+        Returns:
+            Lista de objetos con su caja desplazada [(id, x, y, w, h, tipo), ...].
+            Los objetos sin puntos válidos conservan su posición.
+        """
+        if not objetos:
+            return []
+
+        cajas = np.array([obj[1:5] for obj in objetos], dtype=np.float32)
+        k = len(self.rejilla)
+
+        # Rejilla de puntos de todas las cajas, calculada en una sola llamada
+        puntos = cajas[:, None, :2] + self.rejilla[None, :, :] * cajas[:, None, 2:4]
+        p0 = puntos.reshape(-1, 1, 2)
+        p1, estado, _ = cv2.calcOpticalFlowPyrLK(gris_anterior, gris_actual, p0, None, **self.parametros_lk)
+
+        desplazamientos = (p1 - p0).reshape(len(objetos), k, 2)
+        validos = estado.reshape(len(objetos), k).astype(bool)
+
+        # Mediana de los desplazamientos válidos de cada caja
+        desplazamientos[~validos] = np.nan
+        con_puntos = validos.any(axis=1)
+        medianas = np.zeros((len(objetos), 2), dtype=np.float32)
+        if con_puntos.any():
+            medianas[con_puntos] = np.nanmedian(desplazamientos[con_puntos], axis=1)
+
+        resultado = []
+        for (obj_id, x, y, w, h, tipo), (dx, dy) in zip(objetos, medianas.tolist()):
+            resultado.append((obj_id, int(round(x + dx)), int(round(y + dy)), w, h, tipo))
+        return resultado
+
+
+class SeguimientoIntermitente:
+    """
+    Coordina el detector y el rastreador cuando el detector solo se ejecuta
+    cada N frames. En los frames intermedios las cajas se trasladan con flujo
+    óptico o con el modelo de movimiento del rastreador, sin crear IDs nuevos
+    ni modificar los contadores.
+    """
+
+    def __init__(self, rastreador, intervalo=1, propagacion='flujo'):
+        """
+        Inicializa el seguimiento
+
+        Args:
+            rastreador: Instancia de Rastreador
+            intervalo: Ejecutar el detector en uno de cada `intervalo` frames
+            propagacion: 'flujo' (flujo óptico) o 'movimiento' (Rastreador.predecir)
+        """
+        if propagacion not in ('flujo', 'movimiento'):
+            raise ValueError(f"Propagación desconocida: {propagacion}")
+        self.rastreador = rastreador
+        self.intervalo = max(1, intervalo)
+        self.propagador = PropagadorFlujoOptico() if self.intervalo > 1 and propagacion == 'flujo' else None
+        self.indice_frame = 0
+        self.gris_anterior = None
+        self.objetos_anteriores = []
+
+    def frames_a_detectar(self, num_frames):
+        """
+        Indica qué frames de los próximos num_frames necesitan detección
+
+        Returns:
+            Lista de índices relativos (0 .. num_frames - 1)
+        """
+        return [i for i in range(num_frames) if (self.indice_frame + i) % self.intervalo == 0]
+
+    def procesar(self, frame, deteccion=None):
+        """
+        Procesa el siguiente frame
+
+        Args:
+            frame: Frame actual (BGR)
+            deteccion: Tupla (boxes, tipos) si se ejecutó el detector en este
+                frame, o None para propagar las cajas del frame anterior
+
+        Returns:
+            Lista de objetos con sus IDs e información [(id, x, y, w, h, tipo), ...]
+        """
+        gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if self.propagador else None
+
+        if deteccion is not None:
+            boxes, tipos = deteccion
+            objetos = self.rastreador.actualizar(boxes, tipos)
+        elif self.propagador and self.gris_anterior is not None:
+            # Trasladar las cajas del frame anterior con flujo óptico
+            objetos = self.rastreador.desplazar(
+                self.propagador.propagar(self.gris_anterior, gris, self.objetos_anteriores))
+        else:
+            # Trasladar las cajas con el modelo de movimiento del rastreador
+            visibles = {obj[0] for obj in self.objetos_anteriores}
+            objetos = [obj for obj in self.rastreador.predecir() if obj[0] in visibles]
+
+        self.indice_frame += 1
+        self.gris_anterior = gris
+        self.objetos_anteriores = objetos
+        return objetos
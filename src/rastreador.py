@@ -2,24 +2,461 @@ import math
 import cv2
 import numpy as np
 
+from src.movimiento import FiltroKalmanMultiple
+from src.conteo import ConteoEscena
+from src.pistas import Pista, SumideroNulo
+from src.indice_espacial import RejillaEspacial
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+# Coste asignado a los pares detección-objeto que no pueden emparejarse
+COSTE_INVALIDO = 1e6
+
+# Límite del radio de búsqueda con modelo de movimiento, en múltiplos de
+# distancia_umbral: la incertidumbre de un objeto que deja de verse crece sin
+# límite, y sin tope acabaría quedándose con objetos nuevos cercanos
+FACTOR_RADIO_MAXIMO = 2
+
+
+def calcular_iou(cajas_a, cajas_b):
+    """
+    Calcula la intersección sobre unión entre dos conjuntos de cajas
+    
+    Args:
+        cajas_a: Array (N, 4) de cajas (x, y, w, h)
+        cajas_b: Array (M, 4) de cajas (x, y, w, h)
+        
+    Returns:
+        Matriz (N, M) con la IoU de cada par
+    """
+    cajas_a = np.asarray(cajas_a, dtype=np.float64).reshape(-1, 4)
+    cajas_b = np.asarray(cajas_b, dtype=np.float64).reshape(-1, 4)
+    ax1, ay1 = cajas_a[:, 0:1], cajas_a[:, 1:2]
+    ax2, ay2 = ax1 + cajas_a[:, 2:3], ay1 + cajas_a[:, 3:4]
+    bx1, by1 = cajas_b[:, 0], cajas_b[:, 1]
+    bx2, by2 = bx1 + cajas_b[:, 2], by1 + cajas_b[:, 3]
+    
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    interseccion = inter_w * inter_h
+    union = cajas_a[:, 2:3] * cajas_a[:, 3:4] + cajas_b[:, 2] * cajas_b[:, 3] - interseccion
+    return np.where(union > 0, interseccion / np.maximum(union, 1e-9), 0.0)
+
+
+def calcular_iou_pares(cajas_a, cajas_b):
+    """
+    Calcula la intersección sobre unión de cada caja de cajas_a con la caja
+    de la misma posición en cajas_b
+    
+    Args:
+        cajas_a: Array (P, 4) de cajas (x, y, w, h)
+        cajas_b: Array (P, 4) de cajas (x, y, w, h)
+        
+    Returns:
+        Array (P,) con la IoU de cada par
+    """
+    ax1, ay1, aw, ah = cajas_a.T
+    bx1, by1, bw, bh = cajas_b.T
+    inter_w = np.clip(np.minimum(ax1 + aw, bx1 + bw) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay1 + ah, by1 + bh) - np.maximum(ay1, by1), 0, None)
+    interseccion = inter_w * inter_h
+    union = aw * ah + bw * bh - interseccion
+    return np.where(union > 0, interseccion / np.maximum(union, 1e-9), 0.0)
+
+
+def resolver_asignacion(costes, coste_maximo):
+    """
+    Resuelve la asignación uno a uno de mínimo coste entre filas y columnas
+    
+    Usa el algoritmo húngaro de SciPy si está disponible. Si no, recurre a una
+    asignación voraz global (pares ordenados de menor a mayor coste), que
+    también garantiza que ninguna columna se asigna dos veces.
+    
+    Args:
+        costes: Matriz (N, M) de costes
+        coste_maximo: Los pares con coste mayor o igual se descartan
+        
+    Returns:
+        Lista de pares (fila, columna) asignados
+    """
+    if costes.size == 0:
+        return []
+    
+    if linear_sum_assignment is not None:
+        filas, columnas = linear_sum_assignment(costes)
+        return [(f, c) for f, c in zip(filas.tolist(), columnas.tolist()) if costes[f, c] < coste_maximo]
+    
+    orden = np.argsort(costes, axis=None, kind='stable')
+    filas, columnas = np.unravel_index(orden, costes.shape)
+    validos = costes[filas, columnas] < coste_maximo
+    filas_usadas = set()
+    columnas_usadas = set()
+    pares = []
+    for f, c in zip(filas[validos].tolist(), columnas[validos].tolist()):
+        if f in filas_usadas or c in columnas_usadas:
+            continue
+        filas_usadas.add(f)
+        columnas_usadas.add(c)
+        pares.append((f, c))
+    return pares
+
+
+def resolver_asignacion_dispersa(filas, columnas, costes):
+    """
+    Resuelve la asignación uno a uno de mínimo coste dada solo por sus pares
+    válidos (fila, columna, coste)
+    
+    Los pares forman un grafo bipartito; cada componente conexa se resuelve por
+    separado con resolver_asignacion. En escenas densas las componentes son
+    pequeñas, así que el coste total crece casi linealmente con el número de
+    objetos en lugar de resolver una única matriz N x M.
+    
+    Args:
+        filas: Array (P,) con la fila de cada par
+        columnas: Array (P,) con la columna de cada par
+        costes: Array (P,) con el coste de cada par
+        
+    Returns:
+        Lista de pares (fila, columna) asignados
+    """
+    filas = filas.tolist()
+    columnas = columnas.tolist()
+    if not filas:
+        return []
+    
+    # Unión-búsqueda: las filas son los nodos 0..F-1 y las columnas F..F+C-1
+    desplazamiento = max(filas) + 1
+    padres = list(range(desplazamiento + max(columnas) + 1))
+    
+    def raiz(nodo):
+        while padres[nodo] != nodo:
+            padres[nodo] = padres[padres[nodo]]
+            nodo = padres[nodo]
+        return nodo
+    
+    for f, c in zip(filas, columnas):
+        raiz_f, raiz_c = raiz(f), raiz(desplazamiento + c)
+        if raiz_f != raiz_c:
+            padres[raiz_c] = raiz_f
+    
+    componentes = {}
+    for k, f in enumerate(filas):
+        componentes.setdefault(raiz(f), []).append(k)
+    
+    pares = []
+    for indices in componentes.values():
+        if len(indices) == 1:
+            # Caso habitual: una detección con un único objeto posible
+            k = indices[0]
+            pares.append((filas[k], columnas[k]))
+            continue
+        filas_comp = sorted({filas[k] for k in indices})
+        columnas_comp = sorted({columnas[k] for k in indices})
+        posicion_fila = {f: i for i, f in enumerate(filas_comp)}
+        posicion_columna = {c: j for j, c in enumerate(columnas_comp)}
+        submatriz = np.full((len(filas_comp), len(columnas_comp)), COSTE_INVALIDO)
+        for k in indices:
+            submatriz[posicion_fila[filas[k]], posicion_columna[columnas[k]]] = costes[k]
+        for i, j in resolver_asignacion(submatriz, COSTE_INVALIDO):
+            pares.append((filas_comp[i], columnas_comp[j]))
+    return pares
+
+
 class Rastreador:
-    def __init__(self):
-        # Almacena los centros de los objetos detectados, con format: {id: (x, y)}
-        self.centro_puntos = {}
+    def __init__(self, modo_asignacion='voraz', metrica='distancia', distancia_umbral=25,
+                 iou_minimo=0.3, max_frames_sin_deteccion=15, modelo_movimiento=None,
+                 lineas=None, zonas=None, fps=None, sumidero=None):
+        """
+        Inicializa el rastreador
+        
+        Args:
+            modo_asignacion: 'voraz' empareja cada detección con el primer objeto
+                dentro del umbral; 'hungaro' resuelve la asignación óptima uno a uno
+            metrica: Coste usado en modo 'hungaro': 'distancia' entre centros,
+                'iou' (1 - IoU entre cajas) o 'combinada' (ambas deben cumplirse)
+            distancia_umbral: Distancia máxima entre centros para considerar
+                que un objeto es el mismo
+            iou_minimo: IoU mínima entre cajas para las métricas 'iou' y 'combinada'
+            max_frames_sin_deteccion: Número máximo de frames para mantener un objeto
+            modelo_movimiento: None para emparejar con el último centro observado, o
+                'kalman' para predecir la posición de cada objeto con un filtro de
+                Kalman de velocidad constante y emparejar contra la predicción
+            lineas: Líneas de conteo (ver src/conteo.py); cada cruce se cuenta
+                por sentido y tipo de objeto
+            zonas: Zonas poligonales de las que se mide ocupación y permanencia
+            fps: Frames por segundo de la fuente, para dar la permanencia en segundos
+            sumidero: Destino de los resúmenes de los objetos que dejan de
+                seguirse (ver src/pistas.py); por defecto se descartan
+        """
+        if modo_asignacion not in ('voraz', 'hungaro'):
+            raise ValueError(f"Modo de asignación desconocido: {modo_asignacion}")
+        if metrica not in ('distancia', 'iou', 'combinada'):
+            raise ValueError(f"Métrica desconocida: {metrica}")
+        if modelo_movimiento not in (None, 'kalman'):
+            raise ValueError(f"Modelo de movimiento desconocido: {modelo_movimiento}")
+        self.modo_asignacion = modo_asignacion
+        self.metrica = metrica
+        self.iou_minimo = iou_minimo
+        # Objetos seguidos, con formato: {id: Pista}
+        self.pistas = {}
         # Contador para asignar IDs únicos a cada objeto
         self.id_contador = 1
-        # Diccionario para almacenar el tipo de cada objeto
-        self.objeto_tipos = {}
         # Contadores por tipo de objeto
         self.contadores = {'vehiculo': 0, 'moto': 0, 'peaton': 0, 'emergencia': 0}
-        # Lista para almacenar los IDs que ya no están en escena
-        self.ids_desaparecidos = []
+        # Los objetos que ya no están en escena se entregan al sumidero y se olvidan
+        self.sumidero = sumidero if sumidero is not None else SumideroNulo()
+        self.pistas_terminadas = 0
+        # Número de frames procesados
+        self.frame = 0
         # Umbral de distancia para considerar que un objeto es el mismo
-        self.distancia_umbral = 25
-        # Contador para frames sin detección
-        self.frames_sin_deteccion = {}
+        self.distancia_umbral = distancia_umbral
         # Número máximo de frames para mantener un objeto
-        self.max_frames_sin_deteccion = 15
+        self.max_frames_sin_deteccion = max_frames_sin_deteccion
+        # Filtro de Kalman con el estado de todos los objetos (opcional)
+        self.filtro = FiltroKalmanMultiple() if modelo_movimiento == 'kalman' else None
+        # Conteo por líneas y zonas (opcional)
+        self.conteo = ConteoEscena(lineas, zonas, fps) if lineas or zonas else None
+
+    def _cerrar_frame(self, ids_eliminados=()):
+        """
+        Da por terminado el frame actual y pasa sus posiciones al conteo por líneas y zonas
+        """
+        self.frame += 1
+        if self.conteo is None:
+            return
+        pistas = list(self.pistas.values())
+        self.conteo.actualizar([p.id for p in pistas], [(p.cx, p.cy) for p in pistas],
+                               [p.tipo for p in pistas], ids_eliminados)
+
+    def _terminar_pista(self, obj_id):
+        """
+        Deja de seguir un objeto y entrega su resumen al sumidero
+        """
+        pista = self.pistas.pop(obj_id)
+        if self.filtro is not None:
+            self.filtro.eliminar(obj_id)
+        self.sumidero.registrar(pista.resumen())
+        self.pistas_terminadas += 1
+
+    def terminar(self):
+        """
+        Entrega al sumidero los objetos que siguen activos (al acabar la fuente),
+        cierra sus visitas a las zonas y cierra el sumidero
+        """
+        ids = list(self.pistas)
+        for obj_id in ids:
+            self._terminar_pista(obj_id)
+        if self.conteo is not None:
+            self.conteo.cerrar_visitas(ids)
+        self.sumidero.cerrar()
+
+    def predecir(self, pasos=1):
+        """
+        Avanza la posición de los objetos seguidos según el modelo de movimiento,
+        sin detecciones. Permite mantener los objetos en frames en los que no se
+        ejecuta el detector.
+        
+        Args:
+            pasos: Número de frames a avanzar
+            
+        Returns:
+            Lista de objetos con su posición predicha [(id, x, y, w, h, tipo), ...]
+        """
+        objetos = self._predecir(pasos)
+        self._cerrar_frame()
+        return objetos
+
+    def _predecir(self, pasos=1):
+        """
+        Avanza el modelo de movimiento sin contar el paso como un frame (ver predecir)
+        """
+        if self.filtro is None or len(self.filtro) == 0:
+            return [pista.como_objeto() for pista in self.pistas.values()]
+        
+        centros = self.filtro.predecir(pasos)
+        # Un objeto recién aparecido aún no tiene velocidad fiable: se busca en
+        # un radio mayor, que se reduce a medida que el filtro converge
+        radios = np.minimum(self.distancia_umbral + 2 * self.filtro.incertidumbre(),
+                            FACTOR_RADIO_MAXIMO * self.distancia_umbral)
+        objetos = []
+        for obj_id, (px, py), radio in zip(self.filtro.ids, centros.tolist(), radios.tolist()):
+            pista = self.pistas[obj_id]
+            pista.umbral = radio
+            pista.mover_centro(int(round(px)), int(round(py)))
+            objetos.append(pista.como_objeto())
+        return objetos
+
+    def desplazar(self, objetos):
+        """
+        Actualiza la posición de objetos ya seguidos con una estimación externa
+        (por ejemplo, flujo óptico) en frames sin detección. No crea IDs nuevos,
+        no modifica los contadores ni los frames sin detección.
+        
+        Args:
+            objetos: Lista de objetos con su nueva caja [(id, x, y, w, h, tipo), ...]
+            
+        Returns:
+            Lista de los objetos que siguen activos [(id, x, y, w, h, tipo), ...]
+        """
+        # El modelo de movimiento avanza un frame y usa la estimación como medida
+        if self.filtro is not None:
+            self._predecir()
+        
+        objetos_activos = []
+        medidas = {}
+        for obj_id, x, y, w, h, tipo in objetos:
+            pista = self.pistas.get(obj_id)
+            if pista is None:
+                continue
+            pista.actualizar_caja(x, y, w, h)
+            medidas[obj_id] = (pista.cx, pista.cy)
+            objetos_activos.append(pista.como_objeto())
+        
+        if self.filtro is not None and medidas:
+            self.filtro.corregir(list(medidas.keys()), list(medidas.values()))
+        self._cerrar_frame()
+        return objetos_activos
+
+    def _radio_busqueda(self):
+        """
+        Devuelve el mayor umbral de distancia de los objetos seguidos
+        """
+        radio = self.distancia_umbral
+        for pista in self.pistas.values():
+            if pista.umbral is not None and pista.umbral > radio:
+                radio = pista.umbral
+        return radio
+
+    def _indexar_pistas(self):
+        """
+        Crea la rejilla espacial con el centro de cada objeto seguido
+        """
+        rejilla = RejillaEspacial(self.distancia_umbral)
+        for obj_id, pista in self.pistas.items():
+            rejilla.insertar(obj_id, pista.cx, pista.cy)
+        return rejilla
+
+    def _buscar_cercano(self, cx, cy, rejilla, radio):
+        """
+        Busca el primer objeto seguido cuyo centro está dentro del umbral
+        
+        Args:
+            cx, cy: Centro de la detección
+            rejilla: Rejilla espacial con los centros de los objetos seguidos
+            radio: Mayor umbral de distancia de los objetos seguidos
+        
+        Returns:
+            ID del objeto encontrado o None
+        """
+        # Solo se comprueban los objetos de las celdas cercanas. Entre los que
+        # están dentro de su umbral se elige el más antiguo (el de menor ID),
+        # el mismo que encontraría un recorrido de todos en orden de creación
+        encontrado = None
+        for obj_id, px, py in rejilla.vecinos(cx, cy, radio):
+            if encontrado is not None and obj_id > encontrado:
+                continue
+            # Calcular distancia entre el nuevo punto y el existente
+            dist = math.hypot(cx - px, cy - py)
+            
+            # Si la distancia es menor al umbral, es el mismo objeto
+            umbral = self.pistas[obj_id].umbral
+            if dist < (umbral if umbral is not None else self.distancia_umbral):
+                encontrado = obj_id
+        return encontrado
+
+    def _asignar_optimo(self, objetos_rect):
+        """
+        Empareja detecciones y objetos seguidos resolviendo la asignación óptima.
+        Solo se evalúan los pares que la rejilla espacial encuentra cercanos, y
+        sus costes se calculan de forma vectorizada
+        
+        Args:
+            objetos_rect: Lista de rectángulos detectados [(x, y, w, h), ...]
+            
+        Returns:
+            Lista con el ID asignado a cada detección, o None si es un objeto nuevo
+        """
+        asignaciones = [None] * len(objetos_rect)
+        if not objetos_rect or not self.pistas:
+            return asignaciones
+        
+        pistas = list(self.pistas.values())
+        cajas = np.asarray(objetos_rect, dtype=np.float64).reshape(-1, 4)
+        centros = np.stack([(2 * cajas[:, 0] + cajas[:, 2]) // 2,
+                            (2 * cajas[:, 1] + cajas[:, 3]) // 2], axis=1)
+        
+        umbrales = np.array([p.umbral if p.umbral is not None else self.distancia_umbral for p in pistas])
+        
+        # Radio de cada objeto fuera del cual ningún par puede ser válido: su
+        # umbral de distancia, o la distancia a partir de la cual las cajas no se solapan
+        radios = umbrales
+        if self.metrica in ('iou', 'combinada'):
+            # La IoU se mide contra la caja prevista: la última caja observada no
+            # se solapa con la detección de un objeto rápido o que no se ha
+            # visto en varios frames. Con filtro de Kalman las cajas ya están en
+            # la posición predicha; sin él se desplazan con la velocidad observada
+            if self.filtro is None:
+                cajas_pistas = np.asarray([p.caja_prevista() for p in pistas], dtype=np.float64)
+            else:
+                cajas_pistas = np.asarray([(p.x, p.y, p.w, p.h) for p in pistas], dtype=np.float64)
+            desplazamientos = cajas_pistas[:, :2] - np.asarray([(p.x, p.y) for p in pistas], dtype=np.float64)
+            margenes = np.hypot(desplazamientos[:, 0], desplazamientos[:, 1])
+            extension = float(np.max(np.maximum(cajas[:, 2], cajas[:, 3])))
+            radios_iou = np.array([(max(p.w, p.h) + extension) / 2 + 1 for p in pistas]) + margenes
+            # Un objeto con una sola detección aún no tiene velocidad: puede
+            # haberse movido a cualquier punto dentro de su umbral de distancia
+            sin_velocidad = np.array([p.detecciones == 1 for p in pistas])
+            radios_iou = np.where(sin_velocidad, np.maximum(radios_iou, umbrales), radios_iou)
+            radios = radios_iou if self.metrica == 'iou' else np.minimum(radios + margenes, radios_iou)
+        
+        # Pares candidatos (detección, objeto): detecciones de la rejilla
+        # espacial cercanas a cada objeto
+        rejilla = RejillaEspacial(self.distancia_umbral)
+        for fila, (cx, cy) in enumerate(centros.tolist()):
+            rejilla.insertar(fila, cx, cy)
+        filas, columnas = [], []
+        for columna, (pista, radio) in enumerate(zip(pistas, radios.tolist())):
+            for fila, _, _ in rejilla.vecinos(pista.cx, pista.cy, radio):
+                filas.append(fila)
+                columnas.append(columna)
+        if not filas:
+            return asignaciones
+        filas = np.array(filas)
+        columnas = np.array(columnas)
+        
+        umbrales_pares = umbrales[columnas]
+        if self.metrica in ('distancia', 'combinada'):
+            puntos = np.asarray([(p.cx, p.cy) for p in pistas], dtype=np.float64)
+            if self.metrica == 'combinada':
+                # Ambas condiciones se miden en la posición prevista
+                puntos = puntos + desplazamientos
+            distancias = np.hypot(centros[filas, 0] - puntos[columnas, 0],
+                                  centros[filas, 1] - puntos[columnas, 1])
+        if self.metrica in ('iou', 'combinada'):
+            cajas_pares = cajas_pistas[columnas]
+            # Los objetos sin velocidad se comparan con su caja centrada en la
+            # detección, siempre que esta quede dentro de su umbral de distancia
+            desplazamientos_pares = centros[filas] - (cajas_pares[:, :2] + cajas_pares[:, 2:] // 2)
+            recentrar = sin_velocidad[columnas] & (
+                np.hypot(desplazamientos_pares[:, 0], desplazamientos_pares[:, 1]) < umbrales_pares)
+            cajas_pares[recentrar, :2] += desplazamientos_pares[recentrar]
+            iou = calcular_iou_pares(cajas[filas], cajas_pares)
+        
+        if self.metrica == 'distancia':
+            costes = np.where(distancias < umbrales_pares, distancias, COSTE_INVALIDO)
+        elif self.metrica == 'iou':
+            costes = np.where(iou >= self.iou_minimo, 1.0 - iou, COSTE_INVALIDO)
+        else:
+            validos = (distancias < umbrales_pares) & (iou >= self.iou_minimo)
+            costes = np.where(validos, distancias / umbrales_pares + (1.0 - iou), COSTE_INVALIDO)
+        
+        validos = costes < COSTE_INVALIDO
+        for fila, columna in resolver_asignacion_dispersa(filas[validos], columnas[validos], costes[validos]):
+            asignaciones[fila] = pistas[columna].id
+        return asignaciones
 
     def actualizar(self, objetos_rect, tipos_objetos):
         """
@@ -35,6 +472,22 @@ class Rastreador:
         # Lista para almacenar objetos con su información
         objetos_bbox_ids = []
         
+        # Con modelo de movimiento, se empareja contra la posición predicha
+        if self.filtro is not None:
+            self._predecir()
+        
+        # En modo húngaro todas las detecciones se emparejan a la vez
+        asignaciones = None
+        if self.modo_asignacion == 'hungaro':
+            asignaciones = self._asignar_optimo(objetos_rect)
+        else:
+            # Modo voraz: búsqueda de vecinos en una rejilla con los centros actuales
+            rejilla = self._indexar_pistas()
+            radio = self._radio_busqueda()
+        
+        # Objetos ya seguidos que se han observado en este frame: (id, cx, cy)
+        observados = []
+        
         # Obtener el centro de los nuevos objetos detectados
         for i, rect in enumerate(objetos_rect):
             x, y, w, h = rect
@@ -42,49 +495,57 @@ class Rastreador:
             cy = (y + y + h) // 2
             
             # Verificar si el objeto ya fue detectado
-            objeto_detectado = False
-            
-            # Comprobar con los objetos que ya estamos siguiendo
-            for obj_id, pt in self.centro_puntos.items():
-                # Calcular distancia entre el nuevo punto y los existentes
-                dist = math.hypot(cx - pt[0], cy - pt[1])
-                
-                # Si la distancia es menor al umbral, actualizamos la posición
-                if dist < self.distancia_umbral:
-                    self.centro_puntos[obj_id] = (cx, cy)
-                    # Reiniciar el contador de frames sin detección
-                    self.frames_sin_deteccion[obj_id] = 0
-                    # Añadir a la lista de objetos con sus IDs
-                    objetos_bbox_ids.append((obj_id, x, y, w, h, self.objeto_tipos[obj_id]))
-                    objeto_detectado = True
-                    break
+            if asignaciones is not None:
+                obj_id = asignaciones[i]
+            else:
+                obj_id = self._buscar_cercano(cx, cy, rejilla, radio)
             
-            # Si es un nuevo objeto, asignamos un nuevo ID
-            if not objeto_detectado:
-                self.centro_puntos[self.id_contador] = (cx, cy)
-                self.objeto_tipos[self.id_contador] = tipos_objetos[i]
-                self.frames_sin_deteccion[self.id_contador] = 0
+            if obj_id is not None:
+                # Actualizamos la posición del objeto ya seguido
+                pista = self.pistas[obj_id]
+                pista.observar(x, y, w, h)
+                # Reiniciar el contador de frames sin detección
+                pista.frames_sin_deteccion = 0
+                pista.ultimo_frame = self.frame
+                pista.detecciones += 1
+                # Añadir a la lista de objetos con sus IDs
+                objetos_bbox_ids.append(pista.como_objeto())
+                observados.append((obj_id, cx, cy))
+                if asignaciones is None:
+                    rejilla.insertar(obj_id, pista.cx, pista.cy)
+            else:
+                # Si es un nuevo objeto, asignamos un nuevo ID
+                self.pistas[self.id_contador] = Pista(self.id_contador, tipos_objetos[i], x, y, w, h, self.frame)
                 self.contadores[tipos_objetos[i]] += 1
                 objetos_bbox_ids.append((self.id_contador, x, y, w, h, tipos_objetos[i]))
+                if asignaciones is None:
+                    rejilla.insertar(self.id_contador, cx, cy)
+                if self.filtro is not None:
+                    self.filtro.agregar(self.id_contador, cx, cy)
                 self.id_contador += 1
                 
+        # Corregir el modelo de movimiento con las posiciones medidas
+        if self.filtro is not None and observados:
+            # Si un objeto recibió varias detecciones (modo voraz), prevalece la última
+            medidas = {obj_id: (cx, cy) for obj_id, cx, cy in observados}
+            self.filtro.corregir(list(medidas.keys()), list(medidas.values()))
+        
         # Actualizar contador de frames sin detección para objetos no vistos
         ids_para_eliminar = []
-        for obj_id in self.centro_puntos.keys():
+        vistos = {bbox_id for bbox_id, *_ in objetos_bbox_ids}
+        for obj_id, pista in self.pistas.items():
             # Si el objeto no fue incluido en la lista actual
-            if not any(obj_id == bbox_id for bbox_id, *_ in objetos_bbox_ids):
-                self.frames_sin_deteccion[obj_id] += 1
+            if obj_id not in vistos:
+                pista.frames_sin_deteccion += 1
                 # Si supera el umbral, lo marcamos para eliminar
-                if self.frames_sin_deteccion[obj_id] >= self.max_frames_sin_deteccion:
+                if pista.frames_sin_deteccion >= self.max_frames_sin_deteccion:
                     ids_para_eliminar.append(obj_id)
         
-        # Eliminar objetos que llevan demasiado tiempo sin ser detectados
+        # Terminar los objetos que llevan demasiado tiempo sin ser detectados
         for obj_id in ids_para_eliminar:
-            self.centro_puntos.pop(obj_id, None)
-            self.objeto_tipos.pop(obj_id, None)
-            self.frames_sin_deteccion.pop(obj_id, None)
-            self.ids_desaparecidos.append(obj_id)
-                
+            self._terminar_pista(obj_id)
+        
+        self._cerrar_frame(ids_para_eliminar)
         return objetos_bbox_ids
     
     def get_contadores(self):
@@ -92,3 +553,10 @@ class Rastreador:
         Retorna los contadores actuales de cada tipo de objeto
         """
         return self.contadores
+    
+    def get_conteo(self):
+        """
+        Retorna los cruces de cada línea y las estadísticas de cada zona, o
+        None si no hay líneas ni zonas configuradas
+        """
+        return self.conteo.resumen() if self.conteo is not None else None
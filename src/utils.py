@@ -21,7 +21,18 @@ def cargar_configuracion():
         'threshold': 30,
         'area_min': 800,
         'umbral': 254,
-        'roi': None
+        # Limpieza morfológica de la máscara de fondo: lado del núcleo (0 = sin ella)
+        'apertura': 0,
+        'cierre': 0,
+        # Escala (0-1] y color del modelo de fondo; más pequeño es más barato
+        'escala_fondo': 1.0,
+        'fondo_gris': False,
+        'roi': None,
+        # Tamaño (ancho, alto) de los frames sobre los que se eligió la ROI
+        'roi_tam_frame': None,
+        # Líneas de conteo y zonas, en el mismo sistema de coordenadas que la ROI
+        'lineas': [],
+        'zonas': []
     }
     
     # Si existe un archivo de configuración, cargarlo
@@ -72,6 +83,27 @@ def aplicar_roi(frame, roi):
     return frame[y:y+h, x:x+w]
 
 
+def escalar_roi(roi, tam_origen, tam_destino):
+    """
+    Escala una ROI elegida sobre frames de un tamaño a frames de otro tamaño
+    Args:
+        roi: [x, y, w, h] coordenadas de la ROI en los frames de origen
+        tam_origen: (ancho, alto) de los frames de origen
+        tam_destino: (ancho, alto) de los frames de destino
+
+    Returns:
+        ROI (x, y, w, h) en los frames de destino, recortada a sus límites
+    """
+    escala_x = tam_destino[0] / tam_origen[0]
+    escala_y = tam_destino[1] / tam_origen[1]
+    x, y, w, h = roi
+    x1 = min(max(int(round(x * escala_x)), 0), tam_destino[0])
+    y1 = min(max(int(round(y * escala_y)), 0), tam_destino[1])
+    x2 = min(max(int(round((x + w) * escala_x)), 0), tam_destino[0])
+    y2 = min(max(int(round((y + h) * escala_y)), 0), tam_destino[1])
+    return (x1, y1, x2 - x1, y2 - y1)
+
+
 def dibujar_contornos(frame, contornos, color=(0, 255, 0), grosor=2):
     """
     Dibuja contornos en un frame
@@ -116,3 +148,34 @@ def dibujar_informacion(frame, objetos, contadores, fps=0):
                 cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
     
     return frame
+
+
+def dibujar_conteo(frame, rastreador):
+    """
+    Dibuja las líneas de conteo y las zonas del rastreador con sus valores
+    Args:
+        frame: Frame donde dibujar
+        rastreador: Rastreador con las líneas y zonas configuradas
+
+    Returns:
+        Frame con información dibujada
+    """
+    conteo = rastreador.conteo
+    if conteo is None:
+        return frame
+    
+    for l, nombre in enumerate(conteo.nombres_lineas):
+        inicio = tuple(int(v) for v in conteo.inicios[l])
+        final = tuple(int(v) for v in conteo.finales[l])
+        cv2.line(frame, inicio, final, (0, 255, 255), 2)
+        cruces = conteo.cruces[l].sum(axis=1)
+        cv2.putText(frame, f"{nombre}: {cruces[0]} / {cruces[1]}", (inicio[0], inicio[1] - 8),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+    
+    for z, nombre in enumerate(conteo.nombres_zonas):
+        vertices = np.stack([conteo.vertices_x[z], conteo.vertices_y[z]], axis=1).astype(np.int32)
+        cv2.polylines(frame, [vertices], True, (255, 255, 0), 2)
+        cv2.putText(frame, f"{nombre}: {conteo.ocupacion[z]}", tuple(vertices[0]),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+    
+    return frame
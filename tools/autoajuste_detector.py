@@ -0,0 +1,152 @@
+"""
+Autoajuste de las opciones de la red para esta máquina.
+
+Prueba sobre un clip de muestra de la cámara todas las combinaciones de
+backend/target disponibles, tamaño de entrada y número de hilos, mide la
+latencia por frame de cada una y guarda en config.json (sección detector) la
+más rápida que mantiene la recuperación mínima pedida.
+
+La recuperación no se mide frente a una verdad anotada: la referencia son las
+detecciones del propio modelo con el tamaño de entrada mayor en CPU. Es, por
+tanto, la concordancia con ese tamaño (la proporción de sus cajas que se
+siguen encontrando con IoU >= 0.5), no la recuperación real de los objetos
+del clip; un objeto que el tamaño mayor tampoco detecta no cuenta.
+
+Uso:
+    python tools/autoajuste_detector.py --input muestra.mp4 --recuperacion-minima 0.9
+"""
+
+import cv2
+import argparse
+import os
+import sys
+import time
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detector import Detector, combinaciones_disponibles, normalizar_tam_entrada
+from src.rastreador import calcular_iou, resolver_asignacion
+from src.utils import cargar_configuracion, guardar_configuracion
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models'))
+
+
+def recuperacion(referencia, estimadas, iou_minimo=0.5):
+    """
+    Proporción de cajas de referencia encontradas con IoU >= iou_minimo
+
+    La referencia son las detecciones del tamaño de entrada mayor, no una
+    verdad anotada: mide la concordancia con ese tamaño
+    """
+    total = sum(len(ref) for ref in referencia)
+    if total == 0:
+        return 1.0
+    recuperadas = 0
+    for ref, est in zip(referencia, estimadas):
+        if ref and est:
+            iou = calcular_iou(ref, est)
+            recuperadas += len(resolver_asignacion(1.0 - iou, 1.0 - iou_minimo + 1e-9))
+    return recuperadas / total
+
+
+def medir(detector, frames):
+    """
+    Detecta en todos los frames y mide la latencia media
+
+    Returns:
+        Tupla (cajas_por_frame, milisegundos_por_frame)
+    """
+    # La primera pasada con un tamaño o backend nuevo incluye la preparación de las capas
+    detector.detect(frames[0])
+    cajas = []
+    inicio = time.perf_counter()
+    for frame in frames:
+        cajas.append(detector.detect(frame)[0])
+    return cajas, (time.perf_counter() - inicio) * 1000 / len(frames)
+
+
+def main():
+    # Parsear argumentos de línea de comandos
+    parser = argparse.ArgumentParser(description='Busca la configuración más rápida de la red en esta máquina')
+    parser.add_argument('--input', type=str, required=True, help='Clip de muestra de la cámara a configurar')
+    parser.add_argument('--modelo', type=str, choices=['tiny', 'full'], default='tiny',
+                        help='Modelo a ajustar (por defecto: tiny)')
+    parser.add_argument('--frames', type=int, default=50, help='Frames del clip a utilizar (por defecto: 50)')
+    parser.add_argument('--tamanos', type=str, default='224,288,320,416,512,608',
+                        help='Tamaños de entrada a probar (por defecto: 224,288,320,416,512,608)')
+    parser.add_argument('--hilos', type=str, default='',
+                        help='Números de hilos a probar (por defecto: 1, la mitad y todos los núcleos)')
+    parser.add_argument('--recuperacion-minima', type=float, default=0.9,
+                        help='Recuperación mínima respecto a las detecciones del tamaño de entrada mayor, '
+                             'no frente a una verdad anotada (por defecto: 0.9)')
+    parser.add_argument('--no-guardar', action='store_true', help='Solo mostrar los resultados, sin escribir config.json')
+    args = parser.parse_args()
+
+    nombre = 'yolov4-tiny' if args.modelo == 'tiny' else 'yolov4'
+    rutas = dict(yolo_weights=os.path.join(MODELS_DIR, f'{nombre}.weights'),
+                 yolo_cfg=os.path.join(MODELS_DIR, f'{nombre}.cfg'),
+                 coco_names=os.path.join(MODELS_DIR, 'coco.names'))
+    if not all(os.path.exists(ruta) for ruta in rutas.values()):
+        print(f"No se encontró el modelo {nombre} en models/. Ejecuta primero tools/descargar_modelos.py")
+        return
+
+    # Leer el clip con la misma reducción que aplica main.py
+    cap = cv2.VideoCapture(args.input)
+    frames = []
+    while len(frames) < args.frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame.shape[1] > 640:
+            frame = cv2.resize(frame, (640, 360))
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        print("Error al leer el video de muestra")
+        return
+
+    # La red solo admite múltiplos de 32: se prueba y se guarda el tamaño ya ajustado
+    tamanos = sorted({normalizar_tam_entrada(int(t))[0] for t in args.tamanos.split(',')})
+    nucleos = os.cpu_count() or 1
+    if args.hilos:
+        lista_hilos = sorted({int(h) for h in args.hilos.split(',')})
+    else:
+        lista_hilos = sorted({1, max(1, nucleos // 2), nucleos})
+    combinaciones = combinaciones_disponibles()
+    print(f"Backends/targets disponibles: {', '.join(f'{b}/{t}' for b, t in combinaciones)}")
+    print(f"Probando {len(combinaciones) * len(tamanos) * len(lista_hilos)} configuraciones con {len(frames)} frames")
+
+    # Referencia: el tamaño de entrada mayor en CPU
+    detector = Detector(**rutas, tam_entrada=tamanos[-1], hilos=nucleos)
+    referencia, _ = medir(detector, frames)
+
+    resultados = []
+    print(f"{'Backend/target':<22}{'Entrada':>9}{'Hilos':>7}{'ms/frame':>10}{'Recup.':>9}")
+    for backend, target in combinaciones:
+        detector = Detector(**rutas, backend=backend, target=target)
+        for tam in tamanos:
+            detector.cambiar_tam_entrada(tam)
+            for hilos in lista_hilos:
+                cv2.setNumThreads(hilos)
+                cajas, latencia = medir(detector, frames)
+                rec = recuperacion(referencia, cajas)
+                resultados.append(dict(backend=backend, target=target, tam_entrada=tam, hilos=hilos,
+                                       latencia=latencia, recuperacion=rec))
+                print(f"{backend + '/' + target:<22}{tam:>9}{hilos:>7}{latencia:>10.1f}{rec:>9.2f}")
+
+    validos = [r for r in resultados if r['recuperacion'] >= args.recuperacion_minima]
+    if not validos:
+        print(f"Ninguna configuración alcanza una recuperación de {args.recuperacion_minima}")
+        return
+    mejor = min(validos, key=lambda r: r['latencia'])
+    print(f"Configuración más rápida: {mejor['backend']}/{mejor['target']}, entrada {mejor['tam_entrada']}, "
+          f"{mejor['hilos']} hilos ({mejor['latencia']:.1f} ms/frame, recuperación {mejor['recuperacion']:.2f})")
+
+    if not args.no_guardar:
+        config = cargar_configuracion()
+        config['detector'] = {clave: mejor[clave] for clave in ('tam_entrada', 'backend', 'target', 'hilos')}
+        guardar_configuracion(config)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Barrido de parámetros de detección y seguimiento sobre detecciones grabadas.
+
+Primero se ejecuta la red una sola vez sobre el video y se guardan sus
+candidatas antes de la NMS (subcomando grabar). Después cada barrido repite
+la NMS y el Rastreador sobre ese archivo para todas las combinaciones de
+parámetros pedidas, en varios procesos, sin volver a pasar por YOLO
+(subcomando barrer). Con --esperado las combinaciones se ordenan por el error
+respecto a los conteos reales del clip.
+
+Uso:
+    python tools/barrido_parametros.py grabar --input video.mp4 --salida detecciones.npz
+    python tools/barrido_parametros.py barrer --detecciones detecciones.npz \\
+        --confianza 0.3,0.4,0.5 --distancia 15,25,40 --max-frames 5,15,30 --esperado vehiculo=42,peaton=7
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import cv2
+
+# Añadir la ruta principal al path para importar desde src
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.detecciones_grabadas import grabar_detecciones, barrer_parametros, rejilla_parametros
+from src.utils import cargar_configuracion, escalar_roi
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'models'))
+
+
+def lista(tipo):
+    """
+    Convierte una lista separada por comas en una lista de valores del tipo indicado
+    """
+    return lambda texto: [tipo(valor) for valor in texto.split(',')]
+
+
+def grabar(args, config):
+    """
+    Graba las candidatas del video con el modelo y las opciones de red de main.py
+    """
+    nombre = 'yolov4-tiny' if args.modelo == 'tiny' else 'yolov4'
+    config_detector = dict(yolo_weights=os.path.join(MODELS_DIR, f'{nombre}.weights'),
+                           yolo_cfg=os.path.join(MODELS_DIR, f'{nombre}.cfg'),
+                           coco_names=os.path.join(MODELS_DIR, 'coco.names'))
+    if not all(os.path.exists(ruta) for ruta in config_detector.values()):
+        print(f"No se encontró el modelo {nombre} en models/. Ejecuta primero tools/descargar_modelos.py")
+        return
+    # Mismas opciones de la red que main.py
+    config_detector.update({clave: valor for clave, valor in (config.get('detector') or {}).items()
+                            if clave in ('tam_entrada', 'backend', 'target', 'hilos')})
+
+    roi = None
+    if args.roi:
+        try:
+            roi = tuple(map(int, args.roi.split(',')))
+        except ValueError:
+            print("Error en el formato de ROI. Debe ser x,y,w,h")
+            return
+    elif config.get('roi'):
+        # ROI de la calibración, escalada a los frames grabados (640x360 si el video es más ancho)
+        cap = cv2.VideoCapture(args.input)
+        width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        cap.release()
+        tam_frame = (640, 360) if width > 640 else (width, height)
+        if width > 0 and height > 0:
+            roi = escalar_roi(config['roi'], config.get('roi_tam_frame') or tam_frame, tam_frame)
+            print(f"ROI de config.json: {roi}")
+    grabar_detecciones(args.input, args.salida, config_detector, umbral_minimo=args.umbral_minimo, roi=roi,
+                       max_frames=args.frames)
+
+
+def error_conteo(resultado, esperado):
+    """
+    Suma de las diferencias absolutas entre los contadores y los conteos esperados
+    """
+    return sum(abs(resultado['contadores'].get(tipo, 0) - n) for tipo, n in esperado.items())
+
+
+def barrer(args, config):
+    """
+    Evalúa la rejilla de parámetros y muestra los resultados
+    """
+    rejilla = {
+        'confidence_threshold': args.confianza,
+        'nms_threshold': args.nms,
+        'modo_asignacion': args.asignacion,
+        'metrica': args.metrica,
+        'distancia_umbral': args.distancia,
+        'iou_minimo': args.iou,
+        'max_frames_sin_deteccion': args.max_frames,
+        'modelo_movimiento': [None if m == 'ninguno' else m for m in args.movimiento],
+    }
+    combinaciones = rejilla_parametros(rejilla)
+    print(f"Evaluando {len(combinaciones)} combinaciones")
+    try:
+        resultados = barrer_parametros(args.detecciones, combinaciones, num_procesos=args.procesos,
+                                       lineas=config.get('lineas'), zonas=config.get('zonas'))
+    except ValueError as e:
+        print(f"Error en el barrido: {e}")
+        return
+
+    esperado = {}
+    if args.esperado:
+        for par in args.esperado.split(','):
+            tipo, n = par.split('=')
+            esperado[tipo.strip()] = int(n)
+        for resultado in resultados:
+            resultado['error'] = error_conteo(resultado, esperado)
+        resultados.sort(key=lambda r: r['error'])
+
+    # Solo se muestran los parámetros que varían en el barrido
+    variables = [clave for clave, valores in rejilla.items() if len(valores) > 1]
+    tipos = list(resultados[0]['contadores']) if resultados else []
+    cabecera = ''.join(f"{clave:>26}" for clave in variables) + ''.join(f"{tipo:>11}" for tipo in tipos)
+    print(cabecera + f"{'objetos':>9}" + (f"{'error':>7}" if esperado else ''))
+    for resultado in resultados[:args.mostrar]:
+        fila = ''.join(f"{str(resultado['parametros'][clave]):>26}" for clave in variables)
+        fila += ''.join(f"{resultado['contadores'][tipo]:>11}" for tipo in tipos)
+        print(fila + f"{resultado['objetos']:>9}" + (f"{resultado['error']:>7}" if esperado else ''))
+
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"Resultados guardados en {args.salida}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Barrido de parámetros sobre detecciones grabadas')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_grabar = subparsers.add_parser('grabar', help='Ejecutar la red una vez y guardar las candidatas')
+    p_grabar.add_argument('--input', type=str, required=True, help='Ruta al video de entrada')
+    p_grabar.add_argument('--salida', type=str, required=True, help='Archivo .npz de detecciones')
+    p_grabar.add_argument('--modelo', type=str, choices=['tiny', 'full'], default='tiny',
+                          help='Modelo YOLO a utilizar (por defecto: tiny)')
+    p_grabar.add_argument('--umbral-minimo', type=float, default=0.05,
+                          help='Confianza mínima de las candidatas guardadas; los barridos no pueden '
+                               'usar umbrales menores (por defecto: 0.05)')
+    p_grabar.add_argument('--roi', type=str, default='',
+                          help='Región de interés en formato x,y,w,h (por defecto: la de config.json)')
+    p_grabar.add_argument('--frames', type=int, default=None, help='Frames a procesar (por defecto: todos)')
+
+    p_barrer = subparsers.add_parser('barrer', help='Evaluar una rejilla de parámetros sobre las candidatas')
+    p_barrer.add_argument('--detecciones', type=str, required=True, help='Archivo .npz creado con grabar')
+    p_barrer.add_argument('--confianza', type=lista(float), default=[0.4],
+                          help='Umbrales de confianza, separados por comas (por defecto: 0.4)')
+    p_barrer.add_argument('--nms', type=lista(float), default=[0.4],
+                          help='Umbrales de NMS, separados por comas (por defecto: 0.4)')
+    p_barrer.add_argument('--asignacion', type=lista(str), default=['voraz'],
+                          help='Modos de asignación: voraz, hungaro (por defecto: voraz)')
+    p_barrer.add_argument('--metrica', type=lista(str), default=['distancia'],
+                          help='Métricas del modo húngaro: distancia, iou, combinada (por defecto: distancia)')
+    p_barrer.add_argument('--distancia', type=lista(float), default=[25],
+                          help='Distancias máximas entre centros (por defecto: 25)')
+    p_barrer.add_argument('--iou', type=lista(float), default=[0.3],
+                          help='IoU mínimas de las métricas iou y combinada (por defecto: 0.3)')
+    p_barrer.add_argument('--max-frames', type=lista(int), default=[15],
+                          help='Frames sin detección antes de olvidar un objeto (por defecto: 15)')
+    p_barrer.add_argument('--movimiento', type=lista(str), default=['ninguno'],
+                          help='Modelos de movimiento: ninguno, kalman (por defecto: ninguno)')
+    p_barrer.add_argument('--esperado', type=str, default='',
+                          help='Conteos reales del clip para ordenar los resultados (ej: vehiculo=42,peaton=7)')
+    p_barrer.add_argument('--procesos', type=int, default=None,
+                          help='Procesos del barrido (por defecto: uno por núcleo)')
+    p_barrer.add_argument('--mostrar', type=int, default=20,
+                          help='Combinaciones a mostrar en la tabla (por defecto: 20)')
+    p_barrer.add_argument('--salida', type=str, default='', help='Archivo JSON con todos los resultados')
+    args = parser.parse_args()
+
+    config = cargar_configuracion()
+    if args.comando == 'grabar':
+        grabar(args, config)
+    else:
+        barrer(args, config)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,144 +1,205 @@
+"""
+Calibración interactiva de la detección por sustracción de fondo.
+
+Muestra el video junto a la máscara de primer plano y permite ajustar con
+barras deslizantes los mismos parámetros que usa main.py sin modelo YOLO
+(DetectorFondo). El sustractor se conserva entre frames, de modo que aprende
+el fondo igual que en ejecución; solo se vuelve a crear cuando cambia un
+parámetro del modelo (historial, umbral de varianza, núcleos, escala o gris).
+El umbral de la máscara y el área mínima se aplican sobre el detector
+existente sin perder lo aprendido.
+
+Los frames se reducen a 640x360 como en main.py, así que la ROI elegida con
+el ratón está en las mismas coordenadas. Con 's' la configuración se guarda
+en config.json, que main.py carga al arrancar.
+
+Uso:
+    python tools/calibracion.py --input video.mp4
+"""
+
 import cv2
 import numpy as np
 import argparse
 import os
-import time
 import sys
-import json
 
 # Añadir la ruta principal al path para importar desde src
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from src.utils import cargar_configuracion, guardar_configuracion, aplicar_roi
+from src.utils import cargar_configuracion, guardar_configuracion, escalar_roi
+from src.detector_fondo import DetectorFondo
+
+VENTANA = 'Calibracion'
+
+
+def leer_parametros():
+    """
+    Lee los valores de las barras deslizantes
+
+    Returns:
+        Diccionario con los parámetros de la detección, con las mismas claves
+        que la configuración
+    """
+    return {
+        'history': max(1, cv2.getTrackbarPos('History', VENTANA)),
+        'threshold': cv2.getTrackbarPos('Threshold', VENTANA),
+        'area_min': cv2.getTrackbarPos('Area Min', VENTANA),
+        'umbral': cv2.getTrackbarPos('Umbral', VENTANA),
+        'apertura': cv2.getTrackbarPos('Apertura', VENTANA),
+        'cierre': cv2.getTrackbarPos('Cierre', VENTANA),
+        'escala_fondo': max(10, cv2.getTrackbarPos('Escala %', VENTANA)) / 100,
+        'fondo_gris': bool(cv2.getTrackbarPos('Gris', VENTANA)),
+    }
+
+
+def crear_detector(parametros):
+    """
+    Crea el detector de fondo con los parámetros de las barras
+    """
+    return DetectorFondo(history=parametros['history'], var_threshold=parametros['threshold'],
+                         umbral=parametros['umbral'], area_min=parametros['area_min'],
+                         apertura=parametros['apertura'], cierre=parametros['cierre'],
+                         escala=parametros['escala_fondo'], gris=parametros['fondo_gris'])
+
 
 def main():
     # Parsear argumentos de línea de comandos
     parser = argparse.ArgumentParser(description='Calibración del sistema de detección')
     parser.add_argument('--input', type=str, default='0', help='Ruta al video de entrada o ID de la cámara (por defecto: 0)')
     args = parser.parse_args()
-    
+
     # Cargar configuración existente si hay
     config = cargar_configuracion()
-    
+
     # Cargar el video
     if args.input.isdigit():
         cap = cv2.VideoCapture(int(args.input))
     else:
         cap = cv2.VideoCapture(args.input)
-    
+
     # Comprobar que se ha abierto correctamente
     if not cap.isOpened():
         print("Error al abrir la fuente de video")
         return
-    
-    # Obtener dimensiones del video
+
+    # Obtener dimensiones del video; se reducen a 640x360 como en main.py
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-    
-    # Cambiar tamaño si es necesario
-    if width > 1280:
-        width = 1280
-        height = 720
-        
+    redimensionar = width > 640
+    if redimensionar:
+        width, height = 640, 360
+
     # Crear una ventana para los controles
-    cv2.namedWindow('Calibracion')
-    
-    # Crear controles deslizantes
-    cv2.createTrackbar('History', 'Calibracion', 200, 500, lambda x: None)
-    cv2.createTrackbar('Threshold', 'Calibracion', 30, 100, lambda x: None)
-    cv2.createTrackbar('Area Min', 'Calibracion', 800, 5000, lambda x: None)
-    cv2.createTrackbar('Umbral', 'Calibracion', 254, 255, lambda x: None)
-    
-    # Variable para guardar la ROI seleccionada
+    cv2.namedWindow(VENTANA)
+
+    # Crear controles deslizantes, partiendo de la configuración guardada
+    cv2.createTrackbar('History', VENTANA, int(config['history']), 500, lambda x: None)
+    cv2.createTrackbar('Threshold', VENTANA, int(config['threshold']), 100, lambda x: None)
+    cv2.createTrackbar('Area Min', VENTANA, int(config['area_min']), 5000, lambda x: None)
+    cv2.createTrackbar('Umbral', VENTANA, int(config['umbral']), 255, lambda x: None)
+    cv2.createTrackbar('Apertura', VENTANA, int(config['apertura']), 15, lambda x: None)
+    cv2.createTrackbar('Cierre', VENTANA, int(config['cierre']), 15, lambda x: None)
+    cv2.createTrackbar('Escala %', VENTANA, int(round(config['escala_fondo'] * 100)), 100, lambda x: None)
+    cv2.createTrackbar('Gris', VENTANA, int(bool(config['fondo_gris'])), 1, lambda x: None)
+
+    # ROI seleccionada [x, y, w, h]; sin selección se usa todo el frame
+    roi = [0, 0, width, height]
     roi_seleccionada = False
-    roi = [0, 0, width, height]  # [x, y, w, h]
-    
+    if config.get('roi'):
+        # La ROI guardada puede ser de otra fuente con otra resolución
+        x, y, w, h = escalar_roi(config['roi'], config.get('roi_tam_frame') or (width, height), (width, height))
+        if w > 0 and h > 0:
+            roi = [x, y, w, h]
+            roi_seleccionada = True
+    inicio_arrastre = None
+
     # Función para manejar eventos del mouse
     def seleccionar_roi(event, x, y, flags, param):
-        nonlocal roi, roi_seleccionada
-        
+        nonlocal roi, roi_seleccionada, inicio_arrastre
+        # Solo la mitad izquierda del lienzo es el video
+        x = min(max(x, 0), width - 1)
+        y = min(max(y, 0), height - 1)
+
         if event == cv2.EVENT_LBUTTONDOWN:
-            roi = [x, y, 0, 0]
-            roi_seleccionada = False
-            
-        elif event == cv2.EVENT_LBUTTONUP:
-            roi[2] = x - roi[0]
-            roi[3] = y - roi[1]
-            roi_seleccionada = True
-    
+            inicio_arrastre = (x, y)
+
+        elif event == cv2.EVENT_LBUTTONUP and inicio_arrastre is not None:
+            x0, y0 = inicio_arrastre
+            inicio_arrastre = None
+            # Se admite arrastrar en cualquier dirección
+            if abs(x - x0) > 1 and abs(y - y0) > 1:
+                roi = [min(x, x0), min(y, y0), abs(x - x0), abs(y - y0)]
+                roi_seleccionada = True
+
     # Asociar la función al evento del mouse
-    cv2.setMouseCallback('Calibracion', seleccionar_roi)
-    
+    cv2.setMouseCallback(VENTANA, seleccionar_roi)
+
     print("Instrucciones:")
     print("1. Arrastre el ratón para seleccionar una región de interés (ROI)")
     print("2. Ajuste los parámetros con las barras deslizantes")
     print("3. Presione 's' para guardar la configuración")
     print("4. Presione 'r' para restablecer la ROI")
     print("5. Presione 'q' para salir")
-    
+
+    # Lienzo con el video a la izquierda y la máscara a la derecha, reservado una
+    # sola vez: cada frame se escribe directamente sobre sus dos mitades
+    lienzo = np.zeros((height, width * 2, 3), dtype=np.uint8)
+    izquierda = lienzo[:, :width]
+    derecha = lienzo[:, width:]
+    # Buffers de lectura y de la máscara a tamaño de la ROI
+    crudo = None
+    mascara_roi = None
+
+    parametros = leer_parametros()
+    detector = crear_detector(parametros)
+
     while True:
-        ret, frame = cap.read()
+        ret, crudo = cap.read(crudo)
         if not ret:
-            print("Fin del video o error en la captura")
+            print("\nFin del video o error en la captura")
             break
-            
-        # Cambiar tamaño si es necesario
-        if width != int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)):
-            frame = cv2.resize(frame, (width, height))
-            
-        # Crear una copia para dibujar
-        frame_dibujo = frame.copy()
-        
-        # Dibujar la ROI seleccionada
-        if roi_seleccionada:
-            cv2.rectangle(frame_dibujo, (roi[0], roi[1]), (roi[0] + roi[2], roi[1] + roi[3]), (0, 255, 0), 2)
-            roi_recorte = frame[roi[1]:roi[1]+roi[3], roi[0]:roi[0]+roi[2]]
-            
-            # Obtener valores de los controles
-            history = cv2.getTrackbarPos('History', 'Calibracion')
-            threshold = cv2.getTrackbarPos('Threshold', 'Calibracion')
-            area_min = cv2.getTrackbarPos('Area Min', 'Calibracion')
-            umbral = cv2.getTrackbarPos('Umbral', 'Calibracion')
-            
-            # Crear el sustractor de fondo
-            sustractor_fondo = cv2.createBackgroundSubtractorMOG2(history=history, varThreshold=threshold, detectShadows=True)
-            
-            # Aplicar sustractor de fondo a la ROI
-            mascara = sustractor_fondo.apply(roi_recorte)
-            
-            # Aplicar umbral para eliminar sombras (valores grises)
-            _, mascara_umbral = cv2.threshold(mascara, umbral, 255, cv2.THRESH_BINARY)
-            
-            # Encontrar contornos
-            contornos, _ = cv2.findContours(mascara_umbral, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Dibujar contornos que superan el área mínima
-            for contorno in contornos:
-                area = cv2.contourArea(contorno)
-                if area > area_min:
-                    x, y, w, h = cv2.boundingRect(contorno)
-                    cv2.rectangle(roi_recorte, (x, y), (x+w, y+h), (0, 0, 255), 2)
-            
-            # Mostrar la máscara
-            mascara_color = cv2.cvtColor(mascara_umbral, cv2.COLOR_GRAY2BGR)
-            
-            # Mostrar máscaras y ROI en la ventana de calibración
-            altura_combinada = frame_dibujo.shape[0]
-            ancho_combinado = frame_dibujo.shape[1] + mascara_color.shape[1]
-            imagen_combinada = np.zeros((altura_combinada, ancho_combinado, 3), dtype=np.uint8)
-            
-            # Colocar las imágenes en la imagen combinada
-            imagen_combinada[0:frame_dibujo.shape[0], 0:frame_dibujo.shape[1]] = frame_dibujo
-            imagen_combinada[0:mascara_color.shape[0], frame_dibujo.shape[1]:] = mascara_color
-            
-            # Mostrar la imagen combinada
-            cv2.imshow('Calibracion', imagen_combinada)
-            
-            # Mostrar información en la consola
-            print(f"\rHistoria: {history}, Umbral: {threshold}, Área mín: {area_min}, Umbral máscara: {umbral}, ROI: {roi}", end="")
-            
+
+        # El frame se escribe ya reducido en la mitad izquierda del lienzo
+        if redimensionar:
+            frame = cv2.resize(crudo, (width, height), dst=izquierda)
         else:
-            cv2.imshow('Calibracion', frame_dibujo)
-        
+            np.copyto(izquierda, crudo)
+            frame = izquierda
+
+        # Recrear el sustractor solo si cambia un parámetro del modelo; el
+        # umbral y el área mínima se cambian sobre el detector existente
+        nuevos = leer_parametros()
+        if nuevos != parametros:
+            if any(nuevos[clave] != parametros[clave] for clave in nuevos if clave not in ('umbral', 'area_min')):
+                detector = crear_detector(nuevos)
+            detector.umbral = nuevos['umbral']
+            detector.area_min = nuevos['area_min']
+            parametros = nuevos
+            # Mostrar información en la consola
+            print(f"\rHistoria: {parametros['history']}, Umbral: {parametros['threshold']}, "
+                  f"Área mín: {parametros['area_min']}, Umbral máscara: {parametros['umbral']}, "
+                  f"Apertura: {parametros['apertura']}, Cierre: {parametros['cierre']}, "
+                  f"Escala: {parametros['escala_fondo']:.2f}, Gris: {parametros['fondo_gris']}, ROI: {roi}", end="")
+
+        boxes, _, _ = detector.detect(frame, tuple(roi))
+
+        # Máscara en la mitad derecha, en la posición de la ROI y a su tamaño
+        derecha.fill(0)
+        x, y, w, h = roi
+        mascara = detector.mascara
+        if mascara.shape != (h, w):
+            if mascara_roi is None or mascara_roi.shape != (h, w):
+                mascara_roi = np.empty((h, w), dtype=np.uint8)
+            mascara = cv2.resize(mascara, (w, h), dst=mascara_roi, interpolation=cv2.INTER_NEAREST)
+        cv2.cvtColor(mascara, cv2.COLOR_GRAY2BGR, dst=derecha[y:y + h, x:x + w])
+
+        # Dibujar la ROI y los objetos detectados sobre el video
+        if roi_seleccionada:
+            cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        for (bx, by, bw, bh) in boxes:
+            cv2.rectangle(frame, (bx, by), (bx + bw, by + bh), (0, 0, 255), 2)
+
+        cv2.imshow(VENTANA, lienzo)
+
         # Procesar teclas
         key = cv2.waitKey(1) & 0xFF
         if key == ord('q'):
@@ -147,27 +208,16 @@ def main():
             roi = [0, 0, width, height]
             roi_seleccionada = False
         elif key == ord('s'):
-            # Guardar la configuración en un archivo
-            configuracion = {
-                'roi': roi,
-                'history': cv2.getTrackbarPos('History', 'Calibracion'),
-                'threshold': cv2.getTrackbarPos('Threshold', 'Calibracion'),
-                'area_min': cv2.getTrackbarPos('Area Min', 'Calibracion'),
-                'umbral': cv2.getTrackbarPos('Umbral', 'Calibracion')
-            }
-            
-            # Guardar en un archivo de texto
-            with open('configuracion.txt', 'w') as f:
-                f.write(f"ROI={roi[0]},{roi[1]},{roi[2]},{roi[3]}\n")
-                f.write(f"HISTORY={configuracion['history']}\n")
-                f.write(f"THRESHOLD={configuracion['threshold']}\n")
-                f.write(f"AREA_MIN={configuracion['area_min']}\n")
-                f.write(f"UMBRAL={configuracion['umbral']}\n")
-                
-            print(f"\nConfiguración guardada en 'configuracion.txt'")
-            print(f"Para usar esta configuración, ejecute:")
-            print(f"python main.py --input {args.input} --roi {roi[0]},{roi[1]},{roi[2]},{roi[3]}")
-    
+            # Guardar en config.json, que main.py carga al arrancar
+            config.update(parametros)
+            config['roi'] = list(roi) if roi_seleccionada else None
+            # main.py escala la ROI si procesa los frames a otro tamaño
+            config['roi_tam_frame'] = [width, height] if roi_seleccionada else None
+            print()
+            guardar_configuracion(config)
+            print("Para usar esta configuración, ejecute:")
+            print(f"python main.py --input {args.input}")
+
     # Liberar recursos
     cap.release()
     cv2.destroyAllWindows()